@@ -1,10 +1,10 @@
 import os
+import asyncio
 from pydantic import BaseModel
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from fastapi import APIRouter, UploadFile, File
-from google.cloud import speech
 
 from backend.api.transcript_api import router as transcript_router
 from dotenv import load_dotenv
@@ -17,6 +17,10 @@ import backend.services.embedding_utils as embedding_utils
 from backend.services.chunk_utils import stream_chunks
 
 from backend.services import vector_store_lance
+from backend.services.memory_writer import memory_writer
+from backend.services.memory_store import set_memory_scope, write_memory, conversation_memory
+from backend.services.answer_cache import is_cacheable_answer
+from backend.services import memory_maintenance
 
 from backend.services.rag_utils import rag_answer
 
@@ -29,11 +33,14 @@ from fastapi import FastAPI, UploadFile, File
 from backend.services.rag_pipeline import answer_question
 from backend.services.tts import synthesize_text_to_gcs
 
-from backend.services.intent_classifier import classify_intent
+from backend.services.intent_classifier import classify_intent, classify_intent_detailed
 from backend.services.router import route_question
 
 from backend.services.sse_chat import router as sse_router
 from backend.route.setup_loader import router as setup_router
+from backend.route.metrics import router as metrics_router
+from backend.route.admin import router as admin_router
+from backend.route.stt import router as stt_router
 
 
 
@@ -50,6 +57,24 @@ app.include_router(transcript_router)
 app.include_router(summaries_router)
 app.include_router(sse_router)
 app.include_router(setup_router)
+app.include_router(metrics_router)
+app.include_router(admin_router)
+app.include_router(stt_router)
+
+
+@app.on_event("startup")
+def warm_indexes():
+    # VECTOR_INDEX_MODE=inmemory: load the embeddings matrix before the first question
+    vector_store_lance.warm_vector_index()
+    # MEMORY_MAINTENANCE_INTERVAL_HOURS > 0: periodic compaction / dedup / retention of memory
+    memory_maintenance.start_memory_maintenance_scheduler()
+
+
+@app.on_event("shutdown")
+def flush_memory_writes():
+    # write-behind memory queue: persist queued turns before the worker exits
+    memory_maintenance.stop_memory_maintenance_scheduler()
+    memory_writer.close()
 
 
 @app.get("/health")
@@ -86,7 +111,7 @@ def test_chunks():
 
         # Only generate embeddings for first 3 chunks
         for chunk in stream_chunks(content):
-            emb = get_embedding(chunk)
+            emb = get_embedding([chunk])[0]
             sample_embeddings.append(len(emb))
             count += 1
             if count == 3:
@@ -178,53 +203,39 @@ class AskRequest(BaseModel):
 #         "transcript": transcript
 #     }
 
-####
-
-router = APIRouter()
-speech_client = speech.SpeechClient()
-
-@router.post("/stt")
-async def stt_route(file: UploadFile = File(...)):
-    audio_bytes = await file.read()
-
-    audio = speech.RecognitionAudio(content=audio_bytes)
-
-    config = speech.RecognitionConfig(
-        encoding=speech.RecognitionConfig.AudioEncoding.WEBM_OPUS,
-        sample_rate_hertz=48000,  # Chrome usually records at 48000 Hz
-        language_code="en-US",
-        audio_channel_count=1,
-        enable_automatic_punctuation=True
-    )
-
-    response = speech_client.recognize(config=config, audio=audio)
-
-    transcript = ""
-    for result in response.results:
-        transcript += result.alternatives[0].transcript
-
-    return {"transcript": transcript}
-
-app.include_router(router)
-####
+# /stt and /stt/stream: backend/route/stt.py
 
 @app.post("/test_intent")
 def test_intent(req: dict):
     question = req.get("question")
-    intent = classify_intent(question)
-    return {"question": question, "intent": intent}
+    intent, confidence, source = classify_intent_detailed(question)
+    return {"question": question, "intent": intent, "confidence": confidence, "source": source}
 
 
 from backend.services.crew.orchestrator_agent import CrewOrchestrator
 orchestrator = CrewOrchestrator()
 
 @app.post("/ask_new")
-def ask_new(req: dict):
+async def ask_new(req: dict):
     print(f"/ask_new has invoked")
     question = req.get("question")
     print(f"question: {question}")
-    answer = orchestrator.run(question)
-    return {"question": question, "answer": answer}
+    # optional {"session_id": ..., "user_id": ...}: scopes long-term memory to this student
+    set_memory_scope(req.get("session_id"), req.get("user_id"))
+    session_id = req.get("session_id")
+    # short-term history of this session (the Redis store is a network call)
+    history = await asyncio.to_thread(conversation_memory.get_history, session_id) if session_id else None
+    # async path: no worker thread is held while OpenAI is answering
+    answer, trace = await orchestrator.arun_with_trace(question, history)
+    if session_id and is_cacheable_answer(answer):
+        await asyncio.to_thread(conversation_memory.add_message, session_id, question, answer)
+    if (session_id or req.get("user_id")) and is_cacheable_answer(answer):
+        write_memory(question, answer)  # queued, written in the background
+    response = {"question": question, "answer": answer}
+    # pass {"trace": true} to see every LLM / tool call and its latency
+    if req.get("trace"):
+        response["trace"] = trace
+    return response
 
 
 
@@ -232,13 +243,12 @@ def ask_new(req: dict):
 #  ADD THIS TO main.py
 # =========================
 from fastapi import UploadFile, File
-from google.cloud import storage
+from backend.services import storage_backend
 import uuid
-from openai import OpenAI
 import os
 import base64
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from backend.services.openai_clients import client
 BUCKET_NAME = os.getenv("GCS_BUCKET")
 
 
@@ -266,13 +276,7 @@ async def text_to_speech(req: dict):
 
     # ---- 2) Upload to GCS ----
     filename = f"tts/{session_id}_{uuid.uuid4()}.mp3"
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(BUCKET_NAME)
-    blob = bucket.blob(filename)
-
-    blob.upload_from_string(audio_bytes, content_type="audio/mpeg")
+    storage_backend.write_bytes(BUCKET_NAME, filename, audio_bytes, content_type="audio/mpeg")
 
     # Make the file public
-    blob.make_public()
-
-    return {"audio_url": blob.public_url}
\ No newline at end of file
+    return {"audio_url": storage_backend.public_url(BUCKET_NAME, filename)}
\ No newline at end of file
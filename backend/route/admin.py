@@ -0,0 +1,32 @@
+import os
+import hmac
+from fastapi import APIRouter, Header, HTTPException
+from backend.services.memory_maintenance import run_memory_maintenance
+
+router = APIRouter()
+
+# Shared secret admin calls must send in X-Admin-Token; unset = admin routes disabled
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+def _check_admin_token(token: str | None):
+    """Fail closed: without a configured ADMIN_TOKEN every admin call is refused."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="admin routes are disabled (ADMIN_TOKEN not set)")
+    if not token or not hmac.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="invalid admin token")
+
+
+@router.post("/admin/memory/maintenance")
+def memory_maintenance(x_admin_token: str | None = Header(default=None)):
+    """
+    Retention, dedup, compaction and old-version cleanup of the long-term
+    memory table. Response reports rows / fragments / bytes and recall
+    latency before and after, plus bytes reclaimed.
+    """
+    _check_admin_token(x_admin_token)
+    try:
+        return run_memory_maintenance()
+    except Exception as e:
+        print(f'Exception: {e}')
+        return {"status": "error", "message": str(e)}
@@ -0,0 +1,29 @@
+from fastapi import APIRouter
+from backend.services.vector_store_lance import table_registry_stats
+from backend.services.embedding_cache import embedding_cache
+from backend.services.tool_executor import tool_executor
+from backend.services.reranker import reranker
+from backend.services.answer_cache import answer_cache
+from backend.services.storage_backend import storage_stats
+from backend.services.memory_store import conversation_memory
+from backend.services.memory_writer import memory_writer
+from backend.services.stt_service import stt_stats
+
+router = APIRouter()
+
+@router.get("/metrics")
+def metrics():
+    """
+    Lightweight in-process counters (per worker) for performance debugging.
+    """
+    return {
+        "vector_store": table_registry_stats(),
+        "embedding_cache": embedding_cache.metrics(),
+        "tool_executor": tool_executor.metrics(),
+        "reranker": reranker.metrics(),
+        "answer_cache": answer_cache.metrics(),
+        "storage": storage_stats(),
+        "sessions": conversation_memory.metrics(),
+        "memory_writer": memory_writer.metrics(),
+        "stt": stt_stats(),
+    }
@@ -4,14 +4,18 @@ from backend.services.load_transcripts_lance import load_and_index_transcripts
 router = APIRouter()
 
 @router.get("/setup")
-def setup_transcripts():
+def setup_transcripts(force: bool = False):
     """
     Manually trigger transcript → embeddings → LanceDB indexing.
-    Safe to run multiple times. Replaces old data for same video chunks.
+    Safe to run multiple times: unchanged transcripts are skipped, changed
+    ones replace their old chunks, deleted ones are removed.
+    Pass ?force=true to rebuild everything.
+    Response carries the indexing counts and per-stage timings (download,
+    chunk, embed, write) at the top level.
     """
     try:
-        count = load_and_index_transcripts()
-        return {"status": "ok", "indexed_files": count}
+        result = load_and_index_transcripts(force=force)
+        return {"status": "ok", **result}
     except Exception as e:
         print(f'Exception: {e}')
         return {"status": "error", "message": str(e)}
\ No newline at end of file
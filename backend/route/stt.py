@@ -0,0 +1,106 @@
+import os
+import json
+import time
+import asyncio
+import threading
+from fastapi import APIRouter, UploadFile, File, WebSocket, WebSocketDisconnect
+from backend.services.stt_service import recognizer, StreamingTranscription, count_stt
+
+router = APIRouter()
+
+# Concurrent streaming recognitions per worker (each holds a thread and a gRPC stream)
+STT_MAX_STREAMS = int(os.getenv("STT_MAX_STREAMS", "32"))
+# Google closes a streaming recognition after ~5 minutes of audio
+STT_STREAM_MAX_SECONDS = float(os.getenv("STT_STREAM_MAX_SECONDS", "280"))
+
+_stream_slots = threading.BoundedSemaphore(STT_MAX_STREAMS)
+
+
+@router.post("/stt")
+async def stt_route(file: UploadFile = File(...)):
+    """One-shot recognition of a complete recording (WebM/Opus)."""
+    audio_bytes = await file.read()
+
+    # recognize() blocks for the whole recognition; keep it off the event loop
+    transcript = await asyncio.to_thread(recognizer.recognize, audio_bytes)
+    count_stt("one_shot")
+
+    return {"transcript": transcript}
+
+
+@router.websocket("/stt/stream")
+async def stt_stream(websocket: WebSocket):
+    """
+    Streaming recognition.
+    Client -> server: binary frames of WebM/Opus audio (MediaRecorder
+    timeslice chunks, in order), then the text message "stop" (or
+    {"type": "stop"}) at end of speech.
+    Server -> client: {"type": "partial"|"final", "text"} while audio flows,
+    then {"type": "done", "transcript", "finalize_ms"} and the socket closes.
+    finalize_ms = end of speech to final transcript.
+    """
+    await websocket.accept()
+    if not _stream_slots.acquire(blocking=False):
+        count_stt("rejected")
+        await websocket.close(code=1013)  # try again later
+        return
+
+    count_stt("streams")
+    session = StreamingTranscription()
+    session.start()
+    stopped = {"at": None}
+
+    async def pump_audio():
+        deadline = time.monotonic() + STT_STREAM_MAX_SECONDS
+        try:
+            while True:
+                message = await asyncio.wait_for(websocket.receive(), timeout=max(0.0, deadline - time.monotonic()))
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes"):
+                    session.feed(message["bytes"])
+                elif message.get("text") and _is_stop(message["text"]):
+                    break
+        except (asyncio.TimeoutError, WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            stopped["at"] = time.perf_counter()
+            session.end()
+
+    pump = asyncio.create_task(pump_audio())
+    finals = []
+    try:
+        async for kind, text in session.results():
+            if kind == "final":
+                finals.append(text.strip())
+            if kind == "error":
+                await websocket.send_json({"type": "error", "message": text})
+            else:
+                await websocket.send_json({"type": kind, "text": text})
+
+        finalize_ms = None
+        if stopped["at"] is not None:
+            finalize_ms = round((time.perf_counter() - stopped["at"]) * 1000, 1)
+            count_stt("finalize_ms", finalize_ms)
+            count_stt("finalized")
+        await websocket.send_json({
+            "type": "done",
+            "transcript": " ".join(t for t in finals if t),
+            "finalize_ms": finalize_ms,
+        })
+        await websocket.close()
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        session.end()
+        pump.cancel()
+        _stream_slots.release()
+
+
+def _is_stop(text: str) -> bool:
+    if text.strip() == "stop":
+        return True
+    try:
+        return json.loads(text).get("type") == "stop"
+    except (ValueError, AttributeError):
+        return False
@@ -2,9 +2,8 @@
 
 import os
 from fastapi import APIRouter
-from backend.services.gcs_loader import load_transcript
 from backend.services.summary_service import generate_summary
-from backend.services.gcs_loader import get_client
+from backend.services.storage_backend import list_objects, bulk_download, write_bytes
 
 router = APIRouter()
 
@@ -17,21 +16,16 @@ def generate_summaries():
         return {"error": "GCS_BUCKET_NAME missing in .env"}
 
     # List all transcript files
-    client = get_client()
-    bucket = client.bucket(bucket_name)
-
-    blobs = bucket.list_blobs(prefix=transcripts_dir)
+    blobs = list_objects(bucket_name, transcripts_dir, suffix=".txt")
 
     summary_results = {}
 
-    for blob in blobs:
-        if blob.name.endswith(".txt"):
-
-            transcript_text = load_transcript(bucket_name, blob.name)
-            summary = generate_summary(transcript_text)
+    # downloads run ahead in parallel while each summary is generated
+    for blob, transcript_text in bulk_download(bucket_name, blobs):
+        summary = generate_summary(transcript_text)
 
-            save_summary_to_gcs(bucket_name, blob.name, summary)
-            summary_results[blob.name] = "summary saved"
+        save_summary_to_gcs(bucket_name, blob.name, summary)
+        summary_results[blob.name] = "summary saved"
 
     return {"status": "summaries generated", "details": summary_results}
 
@@ -40,12 +34,6 @@ def save_summary_to_gcs(bucket_name: str, video_name: str, summary: str):
     """
     Save summary text to GCS in summaries/ folder.
     """
-    storage_client = get_client()
-    bucket = storage_client.bucket(bucket_name)
-
     blob_name = f"summaries/{video_name.replace('.txt', '_summary.txt')}"
-    blob = bucket.blob(blob_name)
-
-    blob.upload_from_string(summary, content_type="text/plain")
 
-    return blob_name
\ No newline at end of file
+    return write_bytes(bucket_name, blob_name, summary, content_type="text/plain")
@@ -0,0 +1,210 @@
+"""
+Semantic answer cache for frequently asked course questions.
+
+Students ask many paraphrases of the same question. Before running
+classify → embed → search → generate → Buddy rewrite, the question
+embedding is looked up in the LanceDB `answer_cache` table; an entry close
+enough (cosine similarity >= ANSWER_CACHE_THRESHOLD) is returned as is.
+
+Entries are scoped ("orchestrator" = final Buddy answer, "rag" = plain
+answer_with_rag output) and stamped with the transcripts build id, so a
+/setup run that changes the indexed content invalidates them automatically.
+ANSWER_CACHE_TTL_SECONDS bounds their age regardless.
+
+The question embedding goes through the embedding cache, so a miss costs
+one local vector search — retrieval reuses the same embedding afterwards.
+"""
+
+import os
+import time
+import asyncio
+import threading
+
+import pyarrow as pa
+
+from backend.services.embedding_normalizer import normalize_embedding, normalize_embeddings, to_fixed_size_list
+from backend.services.embedding_utils import get_single_embedding, aget_single_embedding
+from backend.services.request_trace import trace_span
+from backend.services.retrieval_filters import extract_video_filter
+from backend.services import vector_store_lance as store
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") == "1"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+# Intents whose answers do not depend on the user (memory answers are personal)
+ANSWER_CACHE_INTENTS = set(
+    os.getenv("ANSWER_CACHE_INTENTS", "course_rag,general_ai,code_help,notes").split(",")
+)
+# Purge expired rows every N stores
+ANSWER_CACHE_PURGE_EVERY = int(os.getenv("ANSWER_CACHE_PURGE_EVERY", "200"))
+
+
+def is_cacheable_answer(answer: str) -> bool:
+    """Skip empty answers and tool failures/timeouts."""
+    return bool(answer) and not answer.startswith(("[tool-", "[buddy-error]", "Sorry"))
+
+
+def is_cacheable_question(question: str) -> bool:
+    """
+    "Notes for video 3" and "notes for video 4" embed almost identically;
+    questions scoped to a video bypass the cache.
+    """
+    return extract_video_filter(question) is None
+
+
+class AnswerCache:
+    def __init__(self, threshold: float = ANSWER_CACHE_THRESHOLD, ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS,
+                 enabled: bool = ANSWER_CACHE_ENABLED):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._last_version = None
+        self._stores = 0
+        self.stats = {"lookups": 0, "hits": 0, "misses": 0, "stores": 0, "errors": 0,
+                      "saved_ms": 0.0, "lookup_ms": 0.0}
+
+    # ---- lookup ----
+    def lookup(self, question: str, scope: str) -> str | None:
+        """Return a cached answer for a paraphrase of `question`, or None."""
+        if not self.enabled or not is_cacheable_question(question):
+            return None
+        t0 = time.perf_counter()
+        try:
+            embedding = get_single_embedding(question)
+        except Exception as e:
+            print("Answer cache embedding error:", e)
+            return None
+        return self._search(embedding, scope, t0)
+
+    async def alookup(self, question: str, scope: str) -> str | None:
+        if not self.enabled or not is_cacheable_question(question):
+            return None
+        t0 = time.perf_counter()
+        try:
+            embedding = await aget_single_embedding(question)
+        except Exception as e:
+            print("Answer cache embedding error:", e)
+            return None
+        return await asyncio.to_thread(self._search, embedding, scope, t0)
+
+    def _search(self, embedding, scope: str, t0: float) -> str | None:
+        with trace_span("cache", "answer_cache_lookup", scope=scope) as span:
+            try:
+                version = store.transcript_index_version()
+                self._purge_old_versions(version)
+                cutoff = time.time() - self.ttl_seconds
+
+                rows = (
+                    store.get_answer_cache_table()
+                    .search(normalize_embedding(embedding), vector_column_name="embedding")
+                    .where(f"scope = '{scope}' AND index_version = {version} AND created_at >= {cutoff}",
+                           prefilter=True)
+                    .select(["answer", "latency_ms"])
+                    .limit(1)
+                    .to_list()
+                )
+            except Exception as e:
+                print("Answer cache lookup error:", e)
+                self._count("errors")
+                rows = []
+
+            lookup_ms = (time.perf_counter() - t0) * 1000
+            # unit-length vectors: squared L2 distance d = 2 - 2·cos
+            similarity = 1 - rows[0]["_distance"] / 2 if rows else 0.0
+            hit = similarity >= self.threshold
+
+            with self._lock:
+                self.stats["lookups"] += 1
+                self.stats["lookup_ms"] += lookup_ms
+                if hit:
+                    self.stats["hits"] += 1
+                    self.stats["saved_ms"] += max(0.0, rows[0]["latency_ms"] - lookup_ms)
+                else:
+                    self.stats["misses"] += 1
+
+            if span is not None:
+                span["status"] = "hit" if hit else "miss"
+                span["similarity"] = round(similarity, 4)
+
+        return rows[0]["answer"] if hit else None
+
+    # ---- store ----
+    def store(self, question: str, answer: str, scope: str, latency_ms: float):
+        """Remember an answer; latency_ms is what a later hit saves."""
+        if not self.enabled or not is_cacheable_answer(answer) or not is_cacheable_question(question):
+            return
+        try:
+            embedding = normalize_embeddings(get_single_embedding(question))
+            store.get_answer_cache_table().add(pa.Table.from_pydict({
+                "question": [question],
+                "answer": [answer],
+                "scope": [scope],
+                "index_version": [store.transcript_index_version()],
+                "created_at": [time.time()],
+                "latency_ms": [float(latency_ms)],
+                "embedding": to_fixed_size_list(embedding),
+            }, schema=store.ANSWER_CACHE_SCHEMA))
+        except Exception as e:
+            print("Answer cache store error:", e)
+            self._count("errors")
+            return
+
+        self._count("stores")
+        with self._lock:
+            self._stores += 1
+            purge = self._stores % ANSWER_CACHE_PURGE_EVERY == 0
+        if purge:
+            self.purge_expired()
+
+    async def astore(self, question: str, answer: str, scope: str, latency_ms: float):
+        # the embedding is already in the embedding cache from lookup → no API call
+        await asyncio.to_thread(self.store, question, answer, scope, latency_ms)
+
+    # ---- invalidation ----
+    def _purge_old_versions(self, version: int):
+        """
+        Drop entries built on an older transcripts index (once per build id
+        change). Build ids only grow, so a worker that has not seen the newest
+        build yet never deletes entries stamped by one that has.
+        """
+        if version == self._last_version:
+            return
+        with self._lock:
+            if version == self._last_version:
+                return
+            self._last_version = version
+        try:
+            store.get_answer_cache_table().delete(f"index_version < {version}")
+        except Exception as e:
+            print("Answer cache purge error:", e)
+
+    def purge_expired(self):
+        try:
+            store.get_answer_cache_table().delete(f"created_at < {time.time() - self.ttl_seconds}")
+        except Exception as e:
+            print("Answer cache purge error:", e)
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def metrics(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["lookups"] or 1
+        return {
+            **stats,
+            "saved_ms": round(stats["saved_ms"], 1),
+            "lookup_ms": round(stats["lookup_ms"], 1),
+            "hit_rate": round(stats["hits"] / lookups, 4),
+            "avg_lookup_ms": round(stats["lookup_ms"] / lookups, 2),
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+# Shared process-wide cache
+answer_cache = AnswerCache()
@@ -0,0 +1,96 @@
+"""
+In-process BM25 keyword index over transcript chunks.
+
+Vector search is weak on the exact terms students type (tool names, API
+names, "CrewAI", error strings). BM25 scores those directly, without an
+embedding round-trip. The index is tiny next to the vectors (one postings
+list per term), so it is built in memory from the `chunk` column and
+rebuilt when the transcripts table gets a new version.
+
+    index = BM25Index(chunks)
+    index.search("ModuleNotFoundError crewai", top_k=5)  # -> [(doc_id, score), ...]
+"""
+
+import re
+from collections import defaultdict
+
+import numpy as np
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# keep identifiers like "text-embedding-3-small" / "create_index" / "gpt-4o" intact
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[_\-.][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> list[str]:
+    tokens = _TOKEN_RE.findall(text.lower())
+    # also index the parts of compound tokens so "embedding" matches "text-embedding-3-small"
+    parts = [p for t in tokens if not t.isalnum() for p in re.split(r"[_\-.]", t)]
+    return tokens + parts
+
+
+class BM25Index:
+    def __init__(self, docs: list[str], k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.num_docs = len(docs)
+
+        postings = defaultdict(dict)  # term -> {doc_id: tf}
+        doc_len = np.zeros(self.num_docs, dtype=np.float32)
+        for doc_id, doc in enumerate(docs):
+            tokens = tokenize(doc or "")
+            doc_len[doc_id] = len(tokens)
+            for tok in tokens:
+                tf = postings[tok]
+                tf[doc_id] = tf.get(doc_id, 0) + 1
+
+        avg_len = float(doc_len.mean()) if self.num_docs else 0.0
+        # per-doc length normalisation, precomputed once
+        self._norm = k1 * (1 - b + b * doc_len / avg_len) if avg_len else np.full(self.num_docs, k1, dtype=np.float32)
+
+        self._postings = {}
+        for term, tfs in postings.items():
+            ids = np.fromiter(tfs.keys(), dtype=np.int32, count=len(tfs))
+            freqs = np.fromiter(tfs.values(), dtype=np.float32, count=len(tfs))
+            idf = np.log(1 + (self.num_docs - len(ids) + 0.5) / (len(ids) + 0.5))
+            self._postings[term] = (ids, freqs, np.float32(idf))
+
+    def search(self, query: str, top_k: int = 5, allowed: np.ndarray | None = None) -> list[tuple[int, float]]:
+        """
+        Return up to top_k (doc_id, score) pairs, best first; only docs sharing a term.
+        allowed: optional boolean mask over doc ids (metadata filter).
+        """
+        if not self.num_docs:
+            return []
+
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            ids, freqs, idf = posting
+            scores[ids] += idf * freqs * (self.k1 + 1) / (freqs + self._norm[ids])
+        if allowed is not None:
+            scores[~allowed] = 0
+
+        matched = np.flatnonzero(scores)
+        if matched.size == 0:
+            return []
+        if matched.size > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(int(i), float(scores[i])) for i in matched]
+
+
+def reciprocal_rank_fusion(rankings: list[list], k: int = 60, top_k: int | None = None) -> list:
+    """
+    Fuse several ranked lists of keys: score(key) = sum(1 / (k + rank)).
+    Rank-based, so BM25 scores and vector distances need no calibration.
+    """
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            fused[key] += 1.0 / (k + rank)
+    ordered = sorted(fused, key=fused.get, reverse=True)
+    return ordered if top_k is None else ordered[:top_k]
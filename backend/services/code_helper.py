@@ -1,7 +1,5 @@
-from openai import OpenAI
-import os
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from backend.services.request_trace import trace_span
+from backend.services.openai_clients import client, async_client
 
 def answer_code_question(question: str) -> str:
     # response = client.chat.completions.create(
@@ -14,13 +12,29 @@ def answer_code_question(question: str) -> str:
     # )
     # return response.choices[0].message.content
 
-    response = client.responses.create(
-        model="gpt-4o-mini",
-        input=[
-            {"role": "system", "content": "You are a python and cloud expert. Explain clearly and concisely."},
-            {"role": "user", "content": question}
-        ],
-        max_output_tokens=300
-    )
+    with trace_span("llm", "code_help"):
+        response = client.responses.create(
+            model="gpt-4o-mini",
+            input=_code_help_input(question),
+            max_output_tokens=300
+        )
+
+    return response.output_text
+
+
+async def aanswer_code_question(question: str) -> str:
+    with trace_span("llm", "code_help"):
+        response = await async_client.responses.create(
+            model="gpt-4o-mini",
+            input=_code_help_input(question),
+            max_output_tokens=300
+        )
+
+    return response.output_text
+
 
-    return response.output_text
\ No newline at end of file
+def _code_help_input(question: str) -> list:
+    return [
+        {"role": "system", "content": "You are a python and cloud expert. Explain clearly and concisely."},
+        {"role": "user", "content": question}
+    ]
@@ -0,0 +1,101 @@
+"""
+Token-budgeted context assembly for RAG prompts.
+
+Chunks arrive best-first from retrieval. pack_context() walks them in that
+order and:
+  - drops near-duplicates of an already kept chunk (overlap regions, the
+    same intro repeated across videos), measured by word-shingle containment
+  - stops once CONTEXT_TOKEN_BUDGET is used; the last chunk that does not
+    fit is cut to the remaining budget when enough room is left
+
+and reports the token counts, both in the return value and on the active
+request trace.
+"""
+
+import os
+
+from backend.services.text_chunker import ENCODER, count_tokens
+from backend.services.request_trace import trace_span
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+# A chunk is a near-duplicate when this share of its shingles already appears in a kept chunk
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))
+# Don't bother adding a truncated tail shorter than this many tokens
+CONTEXT_MIN_PARTIAL_TOKENS = int(os.getenv("CONTEXT_MIN_PARTIAL_TOKENS", "80"))
+SHINGLE_WORDS = 5
+
+
+def _shingles(text: str) -> set:
+    words = text.lower().split()
+    if len(words) <= SHINGLE_WORDS:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def _is_near_duplicate(shingles: set, kept: list, threshold: float) -> bool:
+    if not shingles:
+        return True  # blank chunk
+    for other in kept:
+        overlap = len(shingles & other)
+        if overlap and overlap / len(shingles) >= threshold:
+            return True
+    return False
+
+
+def _format(chunk) -> str:
+    """RetrievedChunk hits get a source line so answers can cite the video."""
+    source = getattr(chunk, "source", None)
+    text = getattr(chunk, "text", chunk)
+    return f"[Source: {source}]\n{text}" if source else text
+
+
+def pack_context(chunks: list, budget_tokens: int | None = None,
+                 dedup_threshold: float = CONTEXT_DEDUP_THRESHOLD) -> tuple[str, dict]:
+    """
+    Pack best-first chunks (str or RetrievedChunk) into a token budget.
+    Returns (context_text, stats).
+    """
+    budget = CONTEXT_TOKEN_BUDGET if budget_tokens is None else budget_tokens
+    sep_tokens = count_tokens("\n\n")
+
+    with trace_span("context", "pack_context") as span:
+        parts = []
+        kept_shingles = []
+        used = 0
+        duplicates = 0
+        truncated = 0
+
+        for chunk in chunks:
+            shingles = _shingles(getattr(chunk, "text", chunk))
+            if _is_near_duplicate(shingles, kept_shingles, dedup_threshold):
+                duplicates += 1
+                continue
+
+            block = _format(chunk)
+            tokens = ENCODER.encode(block)
+            cost = len(tokens) + (sep_tokens if parts else 0)
+
+            if used + cost > budget:
+                room = budget - used - (sep_tokens if parts else 0)
+                if room >= CONTEXT_MIN_PARTIAL_TOKENS:
+                    parts.append(ENCODER.decode(tokens[:room]))
+                    used += room + (sep_tokens if len(parts) > 1 else 0)
+                    truncated += 1
+                break
+
+            parts.append(block)
+            kept_shingles.append(shingles)
+            used += cost
+
+        stats = {
+            "chunks_in": len(chunks),
+            "chunks_used": len(parts),
+            "duplicates_dropped": duplicates,
+            "truncated": truncated,
+            "context_tokens": used,
+            "budget_tokens": budget,
+        }
+        if span is not None:
+            span.update(stats)
+
+    return "\n\n".join(parts), stats
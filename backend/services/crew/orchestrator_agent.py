@@ -6,8 +6,8 @@ demo can show agent roles, goals, and tools), but runs a deterministic
 agentic pipeline by invoking the relevant tools in a controlled way.
 
 Flow:
-  1. Reasoner step (decide intent) — uses router.route_question() for robust routing
-  2. Based on intent, run the corresponding tool:
+  1. Reasoner step (decide intent) — classify only, via classify_intent()
+  2. Based on intent, run exactly one corresponding tool:
        - course_rag  -> RAGRetrievalTool
        - code_help   -> CodeSearchTool
        - notes       -> SummaryTool
@@ -21,15 +21,12 @@ construct the Agent objects for demo purposes), but avoids relying on an
 uncertain Crew runtime in Cloud Run.
 """
 
-from typing import Tuple
+from typing import AsyncIterator, Tuple
+import asyncio
 import traceback
-import threading
 import time
 import os
 
-from openai import OpenAI
-from dotenv import load_dotenv
-
 # keep the agent builders for demo visibility
 from backend.services.crew.retriever_agent import build_retriever_agent
 from backend.services.crew.reasoner_agent import build_reasoner_agent
@@ -42,13 +39,19 @@ from backend.services.agent_tools import (
     SummaryTool,
     MemoryTool,
 )
-from backend.services.router import route_question
+from backend.services.intent_classifier import classify_intent, aclassify_intent
+from backend.services.router import answer_general_question, aanswer_general_question
+from backend.services.rag_engine import aanswer_with_rag
+from backend.services.code_helper import aanswer_code_question
+from backend.services.summary_service import agenerate_summary_for_question
+from backend.services.memory_store import recall_memory
+from backend.services.request_trace import start_trace, current_trace, trace_span
 
-load_dotenv(override=True)
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from backend.services.openai_clients import client, async_client
 
-# Optional: configurable tool timeout in seconds (ensures no long blocking)
-TOOL_TIMEOUT_SECONDS = int(os.getenv("TOOL_TIMEOUT_SECONDS", "12"))
+# Bounded tool execution (timeouts: TOOL_TIMEOUT_SECONDS / TOOL_TIMEOUTS env)
+from backend.services.tool_executor import tool_executor
+from backend.services.answer_cache import answer_cache, is_cacheable_answer, ANSWER_CACHE_INTENTS
 
 
 class CrewOrchestrator:
@@ -81,36 +84,54 @@ class CrewOrchestrator:
         self.memory_tool = MemoryTool()
 
     # internal helper to call a tool with timeout
-    def _run_tool_with_timeout(self, tool_callable, arg: str) -> str:
+    def _run_tool_with_timeout(self, tool_callable, arg: str, tool_name: str = "tool") -> str:
         """
-        Run tool_callable(arg) but enforce timeout to avoid app hangs.
-        tool_callable should be a callable returning str.
+        Run tool_callable(arg) on the shared bounded executor with the
+        tool's timeout. Never spawns a thread per call; rejects fast when saturated.
         """
+        return tool_executor.run_sync(tool_name, tool_callable, arg)
 
-        result_container = {"result": None, "error": None}
-
-        def target():
-            try:
-                result_container["result"] = tool_callable(arg)
-            except Exception as e:
-                result_container["error"] = str(e) + "\n" + traceback.format_exc()
-
-        thread = threading.Thread(target=target, daemon=True)
-        thread.start()
-        thread.join(TOOL_TIMEOUT_SECONDS)
-
-        if thread.is_alive():
-            # tool timed out
-            return f"[tool-timeout] The tool did not finish within {TOOL_TIMEOUT_SECONDS}s."
-        if result_container["error"] is not None:
-            return f"[tool-error] {result_container['error']}"
-        return result_container["result"] or ""
-
-    def _buddy_rewrite(self, question: str, intermediate_answer: str) -> str:
+    def _tool_for_intent(self, intent: str):
         """
-        Rewrites the intermediate_answer using Buddy persona and Hinglish rules.
+        Map an intent to (tool_name, callable). Unknown intents fall back to RAG.
+        """
+        if intent in ("course_rag", "fallback"):
+            return "rag_retrieval", self.rag_tool._run
+        if intent == "code_help":
+            return "code_helper", self.code_tool._run
+        if intent in ("notes", "notes_request"):
+            return "notes_generator", self.notes_tool._run
+        if intent == "memory":
+            return "memory_recall", self.memory_tool._run
+        if intent == "general_ai":
+            return "general_llm", answer_general_question
+        return "rag_retrieval", self.rag_tool._run
+
+    def _atool_for_intent(self, intent: str):
+        """
+        Async counterpart of _tool_for_intent: same tool names, but each
+        callable is a coroutine function on the shared async OpenAI client.
+        """
+        if intent in ("course_rag", "fallback"):
+            return "rag_retrieval", aanswer_with_rag
+        if intent == "code_help":
+            return "code_helper", aanswer_code_question
+        if intent in ("notes", "notes_request"):
+            return "notes_generator", agenerate_summary_for_question
+        if intent == "memory":
+            return "memory_recall", lambda q: asyncio.to_thread(recall_memory, q)
+        if intent == "general_ai":
+            return "general_llm", aanswer_general_question
+        return "rag_retrieval", aanswer_with_rag
+
+    async def _arun_tool_with_timeout(self, tool_coro_fn, arg: str, tool_name: str = "tool") -> str:
         """
+        Await tool_coro_fn(arg) on the shared executor. On timeout the task is
+        cancelled, which also aborts its in-flight HTTP request.
+        """
+        return await tool_executor.run_async(tool_name, tool_coro_fn, arg)
 
+    def _buddy_messages(self, question: str, intermediate_answer: str, history: list | None = None) -> list:
         # The same persona template you used before; keep it concise
         system_prompt = f"""
 You are HAI Buddy — a friendly male buddy who explains concepts in a casual, simple, and helpful way.
@@ -123,90 +144,257 @@ User question:
 {question}
 Final rewritten answer:
 """
+        # earlier turns of this session, so follow-ups ("and in Hindi?") read naturally
+        turns = []
+        for turn in history or []:
+            turns.append({"role": "user", "content": turn["user"]})
+            turns.append({"role": "assistant", "content": turn["assistant"]})
+        return [
+            {"role": "system", "content": system_prompt},
+            *turns,
+            {"role": "user", "content": question}
+        ]
+
+    def _buddy_rewrite(self, question: str, intermediate_answer: str) -> str:
+        """
+        Rewrites the intermediate_answer using Buddy persona and Hinglish rules.
+        """
         try:
-            resp = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": question}
-                ],
-                max_tokens=250
-            )
+            with trace_span("llm", "buddy_rewrite"):
+                resp = client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=self._buddy_messages(question, intermediate_answer),
+                    max_tokens=250
+                )
             final = resp.choices[0].message.content.strip()
             return final
         except Exception as e:
             # never crash — return intermediate if LLM fails
             return intermediate_answer or f"[buddy-error] {str(e)}"
 
+    async def _abuddy_rewrite(self, question: str, intermediate_answer: str, history: list | None = None) -> str:
+        try:
+            with trace_span("llm", "buddy_rewrite"):
+                resp = await async_client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=self._buddy_messages(question, intermediate_answer, history),
+                    max_tokens=250
+                )
+            return resp.choices[0].message.content.strip()
+        except Exception as e:
+            return intermediate_answer or f"[buddy-error] {str(e)}"
+
+    async def _abuddy_rewrite_stream(self, question: str, intermediate_answer: str, history: list | None = None):
+        """
+        Streaming variant of _buddy_rewrite: yields text deltas as OpenAI
+        produces them (stream=True). Falls back to the intermediate answer
+        if the call fails before any token was sent.
+        """
+        sent_any = False
+        try:
+            with trace_span("llm", "buddy_rewrite", stream=True) as span:
+                stream = await async_client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=self._buddy_messages(question, intermediate_answer, history),
+                    max_tokens=250,
+                    stream=True
+                )
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        if not sent_any and span is not None:
+                            # time-to-first-token, measured from the start of the request
+                            span["first_token_ms"] = round(
+                                (time.perf_counter() - current_trace().started) * 1000, 1
+                            )
+                        sent_any = True
+                        yield delta
+        except Exception as e:
+            if not sent_any:
+                yield intermediate_answer or f"[buddy-error] {str(e)}"
+
     def run(self, question: str) -> str:
         """
         Execute the agentic flow and return final answer (string).
         This method is safe for use on Cloud Run / SSE — it will always
         return a string and never hang indefinitely (tool timeouts).
         """
+        answer, _ = self.run_with_trace(question)
+        return answer
+
+    def run_with_trace(self, question: str) -> Tuple[str, dict]:
+        """
+        Same as run(), but also returns the per-request trace:
+        every LLM / embedding / tool call with its latency.
+        """
+        trace = start_trace("orchestrator")
+        answer = self._run(question)
+        summary = trace.to_dict()
+        print(
+            f"[Orchestrator] trace: llm_calls={summary['llm_calls']} "
+            f"embedding_calls={summary['embedding_calls']} total_ms={summary['total_ms']}"
+        )
+        return answer, summary
+
+    def _intermediate_answer(self, question: str, on_event=None) -> Tuple[str, str]:
+        """
+        Steps 1-2: classify, then run the one tool for that intent.
+        on_event (optional) receives {"type": "intent", ...} once routing is decided.
+        Returns (intent, intermediate_answer).
+        """
+        # 1) Reasoner: classify only — the tool runs once, below
+        intent = classify_intent(question)
+        print(f"[Orchestrator] Reasoner routing result: intent={intent}")
+
+        # 2) Delegate to the one tool for this intent
+        tool_name, tool_callable = self._tool_for_intent(intent)
+        if on_event is not None:
+            on_event({"type": "intent", "intent": intent, "tool": tool_name})
+        print(f"[Orchestrator] Delegating to {tool_name}")
+        intermediate_answer = self._run_tool_with_timeout(tool_callable, question, tool_name)
+
+        # Ensure we have some reply
+        if not intermediate_answer:
+            intermediate_answer = "Sorry, I couldn't find information to answer that."
+        return intent, intermediate_answer
+
+    async def _aintermediate_answer(self, question: str, on_event=None) -> Tuple[str, str]:
+        """
+        Async steps 1-2 (classify, run one tool). Returns (intent, intermediate_answer).
+        """
+        intent = await aclassify_intent(question)
+        print(f"[Orchestrator] Reasoner routing result: intent={intent}")
+
+        tool_name, tool_coro_fn = self._atool_for_intent(intent)
+        if on_event is not None:
+            on_event({"type": "intent", "intent": intent, "tool": tool_name})
+        print(f"[Orchestrator] Delegating to {tool_name}")
+        intermediate_answer = await self._arun_tool_with_timeout(tool_coro_fn, question, tool_name)
+
+        if not intermediate_answer:
+            intermediate_answer = "Sorry, I couldn't find information to answer that."
+        return intent, intermediate_answer
+
+    @staticmethod
+    def _cacheable(intent: str, intermediate_answer: str) -> bool:
+        return intent in ANSWER_CACHE_INTENTS and is_cacheable_answer(intermediate_answer)
 
+    async def arun(self, question: str, history: list | None = None) -> str:
+        """
+        Async run(): awaits OpenAI on the shared async client, so many
+        concurrent questions are served from one event loop.
+        history: earlier turns of the session ([{"user", "assistant"}]) for the Buddy rewrite.
+        """
+        answer, _ = await self.arun_with_trace(question, history)
+        return answer
+
+    async def arun_with_trace(self, question: str, history: list | None = None) -> Tuple[str, dict]:
+        trace = start_trace("orchestrator")
+        # the cache is shared by all sessions and keyed on the question alone:
+        # follow-ups ("explain that again") and history-shaped answers bypass it
+        use_cache = not history
         try:
-            # 1) Reasoner: call router to decide which tool to use
-            # route_question returns (answer, intent)
-            routed_answer, intent = route_question(question)
-            # route_question itself may already run RAG or LLM for some intents.
-            # We'll still interpret intent and (re)invoke the right tool to show delegation.
-            # Log the decision (useful for demo)
-            print(f"[Orchestrator] Reasoner routing result: intent={intent}")
-
-            intermediate_answer = None
-
-            # 2) Delegate to appropriate tool based on intent
-            if intent in ("course_rag", "fallback"):
-                print("[Orchestrator] Delegating to RAGRetrievalTool")
-                intermediate_answer = self._run_tool_with_timeout(
-                    lambda q: self.rag_tool._run(q), question
-                )
+            answer = await answer_cache.alookup(question, "orchestrator") if use_cache else None
+            if answer is None:
+                intent, intermediate_answer = await self._aintermediate_answer(question)
+                answer = await self._abuddy_rewrite(question, intermediate_answer, history)
+                if use_cache and self._cacheable(intent, intermediate_answer):
+                    await answer_cache.astore(question, answer, "orchestrator",
+                                              (time.perf_counter() - trace.started) * 1000)
+        except Exception as exc:
+            print("[Orchestrator] Fatal error:", exc, traceback.format_exc())
+            answer = f"Sorry — the orchestrator encountered an error: {str(exc)}"
 
-            elif intent == "code_help":
-                print("[Orchestrator] Delegating to CodeSearchTool")
-                intermediate_answer = self._run_tool_with_timeout(
-                    lambda q: self.code_tool._run(q), question
-                )
+        summary = trace.to_dict()
+        print(
+            f"[Orchestrator] trace: llm_calls={summary['llm_calls']} "
+            f"embedding_calls={summary['embedding_calls']} total_ms={summary['total_ms']}"
+        )
+        return answer, summary
 
-            elif intent in ("notes", "notes_request"):
-                print("[Orchestrator] Delegating to SummaryTool")
-                intermediate_answer = self._run_tool_with_timeout(
-                    lambda q: self.notes_tool._run(q), question
-                )
+    async def astream(self, question: str, history: list | None = None) -> AsyncIterator[dict]:
+        """
+        Async streaming API (history as in arun). Yields events as the pipeline progresses:
+          {"type": "intent", "intent": ..., "tool": ...}   routing decided
+          {"type": "step", "kind": ..., "name": ..., ...}  a traced call finished
+                                                            (retrieval, tool, llm, ...)
+          {"type": "answer_delta", "text": ...}            Buddy rewrite tokens
+          {"type": "answer_done", "text": ..., "trace": {...}}
+          {"type": "error", "message": ...}
+        The pipeline runs as an asyncio task; events (including spans that
+        finish inside worker threads) reach the caller through an asyncio.Queue
+        as soon as they happen.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        done = object()
 
-            elif intent == "memory":
-                print("[Orchestrator] Delegating to MemoryTool")
-                intermediate_answer = self._run_tool_with_timeout(
-                    lambda q: self.memory_tool._run(q), question
-                )
+        def push(event):
+            loop.call_soon_threadsafe(queue.put_nowait, event)
 
-            elif intent == "general_ai":
-                # For general AI, route_question already returned an LLM-based answer in `routed_answer`
-                # but we call a direct LLM as a "tool" to make delegation explicit in logs.
-                print("[Orchestrator] Delegating to general LLM (direct)")
-                intermediate_answer = self._run_tool_with_timeout(
-                    lambda q: route_question(q)[0], question
-                )
+        async def pipeline():
+            trace = start_trace("orchestrator_stream")
+            trace.listener = lambda span: push({"type": "step", **span})
+            try:
+                # shared, question-keyed cache: bypassed when the session has history (see arun_with_trace)
+                cached = await answer_cache.alookup(question, "orchestrator") if not history else None
+                if cached is not None:
+                    push({"type": "intent", "intent": "cached", "tool": "answer_cache"})
+                    push({"type": "answer_delta", "text": cached})
+                    push({"type": "answer_done", "text": cached, "trace": trace.to_dict()})
+                    return
+
+                intent, intermediate_answer = await self._aintermediate_answer(question, on_event=push)
+                parts = []
+                async for delta in self._abuddy_rewrite_stream(question, intermediate_answer, history):
+                    parts.append(delta)
+                    push({"type": "answer_delta", "text": delta})
+                answer = "".join(parts).strip()
+                elapsed_ms = (time.perf_counter() - trace.started) * 1000
+                push({"type": "answer_done", "text": answer, "trace": trace.to_dict()})
+                if not history and self._cacheable(intent, intermediate_answer):
+                    await answer_cache.astore(question, answer, "orchestrator", elapsed_ms)
+            except Exception as exc:
+                print("[Orchestrator] Fatal error:", exc, traceback.format_exc())
+                push({"type": "error", "message": f"Sorry — the orchestrator encountered an error: {str(exc)}"})
+            finally:
+                push(done)
+
+        task = asyncio.create_task(pipeline())
+        try:
+            while True:
+                event = await queue.get()
+                if event is done:
+                    break
+                yield event
+        finally:
+            # client went away mid-stream: stop the pipeline (and its HTTP calls)
+            if not task.done():
+                task.cancel()
+
+    def _run(self, question: str) -> str:
+        try:
+            t0 = time.perf_counter()
 
-            else:
-                # Fallback: use route_question's returned answer, but also attempt RAG
-                print("[Orchestrator] Unknown intent — using routed answer and falling back to RAG")
-                intermediate_answer = routed_answer or self._run_tool_with_timeout(
-                    lambda q: self.rag_tool._run(q), question
-                )
+            # 0) Semantic answer cache (paraphrases of earlier questions)
+            cached = answer_cache.lookup(question, "orchestrator")
+            if cached is not None:
+                return cached
 
-            # Ensure we have some reply
-            if not intermediate_answer:
-                intermediate_answer = "Sorry, I couldn't find information to answer that."
+            intent, intermediate_answer = self._intermediate_answer(question)
 
             # 3) Buddy rewrite (persona)
             final_answer = self._buddy_rewrite(question, intermediate_answer)
 
+            if self._cacheable(intent, intermediate_answer):
+                answer_cache.store(question, final_answer, "orchestrator", (time.perf_counter() - t0) * 1000)
+
             # 4) Return final answer
             return final_answer
 
         except Exception as exc:
             print("[Orchestrator] Fatal error:", exc, traceback.format_exc())
             # Safe fallback text
-            return f"Sorry — the orchestrator encountered an error: {str(exc)}"
\ No newline at end of file
+            return f"Sorry — the orchestrator encountered an error: {str(exc)}"
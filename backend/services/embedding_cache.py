@@ -0,0 +1,141 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+# ---------------------------------------------------------
+# Config
+# ---------------------------------------------------------
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "10000"))
+EMBEDDING_CACHE_TTL_SECONDS = float(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+# Optional SQLite file so the cache survives restarts (empty = memory only)
+EMBEDDING_CACHE_DB = os.getenv("EMBEDDING_CACHE_DB", "")
+
+
+def normalize_text(text: str) -> str:
+    """Case- and whitespace-insensitive form used for cache keys."""
+    return " ".join(text.split()).casefold()
+
+
+def cache_key(text: str, model: str) -> str:
+    return hashlib.sha256(f"{model}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-level embedding cache:
+      1. bounded in-memory LRU with TTL
+      2. optional SQLite store (read-through / write-through)
+
+    Thread-safe; one instance is shared by the query and ingestion paths.
+    """
+
+    def __init__(self, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = EMBEDDING_CACHE_TTL_SECONDS,
+                 persist_path: str = EMBEDDING_CACHE_DB):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (created_at, vector)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+        self._conn = None
+        if persist_path:
+            os.makedirs(os.path.dirname(os.path.abspath(persist_path)), exist_ok=True)
+            self._conn = sqlite3.connect(persist_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY, model TEXT, vector BLOB, created_at REAL)"
+            )
+            self._conn.commit()
+
+    # ---- internal helpers (caller holds the lock) ----
+    def _remember(self, key: str, created_at: float, vector):
+        self._entries[key] = (created_at, vector)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _lookup(self, key: str, now: float):
+        entry = self._entries.get(key)
+        if entry is not None:
+            if now - entry[0] <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[1]
+            del self._entries[key]
+            self.stats["expired"] += 1
+
+        if self._conn is not None:
+            row = self._conn.execute(
+                "SELECT vector, created_at FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] <= self.ttl_seconds:
+                # read-only view over the blob, no per-float boxing
+                vector = np.frombuffer(row[0], dtype=np.float32)
+                self._remember(key, row[1], vector)
+                self.stats["disk_hits"] += 1
+                return vector
+
+        self.stats["misses"] += 1
+        return None
+
+    # ---- public API ----
+    def get(self, text: str, model: str):
+        with self._lock:
+            return self._lookup(cache_key(text, model), time.time())
+
+    def get_many(self, texts: list[str], model: str) -> list:
+        """Returns a list aligned with texts; None where not cached."""
+        now = time.time()
+        with self._lock:
+            return [self._lookup(cache_key(t, model), now) for t in texts]
+
+    def put(self, text: str, model: str, vector):
+        self.put_many([text], model, [vector])
+
+    def put_many(self, texts: list[str], model: str, vectors: list):
+        now = time.time()
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = cache_key(text, model)
+                vector = np.asarray(vector, dtype=np.float32)
+                self._remember(key, now, vector)
+                if self._conn is not None:
+                    blob = vector.tobytes()
+                    rows.append((key, model, blob, now))
+
+            if rows:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, model, vector, created_at) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM embeddings")
+                self._conn.commit()
+
+    def metrics(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["disk_hits"] + self.stats["misses"]
+        hit_rate = (self.stats["hits"] + self.stats["disk_hits"]) / lookups if lookups else 0.0
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "hit_rate": round(hit_rate, 4),
+            "persistent": self._conn is not None,
+        }
+
+
+# Shared process-wide instance
+embedding_cache = EmbeddingCache()
@@ -1,17 +1,51 @@
+import os
+
 import numpy as np
+import pyarrow as pa
+
+# OpenAI embeddings are already unit length; set to 1 for models that are not.
+# Applied on both the write and the query side so distances stay comparable.
+EMBEDDING_L2_NORMALIZE = os.getenv("EMBEDDING_L2_NORMALIZE", "0") == "1"
+
 
-def normalize_embedding(emb):
+def normalize_embedding(emb, l2: bool = EMBEDDING_L2_NORMALIZE) -> np.ndarray:
     """
     Accepts emb in any of these forms:
     - Python list
     - float list
-    - numpy array
-    - OpenAI embedding object
-    Returns: Python list[float32]
+    - numpy array (returned as is when already float32, no copy)
+    Returns: 1-d float32 numpy array (LanceDB search takes it directly)
+    """
+    arr = np.asarray(emb, dtype=np.float32).reshape(-1)
+    if l2:
+        norm = np.linalg.norm(arr)
+        if norm:
+            arr = arr / norm
+    return arr
+
+
+def normalize_embeddings(embs, l2: bool = EMBEDDING_L2_NORMALIZE) -> np.ndarray:
+    """
+    Many embeddings → one contiguous (n, dim) float32 matrix.
+    A matrix that is already float32 and C-contiguous is not copied;
+    a list of vectors is stacked once. L2 normalisation is one vectorized pass.
+    """
+    matrix = np.ascontiguousarray(embs, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1) if matrix.size else matrix.reshape(0, 0)
+    if l2 and matrix.size:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix = matrix / norms
+    return matrix
+
+
+def to_fixed_size_list(matrix: np.ndarray) -> pa.FixedSizeListArray:
+    """
+    (n, dim) float32 matrix → Arrow FixedSizeList<float32, dim> column.
+    The values buffer wraps the numpy memory (zero-copy) instead of boxing
+    n * dim Python floats.
     """
-    try:
-        arr = np.array(emb, dtype=np.float32)
-        return arr.tolist()
-    except Exception:
-        # fallback: try manual conversion
-        return [float(x) for x in emb]
\ No newline at end of file
+    matrix = normalize_embeddings(matrix, l2=False)
+    values = pa.array(matrix.reshape(-1), type=pa.float32())
+    return pa.FixedSizeListArray.from_arrays(values, matrix.shape[1])
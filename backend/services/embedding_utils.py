@@ -1,19 +1,37 @@
-import os
-import httpx
-from openai import OpenAI
-from dotenv import load_dotenv
-
-load_dotenv(override=True)
-# client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-client = OpenAI(
-    api_key=os.getenv("OPENAI_API_KEY"),
-    http_client=httpx.Client(proxies={})
+import time
+import numpy as np
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    RateLimitError,
 )
 
+from backend.services.embedding_cache import embedding_cache
+from backend.services.request_trace import trace_span
+from backend.services.openai_clients import client, async_client
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIM = 1536
+
+# Errors worth retrying: throttling and transient network / server failures
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
+
+
+def _response_matrix(response) -> np.ndarray:
+    """Embeddings response → read-only (n, dim) float32 matrix, in input order."""
+    matrix = np.array([item.embedding for item in response.data], dtype=np.float32)
+    # rows are shared with embedding_cache; guard them against in-place edits
+    matrix.flags.writeable = False
+    return matrix
+
 
 def get_embedding(text_chunks: list[str]):
     """
-    Accepts a list of strings (chunks) and returns list of embedding vectors.
+    Accepts a list of strings (chunks) and returns an (n, dim) float32 matrix,
+    one row per non-blank chunk.
+    Cached chunks are served from embedding_cache; only misses hit the API
+    (in a single request).
     """
 
     # Ensure text_chunks is a list of clean strings
@@ -22,22 +40,101 @@ def get_embedding(text_chunks: list[str]):
     if not clean_chunks:
         raise ValueError("No valid text chunks provided for embedding")
 
-    # Call embeddings API with a list of strings
-    response = client.embeddings.create(
-        model="text-embedding-3-small",
-        input=clean_chunks
-    )
+    embeddings = embedding_cache.get_many(clean_chunks, EMBEDDING_MODEL)
+    missing = [i for i, emb in enumerate(embeddings) if emb is None]
 
-    embeddings = [item.embedding for item in response.data]
+    if missing:
+        # Call embeddings API with a list of strings
+        with trace_span("embedding", "embeddings.create", inputs=len(missing)):
+            response = client.embeddings.create(
+                model=EMBEDDING_MODEL,
+                input=[clean_chunks[i] for i in missing]
+            )
+        fresh = _response_matrix(response)
+        embedding_cache.put_many([clean_chunks[i] for i in missing], EMBEDDING_MODEL, fresh)
+        for i, emb in zip(missing, fresh):
+            embeddings[i] = emb
 
-    return embeddings
+    # one contiguous (n, dim) float32 matrix; a fresh copy, so callers may modify it
+    return np.stack(embeddings)
 
 def get_single_embedding(text: str):
     """
-    Returns a single embedding vector for a single text string.
+    Returns a single embedding vector (read-only 1-d float32 array) for a single text string.
+    """
+    cached = embedding_cache.get(text, EMBEDDING_MODEL)
+    if cached is not None:
+        return cached
+
+    with trace_span("embedding", "embeddings.create", inputs=1):
+        response = client.embeddings.create(
+            model=EMBEDDING_MODEL,
+            input=[text]
+        )
+    embedding = _response_matrix(response)[0]
+    embedding_cache.put(text, EMBEDDING_MODEL, embedding)
+    return embedding
+
+
+async def aget_embedding(text_chunks: list[str]):
+    """
+    Async get_embedding(): same cache semantics, non-blocking API call.
+    """
+    clean_chunks = [chunk.strip() for chunk in text_chunks if isinstance(chunk, str) and chunk.strip()]
+
+    if not clean_chunks:
+        raise ValueError("No valid text chunks provided for embedding")
+
+    embeddings = embedding_cache.get_many(clean_chunks, EMBEDDING_MODEL)
+    missing = [i for i, emb in enumerate(embeddings) if emb is None]
+
+    if missing:
+        with trace_span("embedding", "embeddings.create", inputs=len(missing)):
+            response = await async_client.embeddings.create(
+                model=EMBEDDING_MODEL,
+                input=[clean_chunks[i] for i in missing]
+            )
+        fresh = _response_matrix(response)
+        embedding_cache.put_many([clean_chunks[i] for i in missing], EMBEDDING_MODEL, fresh)
+        for i, emb in zip(missing, fresh):
+            embeddings[i] = emb
+
+    # one contiguous (n, dim) float32 matrix; a fresh copy, so callers may modify it
+    return np.stack(embeddings)
+
+
+async def aget_single_embedding(text: str):
+    """
+    Async get_single_embedding().
+    """
+    cached = embedding_cache.get(text, EMBEDDING_MODEL)
+    if cached is not None:
+        return cached
+
+    with trace_span("embedding", "embeddings.create", inputs=1):
+        response = await async_client.embeddings.create(
+            model=EMBEDDING_MODEL,
+            input=[text]
+        )
+    embedding = _response_matrix(response)[0]
+    embedding_cache.put(text, EMBEDDING_MODEL, embedding)
+    return embedding
+
+
+def get_embedding_with_retry(text_chunks: list[str], max_retries: int = 5, base_delay: float = 1.0):
+    """
+    get_embedding() with exponential backoff on rate limits / transient errors.
+    Used by the bulk indexing pipeline where one failed batch should not
+    abort the whole /setup run.
     """
-    response = client.embeddings.create(
-        model="text-embedding-3-small",
-        input=[text]
-    )
-    return response.data[0].embedding
\ No newline at end of file
+    attempt = 0
+    while True:
+        try:
+            return get_embedding(text_chunks)
+        except RETRYABLE_ERRORS as e:
+            attempt += 1
+            if attempt > max_retries:
+                raise
+            delay = base_delay * (2 ** (attempt - 1))
+            print(f"Embedding batch failed ({type(e).__name__}), retry {attempt}/{max_retries} in {delay:.1f}s")
+            time.sleep(delay)
@@ -1,33 +1,26 @@
 import os
 import uuid
-from datetime import timedelta
-from google.cloud import storage
 from dotenv import load_dotenv
 
+from backend.services import storage_backend
+from backend.services.storage_backend import list_objects, read_text, write_bytes, signed_url
+
 load_dotenv(override=True)
 
 def get_client():
-    return storage.Client()
+    """Shared google.cloud.storage client (GCS backend only)."""
+    return storage_backend.storage.client
 
 def list_transcripts(bucket_name: str, prefix: str):
-    client = storage.Client()
-    bucket = client.bucket(bucket_name)
-    blobs = client.list_blobs(bucket, prefix=prefix)
     # Only return actual files (exclude folders)
-    return [blob for blob in blobs if not blob.name.endswith("/")]
+    return list_objects(bucket_name, prefix)
 
 def load_transcript(bucket_name: str, blob_name: str) -> str:
-    print(f'Inside load_transcript, bucket_name:{bucket_name}, blob_name:{blob_name}')
     if not bucket_name:
         raise ValueError("Bucket name is missing. Check .env GCS_BUCKET_NAME.")
 
-    client = get_client()
-    bucket = client.bucket(bucket_name)
-    blob = bucket.blob(blob_name)
-
-    print(f'blob:{blob}, blob_size:{blob.size}')
-    transcript = blob.download_as_text()
-    print(f'transcript:{transcript}')
+    transcript = read_text(bucket_name, blob_name)
+    print(f'Loaded transcript gs://{bucket_name}/{blob_name} ({len(transcript)} chars)')
 
     return transcript
 
@@ -43,9 +36,6 @@ def upload_audio_bytes(filename: str, audio_bytes: bytes) -> str:
     if not BUCKET_NAME:
         raise ValueError("GCS_BUCKET not set in environment")
 
-    client = storage.Client()
-    bucket = client.bucket(BUCKET_NAME)
-
     # Use provided filename or generate one
     if not filename:
         filename = f"audio/{uuid.uuid4()}.mp3"
@@ -54,16 +44,8 @@ def upload_audio_bytes(filename: str, audio_bytes: bytes) -> str:
         if not filename.startswith("audio/"):
             filename = f"audio/{filename}"
 
-    blob = bucket.blob(filename)
-    
     # Upload raw audio bytes
-    blob.upload_from_string(audio_bytes, content_type="audio/mpeg")
+    write_bytes(BUCKET_NAME, filename, audio_bytes, content_type="audio/mpeg")
 
     # Generate a signed URL valid for 1 hour
-    url = blob.generate_signed_url(
-        version="v4",
-        expiration=timedelta(hours=1),
-        method="GET"
-    )
-
-    return url
\ No newline at end of file
+    return signed_url(BUCKET_NAME, filename)
@@ -0,0 +1,98 @@
+"""
+In-process exact vector index for small corpora.
+
+The whole course is a few thousand chunks, so the embeddings fit in one
+contiguous matrix. A query is then a single matrix-vector product plus
+argpartition, with no disk-backed search or Arrow conversion per query.
+N queries are one matrix-matrix product.
+
+Rows are L2-normalised at load time, so scores are cosine similarities.
+Storage dtype:
+  float32  exact, 6 KB per 1536-d row
+  float16  half the memory; scored in float32 blocks
+  int8     quarter the memory; per-row scale, scored in float32 blocks
+"""
+
+import numpy as np
+
+INDEX_DTYPES = ("float32", "float16", "int8")
+# Rows converted to float32 at a time when scoring float16 / int8 matrices
+SCORE_BLOCK_ROWS = 16384
+
+
+def _normalize_rows(vecs: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vecs, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vecs / norms
+
+
+class InMemoryVectorIndex:
+    def __init__(self, embeddings: np.ndarray, dtype: str = "float32"):
+        if dtype not in INDEX_DTYPES:
+            raise ValueError(f"Unknown index dtype {dtype!r}, expected one of {INDEX_DTYPES}")
+        vecs = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        self.dtype = dtype
+        self._scale = None
+
+        if dtype == "int8":
+            # symmetric per-row quantisation: row ≈ int8_row * scale
+            peak = np.abs(vecs).max(axis=1)
+            peak[peak == 0] = 1.0
+            self._matrix = np.round(vecs / peak[:, None] * 127).astype(np.int8)
+            self._scale = (peak / 127).astype(np.float32)
+        elif dtype == "float16":
+            self._matrix = vecs.astype(np.float16)
+        else:
+            self._matrix = np.ascontiguousarray(vecs)
+
+    def __len__(self):
+        return self._matrix.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return self._matrix.nbytes + (self._scale.nbytes if self._scale is not None else 0)
+
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        """Cosine scores, shape (rows, n_queries)."""
+        if self._matrix.dtype == np.float32:
+            scores = self._matrix @ queries
+        else:
+            # numpy has no fast float16/int8 matmul; convert one block at a time
+            scores = np.empty((len(self), queries.shape[1]), dtype=np.float32)
+            for start in range(0, len(self), SCORE_BLOCK_ROWS):
+                block = self._matrix[start:start + SCORE_BLOCK_ROWS].astype(np.float32)
+                scores[start:start + SCORE_BLOCK_ROWS] = block @ queries
+        if self._scale is not None:
+            scores *= self._scale[:, None]
+        return scores
+
+    def search_batch(self, queries, top_k: int = 5, allowed: np.ndarray | None = None) -> list:
+        """
+        Top-k rows for each query with one matrix product.
+        allowed: optional boolean mask over rows (metadata filter).
+        Returns one [(row, cosine), ...] list per query, best first.
+        """
+        queries = _normalize_rows(np.asarray(queries, dtype=np.float32).reshape(-1, self._matrix.shape[1]))
+        if len(self) == 0 or queries.shape[0] == 0:
+            return [[] for _ in range(queries.shape[0])]
+
+        scores = self._scores(queries.T)
+        candidates = len(self)
+        if allowed is not None:
+            scores[~allowed] = -np.inf
+            candidates = int(allowed.sum())
+        k = min(top_k, candidates)
+        if k <= 0:
+            return [[] for _ in range(queries.shape[0])]
+
+        # argpartition over all columns at once, then sort only the k winners
+        top = np.argpartition(-scores, k - 1, axis=0)[:k]
+        results = []
+        for j in range(queries.shape[0]):
+            rows = top[:, j]
+            rows = rows[np.argsort(-scores[rows, j], kind="stable")]
+            results.append([(int(r), float(scores[r, j])) for r in rows])
+        return results
+
+    def search(self, query, top_k: int = 5, allowed: np.ndarray | None = None) -> list:
+        return self.search_batch(query, top_k, allowed)[0]
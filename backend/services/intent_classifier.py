@@ -1,9 +1,186 @@
-from openai import OpenAI
 import os
+import re
+import asyncio
+import threading
+import numpy as np
+
+from backend.services.request_trace import trace_span
+from backend.services.embedding_utils import get_embedding, get_single_embedding, aget_single_embedding
+from backend.services.intent_examples import INTENT_EXAMPLES
+from backend.services.openai_clients import client, async_client
+
+INTENTS = ["course_rag", "general_ai", "code_help", "web_search", "notes", "memory"]
+
+# "llm"    -> always ask gpt-4o-mini (original behaviour)
+# "local"  -> keyword rules + nearest-centroid only, never the LLM
+# "hybrid" -> local first, LLM only when local confidence is below threshold
+INTENT_CLASSIFIER_MODE = os.getenv("INTENT_CLASSIFIER_MODE", "hybrid")
+# Minimum cosine margin between best and second-best centroid to trust the local answer
+INTENT_CENTROID_MIN_MARGIN = float(os.getenv("INTENT_CENTROID_MIN_MARGIN", "0.04"))
+
+
+# ------------------------------------------------------------
+# Stage 1: keyword / regex rules (sub-millisecond)
+# ------------------------------------------------------------
+# Ordered by precedence: an earlier intent wins when several match
+# (e.g. "make notes for video 3" is notes, not course_rag).
+KEYWORD_RULES = [
+    ("memory", re.compile(
+        r"\b(earlier|previous(ly)? (question|answer|message)|last time|you (said|told)|"
+        r"i (asked|said|told you)|did i ask|remember (what|when)|we (discussed|talked)|"
+        r"pehle|last answer)\b", re.I)),
+    ("notes", re.compile(
+        r"\b(notes?|summary|summari[sz]e|cheat ?sheet|study material|key points|recap|"
+        r"(2|two)[ -]?liner)\b", re.I)),
+    ("code_help", re.compile(
+        r"(```|\btraceback\b|\b\w+error\b|\bexception\b|\bstack ?trace\b|"
+        r"\b(fix|debug|refactor)\b.*\b(code|function|script|bug)\b|"
+        r"\b(def|import|class)\s+\w+|\bpip install\b|\bdockerfile\b)", re.I)),
+    ("course_rag", re.compile(
+        r"\b(video|lecture|course|module|section|transcript|instructor|udemy|demo)\b", re.I)),
+]
+
+# rule hits are trusted unless two non-ordered intents compete
+KEYWORD_CONFIDENCE = 0.95
+
+
+def _keyword_intent(question: str):
+    matches = [intent for intent, pattern in KEYWORD_RULES if pattern.search(question)]
+    if not matches:
+        return None
+    # memory / notes requests are unambiguous even when they mention a video
+    if matches[0] in ("memory", "notes"):
+        return matches[0]
+    # code_help + course_rag together ("fix the code from video 3") is ambiguous
+    if len(matches) > 1:
+        return None
+    return matches[0]
+
+
+# ------------------------------------------------------------
+# Stage 2: nearest centroid over example embeddings
+# ------------------------------------------------------------
+# The question embedding goes through embedding_cache, so the retrieval step
+# that follows (query_chunks) gets it for free.
+_centroids = None  # (labels, matrix[n_intents, dim])
+_centroids_lock = threading.Lock()
+
+
+def _get_centroids():
+    global _centroids
+    if _centroids is not None:
+        return _centroids
+
+    with _centroids_lock:
+        if _centroids is None:
+            labels = list(INTENT_EXAMPLES)
+            texts = [q for label in labels for q in INTENT_EXAMPLES[label]]
+            vectors = np.asarray(get_embedding(texts), dtype=np.float32)
+
+            rows = []
+            start = 0
+            for label in labels:
+                n = len(INTENT_EXAMPLES[label])
+                centroid = vectors[start:start + n].mean(axis=0)
+                rows.append(centroid / np.linalg.norm(centroid))
+                start += n
+
+            _centroids = (labels, np.vstack(rows))
+    return _centroids
+
+
+def _centroid_intent(question: str):
+    """Returns (intent, margin) — margin = cosine gap between best and runner-up."""
+    return _nearest_centroid(get_single_embedding(question))
+
+
+async def _acentroid_intent(question: str):
+    if _centroids is None:
+        # one-off: embeds the example set
+        await asyncio.to_thread(_get_centroids)
+    return _nearest_centroid(await aget_single_embedding(question))
+
+
+def _nearest_centroid(embedding):
+    labels, matrix = _get_centroids()
+    q = np.asarray(embedding, dtype=np.float32)
+    # not in place: the vector is shared with embedding_cache
+    q = q / np.linalg.norm(q)
+
+    scores = matrix @ q
+    order = np.argsort(-scores)
+    margin = float(scores[order[0]] - scores[order[1]])
+    return labels[order[0]], margin
+
+
+def classify_intent_detailed(question: str) -> tuple[str, float, str]:
+    """
+    Returns (intent, confidence, source) where source is one of
+    "keyword", "centroid" or "llm".
+    """
+    mode = INTENT_CLASSIFIER_MODE
+
+    if mode != "llm":
+        with trace_span("classifier", "keyword_rules"):
+            intent = _keyword_intent(question)
+        if intent is not None:
+            return intent, KEYWORD_CONFIDENCE, "keyword"
+
+        try:
+            with trace_span("classifier", "nearest_centroid"):
+                intent, margin = _centroid_intent(question)
+            if mode == "local" or margin >= INTENT_CENTROID_MIN_MARGIN:
+                return intent, margin, "centroid"
+        except Exception as e:
+            print("Local intent classifier error:", e)
+            if mode == "local":
+                return "course_rag", 0.0, "centroid"
+
+    return classify_intent_llm(question), 1.0, "llm"
+
+
+async def aclassify_intent_detailed(question: str) -> tuple[str, float, str]:
+    """
+    Async classify_intent_detailed().
+    """
+    mode = INTENT_CLASSIFIER_MODE
+
+    if mode != "llm":
+        with trace_span("classifier", "keyword_rules"):
+            intent = _keyword_intent(question)
+        if intent is not None:
+            return intent, KEYWORD_CONFIDENCE, "keyword"
+
+        try:
+            with trace_span("classifier", "nearest_centroid"):
+                intent, margin = await _acentroid_intent(question)
+            if mode == "local" or margin >= INTENT_CENTROID_MIN_MARGIN:
+                return intent, margin, "centroid"
+        except Exception as e:
+            print("Local intent classifier error:", e)
+            if mode == "local":
+                return "course_rag", 0.0, "centroid"
+
+    return await aclassify_intent_llm(question), 1.0, "llm"
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 def classify_intent(question: str) -> str:
+    """
+    Intent label for the question. Uses the local classifier when it is
+    confident and falls back to the LLM otherwise (see INTENT_CLASSIFIER_MODE).
+    """
+    intent, confidence, source = classify_intent_detailed(question)
+    print(f"[IntentClassifier] intent={intent} source={source} confidence={confidence:.3f}")
+    return intent
+
+
+async def aclassify_intent(question: str) -> str:
+    intent, confidence, source = await aclassify_intent_detailed(question)
+    print(f"[IntentClassifier] intent={intent} source={source} confidence={confidence:.3f}")
+    return intent
+
+
+def classify_intent_llm(question: str) -> str:
     """
     Very lightweight intent classifier using GPT.
     Returns:
@@ -14,7 +191,28 @@ def classify_intent(question: str) -> str:
       - "notes"
       - "memory"
     """
+    with trace_span("llm", "classify_intent"):
+        response = client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=_classifier_messages(question),
+            max_tokens=10
+        )
 
+    return _parse_intent(response.choices[0].message.content)
+
+
+async def aclassify_intent_llm(question: str) -> str:
+    with trace_span("llm", "classify_intent"):
+        response = await async_client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=_classifier_messages(question),
+            max_tokens=10
+        )
+
+    return _parse_intent(response.choices[0].message.content)
+
+
+def _classifier_messages(question: str) -> list:
     prompt = f"""
     Classify the user question into one intent category.
 
@@ -31,17 +229,15 @@ def classify_intent(question: str) -> str:
     User question: "{question}"
     """
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "system", "content": "You are a precise classifier."},
-                  {"role": "user", "content": prompt}],
-        max_tokens=10
-    )
+    return [{"role": "system", "content": "You are a precise classifier."},
+            {"role": "user", "content": prompt}]
+
 
-    intent = response.choices[0].message.content.strip().lower()
+def _parse_intent(content: str) -> str:
+    intent = content.strip().lower()
 
     # Safety fallback
-    if intent not in ["course_rag", "general_ai", "code_help", "web_search", "notes", "memory"]:
+    if intent not in INTENTS:
         intent = "course_rag"
 
     return intent
\ No newline at end of file
@@ -0,0 +1,71 @@
+# Labeled example questions used to build the nearest-centroid intent model.
+# Keep these distinct from testing/intent_eval_set.jsonl (the evaluation set).
+
+INTENT_EXAMPLES = {
+    "course_rag": [
+        "What did the instructor explain in the CrewAI video?",
+        "How was the research agent built in the course demo?",
+        "Which tools did we attach to the agent in lecture 4?",
+        "Explain the multi-agent example from the course",
+        "What is the difference between tasks and agents as taught in this course?",
+        "In the video, how did he connect the agent to the vector database?",
+        "Course me MCP ke baare me kya bataya tha?",
+        "What does the transcript say about agent memory?",
+        "How did the demo handle tool calling?",
+        "Which LLM was used in the course project?",
+    ],
+    "general_ai": [
+        "What is a large language model?",
+        "Explain transformers in simple words",
+        "What is the difference between machine learning and deep learning?",
+        "How does fine-tuning work?",
+        "What is reinforcement learning from human feedback?",
+        "What are embeddings?",
+        "Bhai neural network kya hota hai?",
+        "Why do LLMs hallucinate?",
+        "What is AI?",
+        "Explain attention mechanism",
+    ],
+    "code_help": [
+        "Why am I getting a KeyError in this Python code?",
+        "How do I fix ModuleNotFoundError: No module named crewai?",
+        "Write a Python function to read a JSON file",
+        "My FastAPI endpoint returns 422, how to fix it?",
+        "How do I deploy this app to Cloud Run with Docker?",
+        "Explain this code: for i in range(10): print(i)",
+        "Mera code error de raha hai, kaise fix karu?",
+        "How do I pass environment variables to a Docker container?",
+        "Refactor this function to be async",
+        "How to write a unit test for my agent tool?",
+    ],
+    "web_search": [
+        "How do I install Ollama on Windows?",
+        "Compare LangChain and LlamaIndex",
+        "What is the latest version of CrewAI?",
+        "Best GPU for running local LLMs?",
+        "Steps to install Python 3.11 on Ubuntu",
+        "Which is cheaper, OpenAI or Anthropic API?",
+        "Where can I download the Llama 3 weights?",
+        "Top vector databases in 2024",
+    ],
+    "notes": [
+        "Make notes for video 3",
+        "Give me a summary of the agents module",
+        "Create study notes on RAG",
+        "Summarize lecture 5 in bullet points",
+        "Can you prepare a cheat sheet for CrewAI?",
+        "Video 7 ke notes bana do",
+        "Key points from the memory lecture please",
+        "Give me a 2 liner summary of video 10",
+    ],
+    "memory": [
+        "What did I ask you earlier?",
+        "What was my previous question?",
+        "Remind me what we discussed before",
+        "What did you tell me last time?",
+        "Maine pehle kya poocha tha?",
+        "Repeat your last answer",
+        "Do you remember what I said about my project?",
+        "What were we talking about?",
+    ],
+}
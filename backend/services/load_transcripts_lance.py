@@ -1,68 +1,277 @@
 import os
-from google.cloud import storage
-import numpy as np
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-from backend.services.text_chunker import chunk_text
-from backend.services.embedding_utils import get_single_embedding
-from backend.services.vector_store_lance import insert_transcript_chunk, get_transcript_table
-from backend.services.embedding_normalizer import normalize_embedding
+from backend.services.storage_backend import list_objects, bulk_download
+
+from backend.services.text_chunker import chunk_text, count_tokens
+from backend.services.embedding_utils import get_embedding_with_retry, EMBEDDING_MODEL
+from backend.services.vector_store_lance import (
+    TRANSCRIPT_MANIFEST_PATH,
+    TRANSCRIPT_SCHEMA_VERSION,
+    insert_transcript_chunks,
+    transcript_batch,
+    replace_transcript_table,
+    delete_video_chunks,
+    get_transcript_table,
+    maybe_build_ann_index,
+)
 
 
 BUCKET_NAME = os.getenv("GCS_BUCKET")
 TRANSCRIPT_PREFIX = "transcripts/"  # folder in bucket
 
+# Embedding batch limits (OpenAI allows up to 2048 inputs / ~300k tokens per request)
+EMBED_BATCH_MAX_TOKENS = int(os.getenv("EMBED_BATCH_MAX_TOKENS", "100000"))
+EMBED_BATCH_MAX_INPUTS = int(os.getenv("EMBED_BATCH_MAX_INPUTS", "512"))
+# How many embedding requests may be in flight at once
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+
+# Manifest of what is currently indexed, stored next to the LanceDB data
+MANIFEST_PATH = TRANSCRIPT_MANIFEST_PATH
+
 
 def list_transcripts():
-    """Return list of transcript blob objects under gs://<BUCKET>/transcripts/"""
-    client = storage.Client()
-    bucket = client.bucket(BUCKET_NAME)
-    blobs = list(bucket.list_blobs(prefix=TRANSCRIPT_PREFIX))
-    return [b for b in blobs if b.name.endswith(".txt")]
+    """Return transcript objects (StorageObject) under gs://<BUCKET>/transcripts/"""
+    return list_objects(BUCKET_NAME, TRANSCRIPT_PREFIX, suffix=".txt")
 
 
-def load_and_index_transcripts(max_tokens: int = 300, overlap: int = 50):
+# ---------------------------------------------------------
+# Batching helpers
+# ---------------------------------------------------------
+def pack_batches(items: list, max_tokens: int = EMBED_BATCH_MAX_TOKENS,
+                 max_inputs: int = EMBED_BATCH_MAX_INPUTS) -> list:
     """
-    1) Scan GCS transcripts folder
-    2) Download each transcript
-    3) Token-chunk using chunk_text(...)
-    4) Embed each chunk (get_single_embedding)
-    5) Insert into LanceDB via insert_transcript_chunk()
+    Greedily pack (key, text, n_tokens) items into batches that stay under
+    both the token budget and the input-count limit of one embeddings call.
+    """
+    batches = []
+    current = []
+    current_tokens = 0
+
+    for item in items:
+        n_tokens = item[2]
+        if current and (current_tokens + n_tokens > max_tokens or len(current) >= max_inputs):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(item)
+        current_tokens += n_tokens
+
+    if current:
+        batches.append(current)
 
-    Returns a dict with counts for easy /setup responses.
+    return batches
+
+
+def embed_batches(batches: list, concurrency: int = EMBED_CONCURRENCY) -> dict:
+    """
+    Embed every batch with bounded parallelism.
+    Returns {key: embedding} for all items across all batches.
     """
+    def _embed(batch):
+        vectors = get_embedding_with_retry([text for _, text, _ in batch])
+        return [(key, vec) for (key, _, _), vec in zip(batch, vectors)]
+
+    embeddings = {}
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        for pairs in pool.map(_embed, batches):
+            embeddings.update(pairs)
+
+    return embeddings
+
+
+# ---------------------------------------------------------
+# Index manifest
+# ---------------------------------------------------------
+def load_manifest() -> dict | None:
+    """
+    Manifest layout:
+      {
+        "params": {"max_tokens": 300, "overlap": 50, "embedding_model": "...", "schema_version": 2},
+        "files": {blob_name: {"video": ..., "generation": ..., "md5": ..., "chunks": n}},
+        "build_id": 1700000000000000000
+      }
+    build_id (time_ns) changes whenever a run changes the indexed content;
+    answer-cache entries are stamped with it (transcript_index_version).
+    Returns None when missing or unreadable (forces a full rebuild).
+    """
+    try:
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_manifest(manifest: dict):
+    # write-then-rename so a crash never leaves a half-written manifest
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def blob_fingerprint(blob) -> dict:
+    """GCS object generation changes on every overwrite; md5 guards against re-uploads of identical content."""
+    return {
+        "generation": str(blob.generation) if blob.generation is not None else None,
+        "md5": blob.md5_hash,
+    }
+
+
+def is_unchanged(entry: dict | None, fingerprint: dict) -> bool:
+    """
+    Same content as when it was indexed: md5 decides when the backend reports
+    one (an identical re-upload only bumps generation); otherwise generation.
+    """
+    if not entry:
+        return False
+    if fingerprint["md5"] is not None:
+        return entry.get("md5") == fingerprint["md5"]
+    return fingerprint["generation"] is not None and entry.get("generation") == fingerprint["generation"]
+
+
+def load_and_index_transcripts(max_tokens: int = 300, overlap: int = 50, force: bool = False):
+    """
+    Incremental indexing driven by the manifest:
+    1) Scan GCS transcripts folder, compare generation/md5 with the manifest
+    2) Download + token-chunk only new or changed transcripts
+    3) Embed their chunks in token-budgeted batches, several batches in parallel
+    4) Delete old rows of changed videos, insert each video as one Arrow batch
+    5) Delete rows of transcripts that no longer exist in the bucket
+
+    If chunking params, the embedding model or the table schema changed (or
+    force=True, or no manifest exists yet) the table is rebuilt from scratch:
+    every video is processed, and the new rows replace the table in one
+    commit at the end, so live searches keep the old index meanwhile and a
+    failed rebuild leaves it as it was.
+    Afterwards the ANN index is built / rebuilt when the row count warrants it.
+
+    Returns a dict with counts and per-stage timings (seconds) for /setup responses.
+    """
+    started = time.perf_counter()
+    timings = {"download": 0.0, "chunk": 0.0, "embed": 0.0, "write": 0.0}
+
+    params = {
+        "max_tokens": max_tokens,
+        "overlap": overlap,
+        "embedding_model": EMBEDDING_MODEL,
+        "schema_version": TRANSCRIPT_SCHEMA_VERSION,
+    }
+    manifest = load_manifest()
+    full_rebuild = force or manifest is None or manifest.get("params") != params
+    previous = {} if full_rebuild else manifest.get("files", {})
+
     blobs = list_transcripts()
     total_files = len(blobs)
-    if total_files == 0:
-        return {"status": "no transcripts found", "files_indexed": 0, "chunks_indexed": 0}
 
+    if full_rebuild:
+        # the old table (and its manifest) stay live until replace_transcript_table()
+        print("Index manifest missing or parameters changed -> full rebuild")
     # ensure table exists (creates if missing)
     _ = get_transcript_table()
 
-    total_chunks = 0
+    files = {}
+    changed = []
     for blob in blobs:
         filename = os.path.basename(blob.name)
         video_id = filename.replace(".txt", "")
-        print(f"Processing {blob.name} -> video_id={video_id}")
+        fingerprint = blob_fingerprint(blob)
+        entry = previous.get(blob.name)
+
+        if is_unchanged(entry, fingerprint):
+            files[blob.name] = {**entry, **fingerprint}
+        else:
+            changed.append((blob, video_id, fingerprint))
+
+    # ---- 0. drop rows of transcripts removed from the bucket ----
+    current_names = {b.name for b in blobs}
+    removed = [name for name in previous if name not in current_names]
+    t0 = time.perf_counter()
+    for name in removed:
+        print(f"Removing deleted transcript {name}")
+        delete_video_chunks(previous[name]["video"])
+    timings["write"] += time.perf_counter() - t0
 
-        # download text robustly
-        try:
-            text = blob.download_as_text(encoding="utf-8")
-        except Exception:
-            text = blob.download_as_bytes().decode("utf-8", errors="ignore")
+    # new build id only when the indexed content changes (cached answers stay valid otherwise)
+    previous_build = (manifest or {}).get("build_id")
+    build_id = previous_build if previous_build and not (full_rebuild or changed or removed) else time.time_ns()
 
-        # chunk (token-based chunker)
+    if total_files == 0:
+        if full_rebuild:
+            replace_transcript_table([])
+        save_manifest({"params": params, "files": {}, "build_id": build_id})
+        return {"status": "no transcripts found", "files_indexed": 0, "chunks_indexed": 0,
+                "files_removed": len(removed)}
+
+    # ---- 1. download (parallel) + chunk (changed files only) ----
+    videos = {}  # video_id -> list[(chunk_index, chunk)]
+    items = []   # (key, text, n_tokens) for the embedder
+    meta = {blob.name: (video_id, fingerprint) for blob, video_id, fingerprint in changed}
+    loop_started = time.perf_counter()
+    chunk_before = timings["chunk"]
+    # downloads run ahead on a thread pool while earlier files are chunked
+    for blob, text in bulk_download(BUCKET_NAME, [blob for blob, _, _ in changed]):
+        video_id, fingerprint = meta[blob.name]
+        print(f"Processing {blob.name} -> video_id={video_id}")
+
+        t0 = time.perf_counter()
         chunks = chunk_text(text, max_tokens=max_tokens, overlap=overlap)
-        print(f"  Created {len(chunks)} chunks for {video_id}")
+        # the embeddings API rejects blank inputs; drop them but keep original indices
+        kept = [(idx, chunk) for idx, chunk in enumerate(chunks) if chunk.strip()]
+        for idx, chunk in kept:
+            items.append(((video_id, idx), chunk, count_tokens(chunk)))
+        videos[video_id] = kept
+        files[blob.name] = {"video": video_id, "chunks": len(kept), **fingerprint}
+        timings["chunk"] += time.perf_counter() - t0
+        print(f"  Created {len(kept)} chunks for {video_id}")
+    # download time = time spent waiting on downloads, not chunking
+    timings["download"] += time.perf_counter() - loop_started - (timings["chunk"] - chunk_before)
 
-        for idx, chunk in enumerate(chunks):
-            emb = get_single_embedding(chunk)
-            # normalize embedding
-            emb_list = normalize_embedding(emb)
+    # ---- 2. embed (batched, concurrent) ----
+    t0 = time.perf_counter()
+    batches = pack_batches(items)
+    embeddings = embed_batches(batches) if batches else {}
+    timings["embed"] += time.perf_counter() - t0
+    print(f"Embedded {len(items)} chunks in {len(batches)} batches")
 
+    # ---- 3. write one Arrow batch per video (full rebuild: one table swap) ----
+    total_chunks = 0
+    t0 = time.perf_counter()
+    rebuilt = []
+    for video_id, kept in videos.items():
+        args = (video_id, [idx for idx, _ in kept], [chunk for _, chunk in kept],
+                [embeddings[(video_id, idx)] for idx, _ in kept])
+        if full_rebuild:
+            if kept:
+                rebuilt.append(transcript_batch(*args))
+            written = len(kept)
+        else:
+            delete_video_chunks(video_id)
+            written = insert_transcript_chunks(*args)
+        total_chunks += written
+        print(f"  Indexed {written} chunks for {video_id}")
+    if full_rebuild:
+        replace_transcript_table(rebuilt)
+    timings["write"] += time.perf_counter() - t0
 
-            insert_transcript_chunk(video=video_id, chunk_index=idx, chunk=chunk, embedding=emb_list)
+    save_manifest({"params": params, "files": files, "build_id": build_id})
 
-        total_chunks += len(chunks)
-        print(f"  Indexed {len(chunks)} chunks for {video_id}")
+    # ---- 4. (re)build the ANN index if the table crossed the threshold / grew a lot ----
+    t0 = time.perf_counter()
+    ann_index = maybe_build_ann_index("transcripts")
+    timings["index"] = time.perf_counter() - t0
 
-    return {"status": "ok", "files_indexed": total_files, "chunks_indexed": total_chunks}
\ No newline at end of file
+    timings["total"] = time.perf_counter() - started
+    return {
+        "status": "ok",
+        "full_rebuild": full_rebuild,
+        "files_indexed": len(changed),
+        "files_skipped": total_files - len(changed),
+        "files_removed": len(removed),
+        "chunks_indexed": total_chunks,
+        "embedding_batches": len(batches),
+        "ann_index": ann_index,
+        "timings": {stage: round(secs, 3) for stage, secs in timings.items()},
+    }
@@ -0,0 +1,273 @@
+"""
+Maintenance for the long-term `memory` table.
+
+Memory rows arrive in small appends and never leave, so the table
+accumulates fragments, old versions and near-identical turns, and every
+recall scans all of it. run_memory_maintenance() does, in order:
+
+  1. retention   delete unscoped rows (no session_id / user_id: legacy turns
+                 that recall never serves), rows older than
+                 MEMORY_RETENTION_DAYS, then the oldest rows beyond MEMORY_MAX_ROWS
+  2. dedup       among the newest MEMORY_DEDUP_MAX_ROWS rows, drop a row
+                 whose embedding has cosine >= MEMORY_DEDUP_THRESHOLD with a
+                 newer row of the same user / session (the newest copy of a
+                 memory is kept; students' memories are never merged)
+  3. compaction  merge small fragments (compact_files)
+  4. cleanup     delete versions older than MEMORY_VERSION_RETENTION_HOURS
+                 (cleanup_old_versions) — this is what frees disk space
+
+Steps 1-3 write new versions, and step 4 keeps those for the retention window
+(readers may still be on them). So the space this run frees is reclaimed by
+a later run. bytes_reclaimed is what cleanup actually deleted now, and
+disk_delta_bytes is the on-disk change, which is often zero or negative on
+the run that did the work.
+
+The report includes rows / fragments / bytes on disk and recall latency
+(probe searches with stored vectors, no embedding calls) before and after.
+
+Triggered by POST /admin/memory/maintenance, or every
+MEMORY_MAINTENANCE_INTERVAL_HOURS by a background thread (0 = off).
+"""
+
+import os
+import time
+import threading
+from datetime import timedelta
+
+import numpy as np
+import pyarrow.compute as pc
+
+from backend.services import vector_store_lance as store
+from backend.services.embedding_normalizer import normalize_embeddings
+
+MEMORY_RETENTION_DAYS = float(os.getenv("MEMORY_RETENTION_DAYS", "180"))  # 0 = keep forever
+MEMORY_MAX_ROWS = int(os.getenv("MEMORY_MAX_ROWS", "50000"))  # 0 = unbounded
+MEMORY_DEDUP_THRESHOLD = float(os.getenv("MEMORY_DEDUP_THRESHOLD", "0.97"))  # 0 = no dedup
+MEMORY_DEDUP_MAX_ROWS = int(os.getenv("MEMORY_DEDUP_MAX_ROWS", "10000"))
+MEMORY_VERSION_RETENTION_HOURS = float(os.getenv("MEMORY_VERSION_RETENTION_HOURS", "1"))
+MEMORY_MAINTENANCE_INTERVAL_HOURS = float(os.getenv("MEMORY_MAINTENANCE_INTERVAL_HOURS", "0"))
+MEMORY_MAINTENANCE_PROBES = int(os.getenv("MEMORY_MAINTENANCE_PROBES", "20"))
+
+# Rows compared at a time in dedup (block x rows similarity matrix)
+DEDUP_BLOCK_ROWS = 256
+# memory_id values per DELETE predicate
+DELETE_BATCH = 500
+
+_run_lock = threading.Lock()
+_scheduler = {"thread": None, "stop": threading.Event()}
+
+
+# ---------------------------------------------------------
+# Measurements
+# ---------------------------------------------------------
+def _table_bytes(table_name: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(os.path.join(store.DB_PATH, f"{table_name}.lance")):
+        for filename in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, filename))
+            except OSError:
+                pass
+    return total
+
+
+def _fragment_count(table) -> int | None:
+    try:
+        return len(table.to_lance().get_fragments())
+    except Exception:
+        return None
+
+
+def _probe_recall_ms(table, probes: int = MEMORY_MAINTENANCE_PROBES) -> float | None:
+    """
+    Median recall latency over stored vectors used as queries (no embedding
+    calls), each prefiltered to its own row's user / session like a real recall.
+    Unscoped rows are skipped (recall never serves them).
+    """
+    num_rows = table.count_rows()
+    if not num_rows or probes <= 0:
+        return None
+    rows = np.random.default_rng(0).choice(num_rows, size=min(probes, num_rows), replace=False)
+    sample = table.to_lance().take(sorted(rows.tolist()), columns=["session_id", "user_id", "embedding"])
+    matrix = sample["embedding"].combine_chunks().flatten().to_numpy(zero_copy_only=False).reshape(len(rows), -1)
+    scopes = zip(sample["session_id"].to_pylist(), sample["user_id"].to_pylist())
+    latencies = []
+    for vec, (session_id, user_id) in zip(normalize_embeddings(matrix), scopes):
+        where = store.memory_scope_where(session_id, user_id)
+        if where is None:
+            continue
+        t0 = time.perf_counter()
+        store._recall_by_vector(vec, where=where)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return round(float(np.median(latencies)), 3) if latencies else None
+
+
+def _snapshot(table) -> dict:
+    return {
+        "rows": table.count_rows(),
+        "fragments": _fragment_count(table),
+        "bytes": _table_bytes("memory"),
+        "recall_ms": _probe_recall_ms(table),
+    }
+
+
+# ---------------------------------------------------------
+# Steps
+# ---------------------------------------------------------
+def find_duplicates(matrix: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    matrix: (n, dim) embeddings ordered newest first.
+    Returns a boolean mask of rows that have cosine >= threshold with some
+    newer row. Computed blockwise, so memory stays at DEDUP_BLOCK_ROWS x n.
+    """
+    matrix = normalize_embeddings(matrix, l2=True)
+    n = len(matrix)
+    duplicate = np.zeros(n, dtype=bool)
+    for start in range(1, n, DEDUP_BLOCK_ROWS):
+        stop = min(start + DEDUP_BLOCK_ROWS, n)
+        sims = matrix[start:stop] @ matrix[:stop].T
+        # only newer rows (lower index) count
+        sims[np.arange(stop - start)[:, None] + start <= np.arange(stop)[None, :]] = -1.0
+        duplicate[start:stop] = sims.max(axis=1) >= threshold
+    return duplicate
+
+
+def _delete_ids(table, ids: list) -> int:
+    for start in range(0, len(ids), DELETE_BATCH):
+        batch = ids[start:start + DELETE_BATCH]
+        table.delete("memory_id IN ({})".format(", ".join(f"'{i}'" for i in batch)))
+    return len(ids)
+
+
+def _apply_retention(table, now: float) -> dict:
+    removed = {"unscoped": 0, "expired": 0, "overflow": 0}
+    before = table.count_rows()
+    table.delete("session_id IS NULL AND user_id IS NULL")
+    removed["unscoped"] = before - table.count_rows()
+
+    if MEMORY_RETENTION_DAYS > 0:
+        cutoff = now - MEMORY_RETENTION_DAYS * 86400
+        before = table.count_rows()
+        table.delete(f"created_at < {cutoff}")
+        removed["expired"] = before - table.count_rows()
+
+    if MEMORY_MAX_ROWS > 0 and table.count_rows() > MEMORY_MAX_ROWS:
+        meta = table.to_lance().to_table(columns=["memory_id", "created_at"])
+        created = pc.fill_null(meta["created_at"], 0.0).to_numpy()
+        oldest = np.argsort(created, kind="stable")[: len(created) - MEMORY_MAX_ROWS]
+        ids = meta["memory_id"].to_numpy(zero_copy_only=False)[oldest].tolist()
+        removed["overflow"] = _delete_ids(table, ids)
+    return removed
+
+
+def _dedup(table) -> int:
+    if MEMORY_DEDUP_THRESHOLD <= 0 or table.count_rows() < 2:
+        return 0
+    data = table.to_lance().to_table(columns=["memory_id", "session_id", "user_id", "created_at", "embedding"])
+    created = pc.fill_null(data["created_at"], 0.0).to_numpy()
+    newest = np.argsort(-created, kind="stable")[:MEMORY_DEDUP_MAX_ROWS]
+
+    emb = data["embedding"].combine_chunks()
+    matrix = emb.flatten().to_numpy(zero_copy_only=False).reshape(len(data), -1)
+    memory_ids = data["memory_id"].to_numpy(zero_copy_only=False)
+
+    # compare only within one user (or session, for rows without a user)
+    scopes = {}
+    sessions = data["session_id"].to_pylist()
+    users = data["user_id"].to_pylist()
+    for row in newest:
+        scopes.setdefault((users[row], None if users[row] else sessions[row]), []).append(row)
+
+    ids = []
+    for rows in scopes.values():
+        if len(rows) < 2:
+            continue
+        rows = np.asarray(rows)  # still newest first
+        duplicate = find_duplicates(matrix[rows], MEMORY_DEDUP_THRESHOLD)
+        ids.extend(memory_ids[rows[duplicate]].tolist())
+    return _delete_ids(table, ids)
+
+
+def _compact_and_cleanup(table) -> dict:
+    result = {}
+    try:
+        stats = table.compact_files()
+        result["fragments_removed"] = getattr(stats, "fragments_removed", None)
+        result["fragments_added"] = getattr(stats, "fragments_added", None)
+    except Exception as e:
+        print("Memory compaction error:", e)
+        result["compact_error"] = str(e)
+    try:
+        stats = table.cleanup_old_versions(older_than=timedelta(hours=MEMORY_VERSION_RETENTION_HOURS))
+        result["versions_removed"] = getattr(stats, "old_versions", None)
+        result["bytes_removed"] = getattr(stats, "bytes_removed", None)
+    except Exception as e:
+        print("Memory version cleanup error:", e)
+        result["cleanup_error"] = str(e)
+    return result
+
+
+# ---------------------------------------------------------
+# Entry points
+# ---------------------------------------------------------
+def run_memory_maintenance() -> dict:
+    """Run all steps once; returns a report. Concurrent calls get status 'busy'."""
+    if not _run_lock.acquire(blocking=False):
+        return {"status": "busy"}
+    try:
+        started = time.perf_counter()
+        table = store.get_memory_table()
+        before = _snapshot(table)
+
+        removed = _apply_retention(table, time.time())
+        removed["duplicates"] = _dedup(table)
+        compaction = _compact_and_cleanup(table)
+
+        # new versions were written; re-open and let the ANN index catch up
+        store.refresh_tables("memory")
+        table = store.get_memory_table()
+        try:
+            compaction["ann_index"] = store.maybe_build_ann_index("memory").get("status")
+        except Exception as e:
+            print("LanceDB memory index build error:", e)
+        compaction["scalar_indexes"] = store.build_memory_scalar_indexes()
+        after = _snapshot(table)
+
+        report = {
+            "status": "ok",
+            "removed": removed,
+            "compaction": compaction,
+            "before": before,
+            "after": after,
+            "bytes_reclaimed": compaction.get("bytes_removed") or 0,
+            "disk_delta_bytes": after["bytes"] - before["bytes"],
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        print("Memory maintenance:", report)
+        return report
+    finally:
+        _run_lock.release()
+
+
+def _scheduler_loop(interval_seconds: float, stop: threading.Event):
+    while not stop.wait(interval_seconds):
+        try:
+            run_memory_maintenance()
+        except Exception as e:
+            print("Scheduled memory maintenance failed:", e)
+
+
+def start_memory_maintenance_scheduler(interval_hours: float = MEMORY_MAINTENANCE_INTERVAL_HOURS):
+    """Run maintenance every interval_hours in a daemon thread (no-op when 0)."""
+    if interval_hours <= 0 or _scheduler["thread"] is not None:
+        return
+    _scheduler["stop"].clear()
+    thread = threading.Thread(target=_scheduler_loop, args=(interval_hours * 3600, _scheduler["stop"]),
+                              name="memory-maintenance", daemon=True)
+    thread.start()
+    _scheduler["thread"] = thread
+
+
+def stop_memory_maintenance_scheduler():
+    _scheduler["stop"].set()
+    _scheduler["thread"] = None
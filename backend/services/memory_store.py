@@ -1,48 +1,79 @@
+import contextvars
+
 from backend.services.vector_store_lance import (
-    write_memory as lancedb_write_memory,
     recall_memory as lancedb_recall_memory,
 )
+from backend.services.memory_writer import memory_writer
+from backend.services.session_store import create_session_store
 
 
 class ConversationMemory:
     """
     Stores short-term, in-session conversation memory.
-    This stays in RAM (not persisted).
+    Backed by a bounded session store (see session_store): last
+    SESSION_MAX_TURNS turns per session, idle / LRU eviction of whole
+    sessions, in-process or shared through Redis.
     """
-    def __init__(self):
-        self.sessions = {}  # session_id → list of turns
+    def __init__(self, store=None):
+        self.store = store or create_session_store()
 
     def add_message(self, session_id: str, user_msg: str, assistant_msg: str):
-        if session_id not in self.sessions:
-            self.sessions[session_id] = []
+        self.store.add_turn(session_id, user_msg, assistant_msg)
 
-        self.sessions[session_id].append({
-            "user": user_msg,
-            "assistant": assistant_msg
-        })
+    def get_history(self, session_id: str):
+        return self.store.get_history(session_id)
 
-        # Keep only last 5 turns
-        self.sessions[session_id] = self.sessions[session_id][-5:]
+    def clear(self, session_id: str):
+        self.store.clear(session_id)
 
-    def get_history(self, session_id: str):
-        return self.sessions.get(session_id, [])
+    def metrics(self) -> dict:
+        return self.store.metrics()
+
+
+# Shared process-wide instance
+conversation_memory = ConversationMemory()
 
 
 # ============================
 # 🔥 Long-Term Memory (LanceDB)
 # ============================
 
-def write_memory(user_msg: str, assistant_msg: str):
+# (session_id, user_id) of the current request. Set once by the endpoint;
+# tools and worker threads (to_thread / tool_executor copy the context) read
+# it, so memory stays scoped to one student without threading ids through
+# every call.
+_memory_scope = contextvars.ContextVar("memory_scope", default=(None, None))
+
+
+def set_memory_scope(session_id: str | None = None, user_id: str | None = None):
+    return _memory_scope.set((session_id or None, user_id or None))
+
+
+def current_memory_scope() -> tuple:
+    return _memory_scope.get()
+
+
+def write_memory(user_msg: str, assistant_msg: str, session_id: str | None = None, user_id: str | None = None):
     """
-    Persist memory to LanceDB.
+    Persist memory to LanceDB, write-behind: the turn is queued and embedded /
+    written in a batch by memory_writer, off the response path.
+    Scope defaults to the current request's (set_memory_scope); unscoped
+    turns are not stored, since no one may recall them.
+    Returns False if the turn was not queued (no scope, or queue full).
     """
-    text = f"User said: {user_msg}\nAssistant replied: {assistant_msg}"
-    return lancedb_write_memory(text)
+    if session_id is None and user_id is None:
+        session_id, user_id = _memory_scope.get()
+    if not session_id and not user_id:
+        return False
+    return memory_writer.submit(user_msg, assistant_msg, session_id, user_id)
 
 
-def recall_memory(query: str) -> str:
+def recall_memory(query: str, session_id: str | None = None, user_id: str | None = None,
+                  top_k: int = 1) -> str:
     """
-    Retrieve best-matching memory snippet from LanceDB.
+    Retrieve best-matching memory snippet(s) of the current session / user from LanceDB.
     """
-    result = lancedb_recall_memory(query)
-    return result or ""
\ No newline at end of file
+    if session_id is None and user_id is None:
+        session_id, user_id = _memory_scope.get()
+    result = lancedb_recall_memory(query, session_id=session_id, user_id=user_id, top_k=top_k)
+    return result or ""
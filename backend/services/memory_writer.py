@@ -0,0 +1,170 @@
+"""
+Write-behind queue for long-term memory.
+
+Persisting a turn means an embeddings call plus a LanceDB commit; neither
+belongs on the response path. submit() only enqueues the pair. A background
+thread drains the queue and writes a batch when MEMORY_FLUSH_BATCH turns are
+waiting or MEMORY_FLUSH_INTERVAL_SECONDS after the oldest one arrived,
+whichever comes first. One batch = one get_embedding() call + one Arrow
+batch appended to the memory table.
+
+Backpressure: the queue holds at most MEMORY_QUEUE_MAX turns. When it is
+full, submit() waits up to MEMORY_QUEUE_PUT_TIMEOUT seconds for room, then
+drops the turn (counted in metrics) rather than stall the request.
+
+flush() / close() drain the queue synchronously (close() runs on app shutdown).
+"""
+
+import os
+import time
+import queue
+import threading
+
+from backend.services import vector_store_lance
+
+MEMORY_QUEUE_MAX = int(os.getenv("MEMORY_QUEUE_MAX", "1000"))
+MEMORY_QUEUE_PUT_TIMEOUT = float(os.getenv("MEMORY_QUEUE_PUT_TIMEOUT", "0.05"))
+MEMORY_FLUSH_BATCH = int(os.getenv("MEMORY_FLUSH_BATCH", "32"))
+MEMORY_FLUSH_INTERVAL_SECONDS = float(os.getenv("MEMORY_FLUSH_INTERVAL_SECONDS", "2.0"))
+
+_STOP = object()
+
+
+class _FlushRequest:
+    """Queue marker: write everything queued before it, then signal."""
+
+    __slots__ = ("done",)
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class MemoryWriter:
+    def __init__(self, write_batch=None, max_queue: int = MEMORY_QUEUE_MAX, batch_size: int = MEMORY_FLUSH_BATCH,
+                 interval: float = MEMORY_FLUSH_INTERVAL_SECONDS, put_timeout: float = MEMORY_QUEUE_PUT_TIMEOUT):
+        self._write_batch = write_batch or vector_store_lance.write_memories
+        self.batch_size = max(1, batch_size)
+        self.interval = interval
+        self.put_timeout = put_timeout
+
+        self._queue = queue.Queue(maxsize=max(1, max_queue))
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self.stats = {"submitted": 0, "written": 0, "dropped": 0, "failed": 0, "flushes": 0,
+                      "flush_ms": 0.0}
+
+    # ---- producer side ----
+    def submit(self, user_msg: str, assistant_msg: str, session_id: str | None = None,
+               user_id: str | None = None) -> bool:
+        """Queue one turn for persistence. Returns False if it was dropped (queue full)."""
+        self._ensure_started()
+        try:
+            self._queue.put((user_msg, assistant_msg, session_id, user_id), timeout=self.put_timeout)
+        except queue.Full:
+            self._count("dropped")
+            print("Memory write queue full, dropping turn")
+            return False
+        self._count("submitted")
+        return True
+
+    def flush(self, timeout: float | None = 30.0) -> bool:
+        """Block until everything submitted so far is written (or timeout)."""
+        if self._thread is None or not self._thread.is_alive():
+            return self._queue.empty()
+        request = _FlushRequest()
+        try:
+            self._queue.put(request, timeout=timeout)
+        except queue.Full:
+            return False
+        return request.done.wait(timeout)
+
+    def close(self, timeout: float | None = 30.0):
+        """Flush and stop the background thread (app shutdown)."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        if not self.flush(timeout):
+            print(f"Memory write-behind: {self._queue.qsize()} turns not flushed before shutdown")
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    # ---- consumer side ----
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="memory-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            if isinstance(item, _FlushRequest):
+                item.done.set()
+                continue
+
+            batch = [item]
+            markers = []
+            stop = False
+            deadline = time.monotonic() + self.interval
+            # collect until the batch is full, the interval since the first turn is up, or a marker arrives
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                if isinstance(item, _FlushRequest):
+                    markers.append(item)
+                    break
+                batch.append(item)
+
+            self._write(batch)
+            for marker in markers:
+                marker.done.set()
+            if stop:
+                return
+
+    def _write(self, batch: list):
+        t0 = time.perf_counter()
+        try:
+            written = self._write_batch(batch)
+        except Exception as e:
+            print(f"Memory write-behind flush failed ({len(batch)} turns):", e)
+            self._count("failed", len(batch))
+            return
+        with self._lock:
+            self.stats["written"] += written
+            self.stats["flushes"] += 1
+            self.stats["flush_ms"] += (time.perf_counter() - t0) * 1000
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self.stats[key] += n
+
+    def metrics(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        flushes = stats["flushes"] or 1
+        return {
+            **stats,
+            "flush_ms": round(stats["flush_ms"], 1),
+            "avg_batch": round(stats["written"] / flushes, 2),
+            "avg_flush_ms": round(stats["flush_ms"] / flushes, 2),
+            "queued": self._queue.qsize(),
+            "max_queue": self._queue.maxsize,
+            "running": self._thread is not None and self._thread.is_alive(),
+        }
+
+
+# Shared process-wide writer
+memory_writer = MemoryWriter()
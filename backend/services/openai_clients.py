@@ -0,0 +1,58 @@
+"""
+Shared OpenAI clients.
+
+Every service imports `client` (sync) or `async_client` (AsyncOpenAI) from
+here instead of constructing its own, so the whole process reuses one tuned
+httpx connection pool per flavour: keep-alive connections to api.openai.com
+are shared across modules and requests, and HTTP/2 multiplexing is used when
+the `h2` package is installed (httpx[http2]).
+"""
+
+import os
+import httpx
+from openai import OpenAI, AsyncOpenAI
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+# ---------------------------------------------------------
+# Connection pool settings
+# ---------------------------------------------------------
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))
+OPENAI_TIMEOUT_SECONDS = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "30"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+
+
+def _http2_enabled() -> bool:
+    if os.getenv("OPENAI_HTTP2", "1") != "1":
+        return False
+    try:
+        import h2  # noqa: F401  (optional: installed via httpx[http2])
+        return True
+    except ImportError:
+        return False
+
+
+HTTP2 = _http2_enabled()
+
+_limits = httpx.Limits(
+    max_connections=OPENAI_MAX_CONNECTIONS,
+    max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+    keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+)
+_timeout = httpx.Timeout(OPENAI_TIMEOUT_SECONDS, connect=OPENAI_CONNECT_TIMEOUT)
+
+client = OpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    max_retries=OPENAI_MAX_RETRIES,
+    http_client=httpx.Client(limits=_limits, timeout=_timeout, http2=HTTP2),
+)
+
+async_client = AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    max_retries=OPENAI_MAX_RETRIES,
+    http_client=httpx.AsyncClient(limits=_limits, timeout=_timeout, http2=HTTP2),
+)
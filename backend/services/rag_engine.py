@@ -1,41 +1,139 @@
 import os
-from dotenv import load_dotenv
-from openai import OpenAI
-
-from backend.services.vector_store_lance import query_chunks
+import time
+import asyncio
+from backend.services.vector_store_lance import search_chunks, asearch_chunks, search_chunks_batch, asearch_chunks_batch
+from backend.services.retrieval_result import RetrievedChunk, merge_adjacent_chunks
+from backend.services.context_builder import pack_context
+from backend.services.retrieval_filters import RetrievalFilter, extract_video_filter
+from backend.services.answer_cache import answer_cache
 from backend.services.embedding_utils import get_single_embedding
 from backend.services.language_utils import is_hinglish
+from backend.services.request_trace import trace_span, record_usage
+from backend.services.openai_clients import client, async_client
+from backend.services.reranker import reranker, RERANK_CANDIDATES, RERANK_TOP_K
 
-load_dotenv(override=True)
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Chunks sent to the LLM when no reranker is configured
+RAG_TOP_K = 5
+# Merge hits that are neighbouring chunks of one video (drops the shared overlap)
+RAG_MERGE_NEIGHBORS = os.getenv("RAG_MERGE_NEIGHBORS", "1") == "1"
 
 
-def retrieve_relevant_chunks(query: str, top_k: int = 3):
+def retrieve_chunks(query: str, top_k: int | None = None, mode: str | None = None,
+                    merge_neighbors: bool = RAG_MERGE_NEIGHBORS,
+                    filters: RetrievalFilter | None = None) -> list[RetrievedChunk]:
+    """
+    Retrieve transcript chunks for a question.
+    With a reranker configured: over-fetch RERANK_CANDIDATES, keep the
+    cross-encoder's best top_k (default RERANK_TOP_K). Otherwise plain
+    retrieval of top_k (default RAG_TOP_K).
+    filters (RetrievalFilter) restrict the search to a video / range of videos.
+    """
+    if reranker.enabled:
+        top_k = top_k or RERANK_TOP_K
+        candidates = search_chunks(query, top_k=max(top_k, RERANK_CANDIDATES), mode=mode, filters=filters)
+        hits = reranker.rerank(query, candidates, top_k)
+    else:
+        hits = search_chunks(query, top_k=top_k or RAG_TOP_K, mode=mode, filters=filters)
+    return merge_adjacent_chunks(hits) if merge_neighbors else hits
+
+
+async def aretrieve_chunks(query: str, top_k: int | None = None, mode: str | None = None,
+                           merge_neighbors: bool = RAG_MERGE_NEIGHBORS,
+                           filters: RetrievalFilter | None = None) -> list[RetrievedChunk]:
+    """Async retrieve_chunks(); the CPU-bound rerank runs in a worker thread."""
+    if reranker.enabled:
+        top_k = top_k or RERANK_TOP_K
+        candidates = await asearch_chunks(query, top_k=max(top_k, RERANK_CANDIDATES), mode=mode,
+                                          filters=filters)
+        hits = await asyncio.to_thread(reranker.rerank, query, candidates, top_k)
+    else:
+        hits = await asearch_chunks(query, top_k=top_k or RAG_TOP_K, mode=mode, filters=filters)
+    return merge_adjacent_chunks(hits) if merge_neighbors else hits
+
+
+def _pick_filtered_or_fallback(query: str, filtered: list, fallback: list, top_k: int | None,
+                               merge_neighbors: bool) -> list[RetrievedChunk]:
+    hits = filtered or fallback
+    if reranker.enabled:
+        hits = reranker.rerank(query, hits, top_k or RERANK_TOP_K)
+    return merge_adjacent_chunks(hits) if merge_neighbors else hits
+
+
+def _fallback_k(top_k: int | None) -> int:
+    return max(top_k or RERANK_TOP_K, RERANK_CANDIDATES) if reranker.enabled else (top_k or RAG_TOP_K)
+
+
+def retrieve_chunks_with_fallback(query: str, filters: RetrievalFilter | None, top_k: int | None = None,
+                                  mode: str | None = None,
+                                  merge_neighbors: bool = RAG_MERGE_NEIGHBORS) -> list[RetrievedChunk]:
+    """
+    retrieve_chunks() restricted to filters ("... in video 3"), falling back
+    to the whole corpus when the filter matches nothing. Both searches go
+    through one search_chunks_batch() call (one embedding, run concurrently),
+    so the fallback adds no second round trip.
+    """
+    if filters is None:
+        return retrieve_chunks(query, top_k=top_k, mode=mode, merge_neighbors=merge_neighbors)
+    filtered, fallback = search_chunks_batch([query, query], top_k=_fallback_k(top_k), mode=mode,
+                                             filters=[filters, None])
+    return _pick_filtered_or_fallback(query, filtered, fallback, top_k, merge_neighbors)
+
+
+async def aretrieve_chunks_with_fallback(query: str, filters: RetrievalFilter | None, top_k: int | None = None,
+                                         mode: str | None = None,
+                                         merge_neighbors: bool = RAG_MERGE_NEIGHBORS) -> list[RetrievedChunk]:
+    """Async retrieve_chunks_with_fallback(); the rerank runs in a worker thread."""
+    if filters is None:
+        return await aretrieve_chunks(query, top_k=top_k, mode=mode, merge_neighbors=merge_neighbors)
+    filtered, fallback = await asearch_chunks_batch([query, query], top_k=_fallback_k(top_k), mode=mode,
+                                                    filters=[filters, None])
+    return await asyncio.to_thread(_pick_filtered_or_fallback, query, filtered, fallback, top_k,
+                                   merge_neighbors)
+
+
+def retrieve_relevant_chunks(query: str, top_k: int = 3, mode: str | None = None,
+                             filters: RetrievalFilter | None = None):
     """
     LanceDB-compatible retrieval for backwards compatibility.
+    mode: "vector", "bm25" or "hybrid" (default: RETRIEVAL_MODE env).
+    filters: RetrievalFilter, or None to use the video reference in the query (if any).
     Returns:
       documents: list[str]
-      metadatas: None (LanceDB does not store metadata by default)
+      metadatas: list[dict] with video, chunk_index, end_index, distance
     """
     try:
-        documents = query_chunks(query)[:top_k]
-        return documents, None
+        hits = retrieve_chunks(query, top_k=top_k, mode=mode,
+                               filters=filters or extract_video_filter(query))
     except Exception:
-        return [], None
+        return [], []
+
+    metadatas = []
+    for h in hits:
+        meta = h.to_dict()
+        del meta["text"]
+        metadatas.append(meta)
+    return [h.text for h in hits], metadatas
 
 
 # ------------------------------------------------------------
 # Build transcript context
 # ------------------------------------------------------------
-def build_context(chunks: list) -> str:
-    return "\n\n".join(chunks)
+def build_context(chunks: list, budget_tokens: int | None = None) -> str:
+    """
+    Pack best-first chunks into the context token budget (near-duplicates
+    dropped). RetrievedChunk hits get a source line so answers can cite the video.
+    """
+    context, stats = pack_context(chunks, budget_tokens)
+    print(f"RAG context: {stats['chunks_used']}/{stats['chunks_in']} chunks, "
+          f"{stats['context_tokens']}/{stats['budget_tokens']} tokens, "
+          f"{stats['duplicates_dropped']} duplicates dropped")
+    return context
 
 
 # ------------------------------------------------------------
 # Generate answer with persona + Hinglish rules
 # ------------------------------------------------------------
-def generate_llm_answer(query: str, context: str):
+def _rag_messages(query: str, context: str) -> list:
     system_prompt = f"""
 You are HAI Buddy — a friendly male buddy who explains concepts in a casual, simple, and helpful way.
 Keep responses short (2–3 sentences), warm, conversational, and never formal or academic.
@@ -45,6 +143,7 @@ Rules:
 - If user speaks English → reply ONLY in English.
 - Match user tone exactly.
 - No emojis or “buddy/friend/haha”.
+- If it helps, mention which video a fact came from (see the [Source: ...] lines).
 
 Use ONLY this transcript context:
 
@@ -67,11 +166,33 @@ Use ONLY this transcript context:
             )
         })
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=messages,
-        max_tokens=300
-    )
+    return messages
+
+
+def generate_llm_answer(query: str, context: str):
+    messages = _rag_messages(query, context)
+
+    with trace_span("llm", "rag_answer") as span:
+        response = client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=messages,
+            max_tokens=300
+        )
+        record_usage(span, response)
+
+    return response.choices[0].message.content
+
+
+async def agenerate_llm_answer(query: str, context: str):
+    messages = _rag_messages(query, context)
+
+    with trace_span("llm", "rag_answer") as span:
+        response = await async_client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=messages,
+            max_tokens=300
+        )
+        record_usage(span, response)
 
     return response.choices[0].message.content
 
@@ -81,13 +202,19 @@ Use ONLY this transcript context:
 # ------------------------------------------------------------
 def answer_with_rag(question: str) -> str:
     """
-    1. Retrieve relevant transcript chunks using LanceDB
+    0. Semantic answer cache (paraphrases of earlier questions)
+    1. Retrieve relevant transcript chunks using LanceDB (+ optional rerank)
     2. Build RAG context
     3. Generate final answer
     """
+    t0 = time.perf_counter()
+    cached = answer_cache.lookup(question, "rag")
+    if cached is not None:
+        return cached
 
     # LanceDB handles embedding internally → pass raw question text
-    chunks = query_chunks(question)
+    # "... in video 3" → search only that video; fall back to the whole corpus
+    chunks = retrieve_chunks_with_fallback(question, extract_video_filter(question))
 
     if not chunks:
         return "Sorry, I could not find relevant information in your course transcripts."
@@ -96,4 +223,26 @@ def answer_with_rag(question: str) -> str:
 
     # Final LLM response
     answer = generate_llm_answer(question, context)
-    return answer
\ No newline at end of file
+    answer_cache.store(question, answer, "rag", (time.perf_counter() - t0) * 1000)
+    return answer
+
+
+async def aanswer_with_rag(question: str) -> str:
+    """
+    Async answer_with_rag(): same steps, no blocked worker thread.
+    """
+    t0 = time.perf_counter()
+    cached = await answer_cache.alookup(question, "rag")
+    if cached is not None:
+        return cached
+
+    chunks = await aretrieve_chunks_with_fallback(question, extract_video_filter(question))
+
+    if not chunks:
+        return "Sorry, I could not find relevant information in your course transcripts."
+
+    context = build_context(chunks)
+
+    answer = await agenerate_llm_answer(question, context)
+    await answer_cache.astore(question, answer, "rag", (time.perf_counter() - t0) * 1000)
+    return answer
@@ -1,9 +1,7 @@
-import os
-from openai import OpenAI
-
 from backend.services.vector_store_lance import query_chunks
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from backend.services.request_trace import trace_span, record_usage
+from backend.services.context_builder import pack_context
+from backend.services.openai_clients import client
 
 
 def rag_answer(query: str):
@@ -20,8 +18,10 @@ def rag_answer(query: str):
     if not retrieved_chunks:
         return "I don’t see this in the uploaded course transcripts."
 
-    # 2. Build RAG context block
-    context_text = "\n\n".join(retrieved_chunks)
+    # 2. Build RAG context block (token budget, near-duplicates dropped)
+    context_text, stats = pack_context(retrieved_chunks)
+    print(f"RAG context: {stats['chunks_used']}/{stats['chunks_in']} chunks, "
+          f"{stats['context_tokens']} tokens")
 
     prompt = f"""
 You are a helpful AI tutor.
@@ -42,12 +42,14 @@ Answer clearly and concisely. Use bullet points if helpful.
 """
 
     # 3. Generate final answer using OpenAI LLM
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "user", "content": prompt}
-        ],
-        max_tokens=300
-    )
+    with trace_span("llm", "rag_answer") as span:
+        response = client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=300
+        )
+        record_usage(span, response)
 
     return response.choices[0].message.content
\ No newline at end of file
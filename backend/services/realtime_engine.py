@@ -2,16 +2,15 @@ import json
 import base64
 from typing import AsyncGenerator
 
-from openai import AsyncOpenAI
-
-from backend.services.rag_engine import query_chunks, generate_llm_answer
+from backend.services.rag_engine import retrieve_chunks, build_context, generate_llm_answer
 from backend.services.memory_store import write_memory
 from backend.services.language_utils import is_hinglish
 from backend.services.tts import synthesize_text_to_gcs
+from backend.services.openai_clients import async_client
 
 
-# Initialize OpenAI realtime client
-client = AsyncOpenAI()
+# Shared async OpenAI client (pooled connections)
+client = async_client
 
 async def process_realtime_message(event: dict) -> AsyncGenerator[dict, None]:
     """
@@ -31,18 +30,18 @@ async def process_realtime_message(event: dict) -> AsyncGenerator[dict, None]:
     if event.get("type") == "response.output_text.done":
         full_text = event.get("text", "")
 
-        # 2. Store to memory
-        update_memory("user_last_message", full_text)
-
-        # 3. Determine language (English / Hinglish)
+        # 2. Determine language (English / Hinglish)
         hinglish = is_hinglish(full_text)
 
-        # 4. Retrieve RAG context
-        context = query_chunks(full_text)
+        # 3. Retrieve RAG context
+        context = build_context(retrieve_chunks(full_text))
 
-        # 5. Generate final answer (CrewAI logic happens in generate_llm_answer)
+        # 4. Generate final answer (CrewAI logic happens in generate_llm_answer)
         final_answer = generate_llm_answer(full_text, context)
 
+        # 5. Store to long-term memory (queued; written in the background)
+        write_memory(full_text, final_answer)
+
         # 6. Convert answer to TTS (GCS URL)
         audio_url = synthesize_text_to_gcs(final_answer)
 
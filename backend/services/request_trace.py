@@ -0,0 +1,95 @@
+"""
+Per-request trace of LLM / embedding / tool calls.
+
+A trace is bound to the current context (contextvars), so any code running
+inside the request — including tool threads started with
+contextvars.copy_context() — can record spans without passing objects around:
+
+    trace = start_trace("ask")
+    with trace_span("llm", "classify_intent"):
+        ...
+    print(trace.to_dict())
+
+When no trace is active, trace_span() is a no-op.
+
+Set trace.listener to a callable to be notified of every finished span
+(used by the streaming orchestrator to emit progress events).
+"""
+
+import time
+import contextvars
+from contextlib import contextmanager
+
+_current_trace = contextvars.ContextVar("request_trace", default=None)
+
+
+class RequestTrace:
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.spans = []  # list.append is atomic, safe from tool threads
+        self.listener = None  # optional callable(span) fired when a span finishes
+
+    @contextmanager
+    def span(self, kind: str, name: str, **attrs):
+        span = {"kind": kind, "name": name, **attrs}
+        t0 = time.perf_counter()
+        span["start_ms"] = round((t0 - self.started) * 1000, 1)
+        try:
+            yield span
+            span.setdefault("status", "ok")
+        except BaseException as e:
+            span["status"] = f"error: {type(e).__name__}"
+            raise
+        finally:
+            span["duration_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+            self.spans.append(span)
+            if self.listener is not None:
+                try:
+                    self.listener(dict(span))
+                except Exception as e:
+                    print("Trace listener error:", e)
+
+    def count(self, kind: str) -> int:
+        return sum(1 for s in self.spans if s["kind"] == kind)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "llm_calls": self.count("llm"),
+            "embedding_calls": self.count("embedding"),
+            "tool_calls": self.count("tool"),
+            "prompt_tokens": sum(s.get("prompt_tokens", 0) for s in self.spans),
+            "completion_tokens": sum(s.get("completion_tokens", 0) for s in self.spans),
+            "spans": sorted(self.spans, key=lambda s: s["start_ms"]),
+        }
+
+
+def start_trace(name: str) -> RequestTrace:
+    trace = RequestTrace(name)
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextmanager
+def trace_span(kind: str, name: str, **attrs):
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    with trace.span(kind, name, **attrs) as span:
+        yield span
+
+
+def record_usage(span, response):
+    """Copy an OpenAI response's token usage onto a span (no-op without a trace)."""
+    usage = getattr(response, "usage", None)
+    if span is None or usage is None:
+        return
+    span["prompt_tokens"] = usage.prompt_tokens
+    span["completion_tokens"] = usage.completion_tokens
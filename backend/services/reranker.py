@@ -0,0 +1,152 @@
+"""
+Optional cross-encoder reranking for transcript retrieval.
+
+Retrieval over-fetches RERANK_CANDIDATES chunks and a small CPU cross-encoder
+(ONNX runtime) scores each (question, chunk) pair, so only the best
+RERANK_TOP_K chunks go into the prompt: shorter prompts, faster and cheaper
+generation.
+
+Enable by pointing RERANKER_MODEL_DIR at a folder containing an exported
+cross-encoder (e.g. cross-encoder/ms-marco-MiniLM-L-6-v2):
+    model.onnx       single relevance logit (or 2-class logits) per pair
+    tokenizer.json   HuggingFace `tokenizers` file
+
+Scoring runs in batches under a hard latency budget (RERANK_BUDGET_MS). If
+the budget runs out, or the model is missing / fails, the original vector
+order is kept — reranking can only make a request slower by the budget.
+"""
+
+import os
+import time
+import threading
+
+import numpy as np
+
+from backend.services.request_trace import trace_span
+
+RERANKER_MODEL_DIR = os.getenv("RERANKER_MODEL_DIR", "")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "50"))
+RERANK_TOP_K = int(os.getenv("RERANK_TOP_K", "3"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "150"))
+RERANK_MAX_LENGTH = int(os.getenv("RERANK_MAX_LENGTH", "256"))
+RERANK_THREADS = int(os.getenv("RERANK_THREADS", "0"))  # 0 = onnxruntime default
+
+
+class CrossEncoderReranker:
+    def __init__(self, model_dir: str = RERANKER_MODEL_DIR, batch_size: int = RERANK_BATCH_SIZE,
+                 budget_ms: float = RERANK_BUDGET_MS, max_length: int = RERANK_MAX_LENGTH):
+        self.model_dir = model_dir
+        self.batch_size = batch_size
+        self.budget_ms = budget_ms
+        self.max_length = max_length
+
+        self._session = None
+        self._tokenizer = None
+        self._input_names = ()
+        self._load_failed = False
+        self._lock = threading.Lock()
+
+        self.stats = {"reranked": 0, "budget_exceeded": 0, "errors": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.model_dir) and not self._load_failed
+
+    def _load(self) -> bool:
+        """Load the ONNX session + tokenizer once; disable reranking if that fails."""
+        if self._session is not None:
+            return True
+        with self._lock:
+            if self._session is not None:
+                return True
+            if self._load_failed:
+                return False
+            try:
+                import onnxruntime as ort
+                from tokenizers import Tokenizer
+
+                tokenizer = Tokenizer.from_file(os.path.join(self.model_dir, "tokenizer.json"))
+                tokenizer.enable_truncation(max_length=self.max_length)
+                tokenizer.enable_padding()
+
+                options = ort.SessionOptions()
+                if RERANK_THREADS:
+                    options.intra_op_num_threads = RERANK_THREADS
+                session = ort.InferenceSession(
+                    os.path.join(self.model_dir, "model.onnx"),
+                    sess_options=options,
+                    providers=["CPUExecutionProvider"],
+                )
+            except Exception as e:
+                print("Reranker disabled, could not load model:", e)
+                self._load_failed = True
+                return False
+
+            self._tokenizer = tokenizer
+            self._input_names = {i.name for i in session.get_inputs()}
+            self._session = session
+            print(f"Reranker loaded from {self.model_dir}")
+            return True
+
+    def _score_batch(self, query: str, chunks: list[str]) -> np.ndarray:
+        encodings = self._tokenizer.encode_batch([(query, chunk) for chunk in chunks])
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        feeds = {name: arr for name, arr in feeds.items() if name in self._input_names}
+
+        logits = self._session.run(None, feeds)[0]
+        if logits.ndim == 1:
+            return logits
+        # single relevance logit, or [not-relevant, relevant] pair
+        return logits[:, -1]
+
+    def rerank(self, query: str, chunks: list, top_k: int = RERANK_TOP_K) -> list:
+        """
+        Return the top_k chunks (str or RetrievedChunk) by cross-encoder score.
+        Falls back to chunks[:top_k] (retrieval order) when disabled,
+        over budget, or on error.
+        """
+        if len(chunks) <= 1 or not self.enabled or not self._load():
+            return chunks[:top_k]
+
+        texts = [getattr(c, "text", c) for c in chunks]
+        with trace_span("rerank", "cross_encoder", candidates=len(chunks)) as span:
+            t0 = time.perf_counter()
+            scores = []
+            try:
+                for start in range(0, len(chunks), self.batch_size):
+                    if (time.perf_counter() - t0) * 1000 > self.budget_ms:
+                        self.stats["budget_exceeded"] += 1
+                        if span is not None:
+                            span["status"] = "budget_exceeded"
+                        return chunks[:top_k]
+                    scores.append(self._score_batch(query, texts[start:start + self.batch_size]))
+            except Exception as e:
+                print("Reranker error:", e)
+                self.stats["errors"] += 1
+                if span is not None:
+                    span["status"] = "error"
+                return chunks[:top_k]
+
+            # the last batch may have overrun the budget; its scores are already paid for
+            order = np.argsort(-np.concatenate(scores), kind="stable")[:top_k]
+            self.stats["reranked"] += 1
+            return [chunks[i] for i in order]
+
+    def metrics(self) -> dict:
+        return {
+            **self.stats,
+            "enabled": self.enabled,
+            "loaded": self._session is not None,
+            "candidates": RERANK_CANDIDATES,
+            "top_k": RERANK_TOP_K,
+            "budget_ms": self.budget_ms,
+        }
+
+
+# Shared process-wide reranker (loaded lazily on first use)
+reranker = CrossEncoderReranker()
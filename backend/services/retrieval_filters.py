@@ -0,0 +1,135 @@
+"""
+Structured filters for transcript retrieval, plus a lightweight extractor
+that pulls a video reference out of the question.
+
+    f = extract_video_filter("Make notes for video 3")   # RetrievalFilter(video_numbers=(3,))
+    f.to_where()  # "video_number IN (3)"  → pushed to LanceDB as a prefilter
+
+Video numbers come from the transcript file name (video_id "video3",
+"lecture_03_agents" → 3), stored in the `video_number` column at index time.
+"""
+
+import re
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+_VIDEO_NUMBER_RE = re.compile(r"\d+")
+
+_VIDEO_WORDS = r"(?:videos?|vids?|lectures?|lec|lessons?|class(?:es)?|sessions?|episodes?|ep)"
+# "video 3", "lecture-15", "video #4", "videos 3-5", "video 3 to 5", "video 3 se 5"
+_VIDEO_REF_RE = re.compile(
+    rf"\b{_VIDEO_WORDS}[\s\-_#:.]*(?:no\.?\s*|number\s*)?(\d{{1,3}})"
+    r"(?:\s*(?:-|–|to|till|until|se|through)\s*(\d{1,3}))?\b",
+    re.IGNORECASE,
+)
+# "3rd video", "2nd lecture"
+_ORDINAL_REF_RE = re.compile(rf"\b(\d{{1,3}})(?:st|nd|rd|th)\s+{_VIDEO_WORDS}\b", re.IGNORECASE)
+# "and 5" / ", 7" following a match: "video 3 and 5"
+_MORE_NUMBERS_RE = re.compile(r"^(?:\s*(?:,|and|&|aur)\s*(\d{1,3})\b)+", re.IGNORECASE)
+
+
+def video_number_from_id(video_id: str) -> int | None:
+    """First integer in the video id ("video3" → 3), or None."""
+    match = _VIDEO_NUMBER_RE.search(video_id or "")
+    return int(match.group()) if match else None
+
+
+class RetrievalFilter:
+    """
+    All fields optional; set fields are ANDed.
+      video          exact video id
+      video_numbers  any of these video numbers
+      video_range    (lo, hi) inclusive; either side may be None
+      chunk_range    (lo, hi) inclusive chunk_index bounds
+    """
+
+    __slots__ = ("video", "video_numbers", "video_range", "chunk_range")
+
+    def __init__(self, video: str | None = None, video_numbers=None, video_range=None, chunk_range=None):
+        self.video = video
+        self.video_numbers = tuple(sorted(set(video_numbers))) if video_numbers else None
+        self.video_range = tuple(video_range) if video_range else None
+        self.chunk_range = tuple(chunk_range) if chunk_range else None
+
+    def __bool__(self):
+        return any((self.video, self.video_numbers, self.video_range, self.chunk_range))
+
+    def __repr__(self):
+        fields = ", ".join(f"{k}={getattr(self, k)!r}" for k in self.__slots__ if getattr(self, k))
+        return f"RetrievalFilter({fields})"
+
+    def to_where(self) -> str | None:
+        """SQL predicate for LanceDB .where(..., prefilter=True)."""
+        clauses = []
+        if self.video:
+            clauses.append("video = '{}'".format(self.video.replace("'", "''")))
+        if self.video_numbers:
+            clauses.append(f"video_number IN ({', '.join(str(int(n)) for n in self.video_numbers)})")
+        clauses += _range_clauses("video_number", self.video_range)
+        clauses += _range_clauses("chunk_index", self.chunk_range)
+        return " AND ".join(clauses) or None
+
+    def mask(self, table: pa.Table):
+        """Same predicate evaluated on an Arrow table (for the in-memory BM25 index)."""
+        mask = pa.array([True] * table.num_rows)
+        if self.video:
+            mask = pc.and_(mask, pc.equal(table["video"], self.video))
+        if self.video_numbers:
+            mask = pc.and_(mask, pc.is_in(table["video_number"], value_set=pa.array(self.video_numbers, pa.int32())))
+        mask = _range_mask(mask, table, "video_number", self.video_range)
+        mask = _range_mask(mask, table, "chunk_index", self.chunk_range)
+        return pc.fill_null(mask, False)
+
+
+def _range_clauses(column: str, bounds) -> list:
+    if not bounds:
+        return []
+    lo, hi = bounds
+    clauses = []
+    if lo is not None:
+        clauses.append(f"{column} >= {int(lo)}")
+    if hi is not None:
+        clauses.append(f"{column} <= {int(hi)}")
+    return clauses
+
+
+def _range_mask(mask, table: pa.Table, column: str, bounds):
+    if not bounds:
+        return mask
+    lo, hi = bounds
+    if lo is not None:
+        mask = pc.and_(mask, pc.greater_equal(table[column], int(lo)))
+    if hi is not None:
+        mask = pc.and_(mask, pc.less_equal(table[column], int(hi)))
+    return mask
+
+
+def extract_video_filter(question: str) -> RetrievalFilter | None:
+    """
+    Pull a video reference out of the question ("notes for video 3",
+    "videos 2-4", "3rd lecture", "video 3 and 5"). Returns None if there is none.
+    """
+    numbers = set()
+    video_range = None
+
+    for match in _VIDEO_REF_RE.finditer(question):
+        first, last = match.group(1), match.group(2)
+        if last is not None:
+            lo, hi = sorted((int(first), int(last)))
+            video_range = (lo, hi)
+            continue
+        numbers.add(int(first))
+        more = _MORE_NUMBERS_RE.match(question[match.end():])
+        if more:
+            numbers.update(int(n) for n in re.findall(r"\d{1,3}", more.group()))
+
+    numbers.update(int(m.group(1)) for m in _ORDINAL_REF_RE.finditer(question))
+
+    if video_range and not numbers:
+        return RetrievalFilter(video_range=video_range)
+    if numbers:
+        if video_range:
+            numbers.update(range(video_range[0], video_range[1] + 1))
+        return RetrievalFilter(video_numbers=numbers)
+    return None
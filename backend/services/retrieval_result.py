@@ -0,0 +1,99 @@
+"""
+Typed retrieval hits and neighbor-chunk merging.
+
+RetrievedChunk keeps what LanceDB already returns (video, chunk_index,
+distance) instead of dropping it down to a bare string, so prompts can say
+which video a fact came from.
+
+merge_adjacent_chunks() joins hits that are consecutive chunks of the same
+video. text_chunker.chunk_text() makes consecutive chunks share `overlap`
+tokens, so the shared text is sent to the LLM only once.
+"""
+
+from backend.services.text_chunker import ENCODER
+
+# Must match the overlap used by load_and_index_transcripts()
+CHUNK_OVERLAP_TOKENS = 50
+
+
+class RetrievedChunk:
+    __slots__ = ("video", "chunk_index", "distance", "text", "end_index")
+
+    def __init__(self, video: str, chunk_index: int, distance: float | None, text: str,
+                 end_index: int | None = None):
+        self.video = video
+        self.chunk_index = chunk_index
+        self.distance = distance  # L2 distance from the query; None for keyword-only hits
+        self.text = text
+        self.end_index = chunk_index if end_index is None else end_index  # last chunk after merging
+
+    @property
+    def key(self) -> tuple:
+        return (self.video, self.chunk_index)
+
+    @property
+    def source(self) -> str:
+        """Human-readable citation, e.g. 'video3.txt, chunks 4-5'."""
+        if self.end_index != self.chunk_index:
+            return f"{self.video}, chunks {self.chunk_index}-{self.end_index}"
+        return f"{self.video}, chunk {self.chunk_index}"
+
+    def to_dict(self) -> dict:
+        return {
+            "video": self.video,
+            "chunk_index": self.chunk_index,
+            "end_index": self.end_index,
+            "distance": self.distance,
+            "text": self.text,
+        }
+
+    def __repr__(self):
+        return f"RetrievedChunk({self.source!r}, distance={self.distance})"
+
+
+def _join_overlapping(first: str, second: str, overlap_tokens: int) -> str:
+    """Append `second` to `first`, dropping the tokens they share."""
+    tokens = ENCODER.encode(second)
+    head = ENCODER.decode(tokens[:overlap_tokens])
+    if head and first.endswith(head):
+        return first + ENCODER.decode(tokens[overlap_tokens:])
+
+    # token boundaries can shift after decode/encode; fall back to a text match
+    # (at least ~5 tokens long, so a stray shared character is not treated as overlap)
+    for size in range(min(len(first), len(second), overlap_tokens * 8), 19, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+    return first + "\n" + second
+
+
+def merge_adjacent_chunks(hits: list, overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> list:
+    """
+    Merge hits that are consecutive chunks (same video, chunk_index n and n+1)
+    into one RetrievedChunk spanning both, with the overlap removed.
+    A merged hit keeps the best (smallest) distance of its parts and takes
+    the rank of its best-ranked part; other hits keep their order.
+    """
+    if len(hits) < 2:
+        return list(hits)
+
+    rank = {h.key: i for i, h in enumerate(hits)}
+    merged = []
+    for h in sorted(hits, key=lambda h: (h.video, h.chunk_index)):
+        prev = merged[-1][0] if merged else None
+        if prev is not None and prev.video == h.video and h.chunk_index == prev.end_index + 1:
+            distances = [d for d in (prev.distance, h.distance) if d is not None]
+            merged[-1] = (
+                RetrievedChunk(
+                    prev.video,
+                    prev.chunk_index,
+                    min(distances) if distances else None,
+                    _join_overlapping(prev.text, h.text, overlap_tokens),
+                    end_index=h.chunk_index,
+                ),
+                min(merged[-1][1], rank[h.key]),
+            )
+        else:
+            merged.append((h, rank[h.key]))
+
+    merged.sort(key=lambda pair: pair[1])
+    return [h for h, _ in merged]
@@ -1,21 +1,51 @@
-from backend.services.intent_classifier import classify_intent
-from backend.services.rag_engine import answer_with_rag
-from backend.services.code_helper import answer_code_question
-from backend.services.summary_service import generate_summary_for_question
+import asyncio
+
+from backend.services.intent_classifier import classify_intent, aclassify_intent
+from backend.services.rag_engine import answer_with_rag, aanswer_with_rag
+from backend.services.code_helper import answer_code_question, aanswer_code_question
+from backend.services.summary_service import generate_summary_for_question, agenerate_summary_for_question
 from backend.services.memory_store import recall_memory
-from openai import OpenAI
-import os
+from backend.services.request_trace import trace_span
+from backend.services.openai_clients import client, async_client
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+GENERAL_SYSTEM_PROMPT = "Be a friendly, helpful HAI Buddy."
 
 
-def route_question(question: str) -> tuple[str, str]:
+def answer_general_question(question: str) -> str:
     """
-    Accepts question and returns:
-    (answer_text, intent)
+    General AI knowledge — direct LLM call, no retrieval.
     """
+    with trace_span("llm", "general_answer"):
+        response = client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": GENERAL_SYSTEM_PROMPT},
+                {"role": "user", "content": question}
+            ],
+            max_tokens=300
+        )
+    return response.choices[0].message.content
 
-    intent = classify_intent(question)
+
+async def aanswer_general_question(question: str) -> str:
+    with trace_span("llm", "general_answer"):
+        response = await async_client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": GENERAL_SYSTEM_PROMPT},
+                {"role": "user", "content": question}
+            ],
+            max_tokens=300
+        )
+    return response.choices[0].message.content
+
+
+def answer_for_intent(question: str, intent: str) -> tuple[str, str]:
+    """
+    Runs exactly one tool for an already-classified intent.
+    Returns:
+    (answer_text, intent)
+    """
 
     # 1) COURSE RAG
     if intent == "course_rag":
@@ -24,15 +54,7 @@ def route_question(question: str) -> tuple[str, str]:
 
     # 2) GENERAL AI KNOWLEDGE
     if intent == "general_ai":
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "Be a friendly, helpful HAI Buddy."},
-                {"role": "user", "content": question}
-            ],
-            max_tokens=300
-        )
-        return response.choices[0].message.content, intent
+        return answer_general_question(question), intent
 
     # 3) CODE HELP
     if intent == "code_help":
@@ -51,4 +73,43 @@ def route_question(question: str) -> tuple[str, str]:
 
     # FALLBACK
     fallback = f"I think you're asking about your course. Here's what I found:\n\n{answer_with_rag(question)}"
-    return fallback, "fallback"
\ No newline at end of file
+    return fallback, "fallback"
+
+
+def route_question(question: str) -> tuple[str, str]:
+    """
+    Accepts question and returns:
+    (answer_text, intent)
+    """
+
+    intent = classify_intent(question)
+    return answer_for_intent(question, intent)
+
+
+async def aanswer_for_intent(question: str, intent: str) -> tuple[str, str]:
+    """
+    Async answer_for_intent(): OpenAI calls are awaited on the shared
+    async client; only local LanceDB work runs in a worker thread.
+    """
+    if intent == "course_rag":
+        return await aanswer_with_rag(question), intent
+
+    if intent == "general_ai":
+        return await aanswer_general_question(question), intent
+
+    if intent == "code_help":
+        return await aanswer_code_question(question), intent
+
+    if intent == "notes":
+        return await agenerate_summary_for_question(question), intent
+
+    if intent == "memory":
+        return await asyncio.to_thread(recall_memory, question), intent
+
+    fallback = f"I think you're asking about your course. Here's what I found:\n\n{await aanswer_with_rag(question)}"
+    return fallback, "fallback"
+
+
+async def aroute_question(question: str) -> tuple[str, str]:
+    intent = await aclassify_intent(question)
+    return await aanswer_for_intent(question, intent)
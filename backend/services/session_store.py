@@ -0,0 +1,242 @@
+"""
+Short-term conversation history per session, bounded.
+
+Each session keeps its last SESSION_MAX_TURNS turns (deque(maxlen), so
+adding a turn never rebuilds the list). Whole sessions are evicted:
+  - idle longer than SESSION_IDLE_TTL_SECONDS
+  - least recently used first, once there are more than SESSION_MAX_SESSIONS
+    sessions or their turns exceed SESSION_MAX_BYTES in total
+
+SESSION_STORE selects the backend:
+  memory  in-process (default); history is per worker
+  redis   any Redis-compatible server at SESSION_REDIS_URL, so all workers /
+          instances share history (needs the `redis` package)
+"""
+
+import os
+import json
+import time
+import threading
+from collections import OrderedDict, deque
+
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "5"))
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+SESSION_IDLE_TTL_SECONDS = float(os.getenv("SESSION_IDLE_TTL_SECONDS", "3600"))
+SESSION_REDIS_URL = os.getenv("SESSION_REDIS_URL", "redis://localhost:6379/0")
+SESSION_REDIS_PREFIX = os.getenv("SESSION_REDIS_PREFIX", "hai:session:")
+
+
+def _turn_bytes(turn: dict) -> int:
+    return len(turn["user"].encode("utf-8")) + len(turn["assistant"].encode("utf-8"))
+
+
+class _Session:
+    __slots__ = ("turns", "last_seen", "nbytes")
+
+    def __init__(self, max_turns: int):
+        self.turns = deque(maxlen=max_turns)
+        self.last_seen = time.time()
+        self.nbytes = 0
+
+
+class InProcessSessionStore:
+    """
+    OrderedDict kept in access order: the least recently used session is
+    always first, so idle and LRU eviction both pop from the front.
+    """
+
+    def __init__(self, max_turns: int = SESSION_MAX_TURNS, max_sessions: int = SESSION_MAX_SESSIONS,
+                 max_bytes: int = SESSION_MAX_BYTES, idle_ttl: float = SESSION_IDLE_TTL_SECONDS):
+        self.max_turns = max_turns
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+
+        self._sessions = OrderedDict()  # session_id -> _Session
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"turns_added": 0, "evicted_idle": 0, "evicted_lru": 0}
+
+    # ---- internal helpers (caller holds the lock) ----
+    def _drop(self, session_id: str):
+        session = self._sessions.pop(session_id)
+        self._nbytes -= session.nbytes
+
+    def _evict(self, now: float):
+        cutoff = now - self.idle_ttl
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_seen >= cutoff:
+                break
+            self._drop(session_id)
+            self.stats["evicted_idle"] += 1
+
+        # keep the newest session even if it alone exceeds max_bytes
+        while len(self._sessions) > 1 and (len(self._sessions) > self.max_sessions or self._nbytes > self.max_bytes):
+            self._drop(next(iter(self._sessions)))
+            self.stats["evicted_lru"] += 1
+
+    # ---- public API ----
+    def add_turn(self, session_id: str, user_msg: str, assistant_msg: str):
+        turn = {"user": user_msg, "assistant": assistant_msg}
+        size = _turn_bytes(turn)
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = _Session(self.max_turns)
+            else:
+                self._sessions.move_to_end(session_id)
+
+            if len(session.turns) == session.turns.maxlen:
+                dropped = _turn_bytes(session.turns[0])
+                session.nbytes -= dropped
+                self._nbytes -= dropped
+            session.turns.append(turn)
+            session.nbytes += size
+            self._nbytes += size
+            session.last_seen = now
+            self.stats["turns_added"] += 1
+
+            self._evict(now)
+
+    def get_history(self, session_id: str) -> list:
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return []
+            if now - session.last_seen > self.idle_ttl:
+                self._drop(session_id)
+                self.stats["evicted_idle"] += 1
+                return []
+            session.last_seen = now
+            self._sessions.move_to_end(session_id)
+            return list(session.turns)
+
+    def clear(self, session_id: str):
+        with self._lock:
+            if session_id in self._sessions:
+                self._drop(session_id)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            self._evict(time.time())
+            return {
+                **self.stats,
+                "backend": "memory",
+                "sessions": len(self._sessions),
+                "bytes": self._nbytes,
+                "max_sessions": self.max_sessions,
+                "max_bytes": self.max_bytes,
+                "idle_ttl_seconds": self.idle_ttl,
+            }
+
+
+class RedisSessionStore:
+    """
+    One Redis list per session (RPUSH + LTRIM keeps the last max_turns), an
+    idle TTL on the key, and a sorted set of session ids by last access so the
+    session cap evicts least recently used sessions across all workers.
+    The byte cap is left to the server (maxmemory / allkeys-lru).
+    """
+
+    def __init__(self, url: str = SESSION_REDIS_URL, prefix: str = SESSION_REDIS_PREFIX,
+                 max_turns: int = SESSION_MAX_TURNS, max_sessions: int = SESSION_MAX_SESSIONS,
+                 idle_ttl: float = SESSION_IDLE_TTL_SECONDS):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("SESSION_STORE=redis needs the `redis` package (pip install redis)") from e
+
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self.max_turns = max_turns
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._index = prefix + "index"
+
+        self._lock = threading.Lock()
+        self.stats = {"turns_added": 0, "evicted_idle": 0, "evicted_lru": 0, "errors": 0}
+
+    def _key(self, session_id: str) -> str:
+        return self.prefix + session_id
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self.stats[key] += n
+
+    def _evict(self, now: float):
+        # idle sessions: their list keys already expired, drop them from the index
+        idle = self._redis.zremrangebyscore(self._index, "-inf", now - self.idle_ttl)
+        if idle:
+            self._count("evicted_idle", idle)
+        over = self._redis.zcard(self._index) - self.max_sessions
+        if over > 0:
+            oldest = [sid for sid, _ in self._redis.zpopmin(self._index, over)]
+            if oldest:
+                self._redis.delete(*(self._key(sid) for sid in oldest))
+                self._count("evicted_lru", len(oldest))
+
+    def add_turn(self, session_id: str, user_msg: str, assistant_msg: str):
+        now = time.time()
+        key = self._key(session_id)
+        try:
+            pipe = self._redis.pipeline()
+            pipe.rpush(key, json.dumps({"user": user_msg, "assistant": assistant_msg}))
+            pipe.ltrim(key, -self.max_turns, -1)
+            pipe.expire(key, max(1, int(self.idle_ttl)))
+            pipe.zadd(self._index, {session_id: now})
+            pipe.execute()
+            self._count("turns_added")
+            self._evict(now)
+        except Exception as e:
+            print("Session store (redis) write error:", e)
+            self._count("errors")
+
+    def get_history(self, session_id: str) -> list:
+        key = self._key(session_id)
+        try:
+            pipe = self._redis.pipeline()
+            pipe.lrange(key, 0, -1)
+            pipe.expire(key, max(1, int(self.idle_ttl)))
+            pipe.zadd(self._index, {session_id: time.time()}, xx=True)
+            turns, _, _ = pipe.execute()
+        except Exception as e:
+            print("Session store (redis) read error:", e)
+            self._count("errors")
+            return []
+        return [json.loads(t) for t in turns]
+
+    def clear(self, session_id: str):
+        try:
+            self._redis.delete(self._key(session_id))
+            self._redis.zrem(self._index, session_id)
+        except Exception as e:
+            print("Session store (redis) delete error:", e)
+            self._count("errors")
+
+    def metrics(self) -> dict:
+        try:
+            sessions = self._redis.zcard(self._index)
+        except Exception:
+            sessions = None
+        with self._lock:
+            stats = dict(self.stats)
+        return {
+            **stats,
+            "backend": "redis",
+            "sessions": sessions,
+            "max_sessions": self.max_sessions,
+            "idle_ttl_seconds": self.idle_ttl,
+        }
+
+
+def create_session_store(kind: str = SESSION_STORE):
+    if kind == "redis":
+        return RedisSessionStore()
+    if kind == "memory":
+        return InProcessSessionStore()
+    raise ValueError(f"Unknown SESSION_STORE {kind!r}, expected 'memory' or 'redis'")
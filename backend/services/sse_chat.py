@@ -5,6 +5,8 @@ from fastapi.responses import StreamingResponse
 
 # IMPORT THE GLOBAL SHARED ORCHESTRATOR
 from backend.services.crew.orchestrator_agent import CrewOrchestrator
+from backend.services.memory_store import set_memory_scope, write_memory, conversation_memory
+from backend.services.answer_cache import is_cacheable_answer
 
 # Reuse the same global orchestrator used by /ask_new
 global_orchestrator = CrewOrchestrator()
@@ -12,9 +14,11 @@ global_orchestrator = CrewOrchestrator()
 router = APIRouter()
 
 @router.get("/stream/chat/{session_id}")
-async def stream_chat(session_id: str, question: str):
+async def stream_chat(session_id: str, question: str, user_id: str | None = None):
 
     async def event_generator():
+        # long-term memory of this request is read / written for this session (or user) only
+        set_memory_scope(session_id, user_id)
 
         # 1. Handshake
         yield "data: " + json.dumps({
@@ -28,14 +32,39 @@ async def stream_chat(session_id: str, question: str):
             "message": "Thinking..."
         }) + "\n\n"
 
+        # short-term history of this session (the Redis store is a network call)
+        history = await asyncio.to_thread(conversation_memory.get_history, session_id)
+
         try:
-            # 3. RUN THE SAME ORCHESTRATOR AS /ask_new
-            answer_text = await asyncio.to_thread(global_orchestrator.run, question)
+            # 3. STREAM THE SAME ORCHESTRATOR PIPELINE AS /ask_new
+            #    progress events first, then the Buddy answer token by token
+            async for event in global_orchestrator.astream(question, history):
+                kind = event["type"]
 
-            yield "data: " + json.dumps({
-                "type": "assistant_message",
-                "text": answer_text
-            }) + "\n\n"
+                if kind == "intent":
+                    payload = {"type": "intent", "intent": event["intent"], "tool": event["tool"]}
+                elif kind == "step":
+                    payload = {
+                        "type": "step",
+                        "kind": event["kind"],
+                        "name": event["name"],
+                        "status": event.get("status"),
+                        "duration_ms": event.get("duration_ms"),
+                    }
+                    if "hits" in event:
+                        payload["hits"] = event["hits"]
+                elif kind == "answer_delta":
+                    payload = {"type": "assistant_delta", "text": event["text"]}
+                elif kind == "answer_done":
+                    payload = {"type": "assistant_message", "text": event["text"]}
+                    if is_cacheable_answer(event["text"]):
+                        await asyncio.to_thread(conversation_memory.add_message, session_id, question, event["text"])
+                        # queued; persisted in the background after the response
+                        write_memory(question, event["text"])
+                else:
+                    payload = event
+
+                yield "data: " + json.dumps(payload) + "\n\n"
 
         except Exception as exc:
             yield "data: " + json.dumps({
@@ -46,4 +75,9 @@ async def stream_chat(session_id: str, question: str):
         # 4. End of SSE stream
         yield "data: [DONE]\n\n"
 
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
\ No newline at end of file
+    # no-cache / no proxy buffering so each delta reaches the browser immediately
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
\ No newline at end of file
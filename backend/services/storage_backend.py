@@ -0,0 +1,283 @@
+"""
+Object storage access for transcripts, summaries and audio.
+
+One backend per process, selected by STORAGE_BACKEND:
+  gcs    Google Cloud Storage through one shared storage.Client whose HTTP
+         connection pool is sized for STORAGE_DOWNLOAD_WORKERS threads
+  local  a directory tree (LOCAL_STORAGE_DIR/<bucket>/<object name>), so
+         ingestion can run and be tested without GCS credentials
+
+Listing returns StorageObject records (name, generation, md5_hash, size),
+so callers never touch backend-specific blob types.
+
+    objects = list_objects(bucket, "transcripts/", suffix=".txt")
+    for obj, text in bulk_download(bucket, objects):   # parallel, input order
+        ...
+
+With STORAGE_CACHE_DIR set, downloads are streamed into a local cache keyed
+on (object name, generation); an unchanged object is read from disk on the
+next run, and an overwritten one (new generation) is fetched again.
+"""
+
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import quote
+
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+# ---------------------------------------------------------
+# Config
+# ---------------------------------------------------------
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "gcs")
+LOCAL_STORAGE_DIR = os.getenv("LOCAL_STORAGE_DIR", os.path.join(os.getcwd(), "local_storage"))
+# Parallel downloads in bulk_download (also the HTTP connection pool size)
+STORAGE_DOWNLOAD_WORKERS = int(os.getenv("STORAGE_DOWNLOAD_WORKERS", "16"))
+# Optional on-disk cache of downloaded objects (empty = disabled)
+STORAGE_CACHE_DIR = os.getenv("STORAGE_CACHE_DIR", "")
+# Objects larger than this are streamed in ranged requests of this size (multiple of 256 KB)
+STORAGE_CHUNK_SIZE = int(os.getenv("STORAGE_CHUNK_SIZE_MB", "8")) * 1024 * 1024
+
+
+class StorageObject:
+    """Backend-neutral listing entry; generation changes on every overwrite."""
+
+    __slots__ = ("name", "generation", "md5_hash", "size")
+
+    def __init__(self, name: str, generation=None, md5_hash=None, size=None):
+        self.name = name
+        self.generation = generation
+        self.md5_hash = md5_hash
+        self.size = size
+
+    def __repr__(self):
+        return f"StorageObject({self.name!r}, generation={self.generation!r})"
+
+
+# ---------------------------------------------------------
+# Backends
+# ---------------------------------------------------------
+class GCSBackend:
+    def __init__(self, pool_size: int = STORAGE_DOWNLOAD_WORKERS):
+        self.pool_size = pool_size
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """Shared storage.Client, created on first use (credentials lookup is slow)."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from google.cloud import storage
+
+                    client = storage.Client()
+                    self._size_connection_pool(client)
+                    self._client = client
+        return self._client
+
+    def _size_connection_pool(self, client):
+        # the default pool keeps 10 connections; parallel downloads would churn them
+        try:
+            from requests.adapters import HTTPAdapter
+
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+            client._http.mount("https://", adapter)
+        except Exception as e:
+            print("GCS connection pool sizing skipped:", e)
+
+    def list(self, bucket: str, prefix: str) -> list[StorageObject]:
+        return [
+            StorageObject(
+                blob.name,
+                str(blob.generation) if blob.generation is not None else None,
+                blob.md5_hash,
+                blob.size,
+            )
+            for blob in self.client.list_blobs(bucket, prefix=prefix)
+        ]
+
+    def download_to(self, bucket: str, name: str, fileobj):
+        blob = self.client.bucket(bucket).blob(name, chunk_size=STORAGE_CHUNK_SIZE)
+        blob.download_to_file(fileobj)
+
+    def write(self, bucket: str, name: str, data, content_type: str):
+        self.client.bucket(bucket).blob(name).upload_from_string(data, content_type=content_type)
+
+    def signed_url(self, bucket: str, name: str, expiration: timedelta) -> str:
+        blob = self.client.bucket(bucket).blob(name)
+        return blob.generate_signed_url(version="v4", expiration=expiration, method="GET")
+
+    def public_url(self, bucket: str, name: str) -> str:
+        blob = self.client.bucket(bucket).blob(name)
+        blob.make_public()
+        return blob.public_url
+
+
+class LocalBackend:
+    def __init__(self, root: str = LOCAL_STORAGE_DIR):
+        self.root = root
+
+    def _path(self, bucket: str, name: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, bucket, name))
+        if not path.startswith(os.path.abspath(os.path.join(self.root, bucket)) + os.sep):
+            raise ValueError(f"Object name escapes the bucket: {name!r}")
+        return path
+
+    def list(self, bucket: str, prefix: str) -> list[StorageObject]:
+        base = os.path.join(self.root, bucket)
+        objects = []
+        for dirpath, _, filenames in os.walk(base):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, base).replace(os.sep, "/")
+                if name.startswith(prefix):
+                    stat = os.stat(path)
+                    objects.append(StorageObject(name, str(stat.st_mtime_ns), None, stat.st_size))
+        return sorted(objects, key=lambda o: o.name)
+
+    def download_to(self, bucket: str, name: str, fileobj):
+        with open(self._path(bucket, name), "rb") as f:
+            while True:
+                block = f.read(1024 * 1024)
+                if not block:
+                    break
+                fileobj.write(block)
+
+    def write(self, bucket: str, name: str, data, content_type: str):
+        path = self._path(bucket, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data.encode("utf-8") if isinstance(data, str) else data)
+
+    def signed_url(self, bucket: str, name: str, expiration: timedelta) -> str:
+        return "file://" + quote(self._path(bucket, name))
+
+    def public_url(self, bucket: str, name: str) -> str:
+        return "file://" + quote(self._path(bucket, name))
+
+
+_BACKENDS = {"gcs": GCSBackend, "local": LocalBackend}
+if STORAGE_BACKEND not in _BACKENDS:
+    raise ValueError(f"Unknown STORAGE_BACKEND {STORAGE_BACKEND!r}, expected one of {sorted(_BACKENDS)}")
+
+# Shared process-wide backend
+storage = _BACKENDS[STORAGE_BACKEND]()
+
+STORAGE_STATS = {"downloads": 0, "bytes_downloaded": 0, "cache_hits": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(downloads: int = 0, nbytes: int = 0, cache_hits: int = 0):
+    with _stats_lock:
+        STORAGE_STATS["downloads"] += downloads
+        STORAGE_STATS["bytes_downloaded"] += nbytes
+        STORAGE_STATS["cache_hits"] += cache_hits
+
+
+def storage_stats() -> dict:
+    with _stats_lock:
+        return {**STORAGE_STATS, "backend": STORAGE_BACKEND, "cache": bool(STORAGE_CACHE_DIR)}
+
+
+# ---------------------------------------------------------
+# Public API
+# ---------------------------------------------------------
+def list_objects(bucket: str, prefix: str = "", suffix: str | None = None) -> list[StorageObject]:
+    """Objects under prefix (folder placeholders excluded), optionally only names ending in suffix."""
+    if not bucket:
+        raise ValueError("Bucket name is missing. Check .env GCS_BUCKET.")
+    objects = [o for o in storage.list(bucket, prefix) if not o.name.endswith("/")]
+    if suffix:
+        objects = [o for o in objects if o.name.endswith(suffix)]
+    return objects
+
+
+def _cache_path(bucket: str, obj: StorageObject) -> str | None:
+    if not STORAGE_CACHE_DIR or STORAGE_BACKEND == "local" or obj.generation is None:
+        return None
+    return os.path.join(STORAGE_CACHE_DIR, bucket, f"{obj.name}.{obj.generation}")
+
+
+def read_bytes(bucket: str, obj) -> bytes:
+    """
+    Download one object (a StorageObject or a plain name). With a cache
+    directory and a known generation, the object is streamed to disk once and
+    served from there afterwards.
+    """
+    if isinstance(obj, str):
+        obj = StorageObject(obj)
+
+    path = _cache_path(bucket, obj)
+    if path is None:
+        buf = io.BytesIO()
+        storage.download_to(bucket, obj.name, buf)
+        data = buf.getvalue()
+        _count(downloads=1, nbytes=len(data))
+        return data
+
+    if os.path.exists(path):
+        _count(cache_hits=1)
+        with open(path, "rb") as f:
+            return f.read()
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        storage.download_to(bucket, obj.name, f)
+    # write-then-rename: a crashed download never looks like a cached object
+    os.replace(tmp_path, path)
+    _drop_stale_generations(path, obj)
+
+    with open(path, "rb") as f:
+        data = f.read()
+    _count(downloads=1, nbytes=len(data))
+    return data
+
+
+def _drop_stale_generations(path: str, obj: StorageObject):
+    folder = os.path.dirname(path)
+    stem = os.path.basename(obj.name) + "."
+    for filename in os.listdir(folder):
+        if filename.startswith(stem) and not filename.endswith(".tmp") and os.path.join(folder, filename) != path:
+            try:
+                os.remove(os.path.join(folder, filename))
+            except OSError:
+                pass
+
+
+def read_text(bucket: str, obj) -> str:
+    return read_bytes(bucket, obj).decode("utf-8", errors="ignore")
+
+
+def bulk_download(bucket: str, objects: list, workers: int = STORAGE_DOWNLOAD_WORKERS, as_text: bool = True):
+    """
+    Download many objects on a bounded thread pool.
+    Yields (object, text-or-bytes) in input order while later downloads are
+    still in flight, so the caller can process each one as soon as it lands.
+    The first failed download raises when its turn comes.
+    """
+    read = read_text if as_text else read_bytes
+    if not objects:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(objects))),
+                            thread_name_prefix="storage-download") as pool:
+        yield from zip(objects, pool.map(lambda o: read(bucket, o), objects))
+
+
+def write_bytes(bucket: str, name: str, data, content_type: str = "application/octet-stream"):
+    storage.write(bucket, name, data, content_type)
+    return name
+
+
+def signed_url(bucket: str, name: str, expiration: timedelta = timedelta(hours=1)) -> str:
+    return storage.signed_url(bucket, name, expiration)
+
+
+def public_url(bucket: str, name: str) -> str:
+    """Make the object publicly readable and return its URL."""
+    return storage.public_url(bucket, name)
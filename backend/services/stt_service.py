@@ -1,3 +1,8 @@
+import asyncio
+import queue
+import threading
+import time
+
 from google.cloud import speech_v1 as speech
 from google.cloud import storage
 # from pydub import AudioSegment
@@ -22,4 +27,171 @@ def transcribe_audio(audio_bytes: bytes) -> str:
         return ""
 
     transcript = response.results[0].alternatives[0].transcript
-    return transcript
\ No newline at end of file
+    return transcript
+
+
+# ---------------------------------------------------------
+# Recognizers
+# ---------------------------------------------------------
+# Pluggable speech recognizer, selected by STT_RECOGNIZER:
+#   google  Google Cloud Speech (WEBM_OPUS, as recorded by the browser)
+#   fake    no network: the "audio" is UTF-8 text, for local runs and tests
+#
+# Every recognizer has
+#   recognize(audio: bytes) -> str                          one-shot
+#   stream(chunks: Iterable[bytes]) -> Iterator[(text, is_final)]
+# stream() is blocking and pulls audio from the iterator as it arrives;
+# it must return once the iterator is exhausted (end of speech).
+STT_RECOGNIZER = os.getenv("STT_RECOGNIZER", "google")
+STT_LANGUAGE = os.getenv("STT_LANGUAGE", "en-US")
+STT_SAMPLE_RATE = int(os.getenv("STT_SAMPLE_RATE", "48000"))  # Chrome usually records at 48000 Hz
+# Google rejects streaming requests with more than 25,600 bytes of audio
+STT_MAX_REQUEST_BYTES = 25600
+
+
+class GoogleRecognizer:
+    def __init__(self, language: str = STT_LANGUAGE, sample_rate: int = STT_SAMPLE_RATE):
+        self.language = language
+        self.sample_rate = sample_rate
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """Shared SpeechClient, created on first use (one gRPC channel for all requests)."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = speech.SpeechClient()
+        return self._client
+
+    def _config(self):
+        return speech.RecognitionConfig(
+            encoding=speech.RecognitionConfig.AudioEncoding.WEBM_OPUS,
+            sample_rate_hertz=self.sample_rate,
+            language_code=self.language,
+            audio_channel_count=1,
+            enable_automatic_punctuation=True
+        )
+
+    def recognize(self, audio: bytes) -> str:
+        response = self.client.recognize(config=self._config(), audio=speech.RecognitionAudio(content=audio))
+        return "".join(r.alternatives[0].transcript for r in response.results if r.alternatives)
+
+    def stream(self, chunks):
+        def requests():
+            for chunk in chunks:
+                for start in range(0, len(chunk), STT_MAX_REQUEST_BYTES):
+                    yield speech.StreamingRecognizeRequest(audio_content=chunk[start:start + STT_MAX_REQUEST_BYTES])
+
+        streaming_config = speech.StreamingRecognitionConfig(config=self._config(), interim_results=True)
+        for response in self.client.streaming_recognize(config=streaming_config, requests=requests()):
+            results = [r for r in response.results if r.alternatives]
+            if results:
+                # an interim response carries the stable prefix and the unstable tail as separate results
+                yield "".join(r.alternatives[0].transcript for r in results), results[0].is_final
+
+
+class FakeRecognizer:
+    """Audio chunks are UTF-8 text; a partial after every chunk, one final at the end."""
+
+    def recognize(self, audio: bytes) -> str:
+        return audio.decode("utf-8", errors="ignore").strip()
+
+    def stream(self, chunks):
+        text = ""
+        for chunk in chunks:
+            text += chunk.decode("utf-8", errors="ignore")
+            yield text.strip(), False
+        if text.strip():
+            yield text.strip(), True
+
+
+_RECOGNIZERS = {"google": GoogleRecognizer, "fake": FakeRecognizer}
+if STT_RECOGNIZER not in _RECOGNIZERS:
+    raise ValueError(f"Unknown STT_RECOGNIZER {STT_RECOGNIZER!r}, expected one of {sorted(_RECOGNIZERS)}")
+
+# Shared process-wide recognizer
+recognizer = _RECOGNIZERS[STT_RECOGNIZER]()
+
+STT_STATS = {"one_shot": 0, "streams": 0, "rejected": 0, "errors": 0, "finalize_ms": 0.0, "finalized": 0}
+_stats_lock = threading.Lock()
+
+
+def count_stt(key: str, n=1):
+    with _stats_lock:
+        STT_STATS[key] += n
+
+
+def stt_stats() -> dict:
+    with _stats_lock:
+        stats = dict(STT_STATS)
+    return {
+        **stats,
+        "finalize_ms": round(stats["finalize_ms"], 1),
+        "avg_finalize_ms": round(stats["finalize_ms"] / (stats["finalized"] or 1), 1),
+        "recognizer": STT_RECOGNIZER,
+    }
+
+
+# ---------------------------------------------------------
+# Streaming bridge (asyncio <-> blocking recognizer)
+# ---------------------------------------------------------
+class StreamingTranscription:
+    """
+    One streaming recognition. feed() audio chunks from async code as they
+    arrive; recognizer.stream() runs on its own thread and its results come
+    back through results() on the event loop:
+        ("partial", text) / ("final", text) / ("error", message)
+    end() marks end of speech; the recognizer then returns its final result
+    and results() finishes.
+    """
+
+    def __init__(self, engine=None):
+        self.recognizer = engine or recognizer
+        self._audio = queue.Queue()
+        self._results = asyncio.Queue()
+        self._loop = asyncio.get_running_loop()
+        self._ended = False
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stt-stream", daemon=True)
+        self._thread.start()
+
+    def feed(self, chunk: bytes):
+        if chunk and not self._ended:
+            self._audio.put(chunk)
+
+    def end(self):
+        if not self._ended:
+            self._ended = True
+            self._audio.put(None)
+
+    async def results(self):
+        while True:
+            item = await self._results.get()
+            if item is None:
+                return
+            yield item
+
+    def _chunks(self):
+        while True:
+            chunk = self._audio.get()
+            if chunk is None:
+                return
+            yield chunk
+
+    def _post(self, item):
+        self._loop.call_soon_threadsafe(self._results.put_nowait, item)
+
+    def _run(self):
+        try:
+            for text, is_final in self.recognizer.stream(self._chunks()):
+                self._post(("final" if is_final else "partial", text))
+        except Exception as e:
+            print("Streaming STT error:", e)
+            count_stt("errors")
+            self._post(("error", str(e)))
+        finally:
+            self._post(None)
\ No newline at end of file
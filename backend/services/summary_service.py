@@ -1,7 +1,18 @@
 import os
-from openai import OpenAI
+import asyncio
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from backend.services.request_trace import trace_span
+from backend.services.openai_clients import client, async_client
+from backend.services.retrieval_filters import extract_video_filter
+from backend.services.retrieval_result import merge_adjacent_chunks
+from backend.services.vector_store_lance import fetch_chunks
+from backend.services.context_builder import pack_context
+from backend.services.rag_engine import retrieve_chunks, aretrieve_chunks
+
+# Notes cover a whole lecture, so they get a bigger context than Q&A
+NOTES_TOKEN_BUDGET = int(os.getenv("NOTES_TOKEN_BUDGET", "3000"))
+# Chunks sampled (evenly, in lecture order) from the referenced video(s)
+NOTES_MAX_CHUNKS = int(os.getenv("NOTES_MAX_CHUNKS", "10"))
 
 def generate_summary(transcript_text: str) -> str:
     prompt = f"""
@@ -12,24 +23,52 @@ def generate_summary(transcript_text: str) -> str:
     ---
     """
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "You summarize course transcripts clearly and concisely."},
-            {"role": "user", "content": prompt},
-        ],
-        max_tokens=300
-    )
+    with trace_span("llm", "summary"):
+        response = client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": "You summarize course transcripts clearly and concisely."},
+                {"role": "user", "content": prompt},
+            ],
+            max_tokens=300
+        )
 
     return response.choices[0].message.content.strip()
 
 
-def generate_summary_for_question(question: str) -> str:
+def _video_chunks(question: str) -> list:
+    """Chunks of the video(s) the question names ("notes for video 3"), in lecture order."""
+    filters = extract_video_filter(question)
+    if not filters:
+        return []
+    return merge_adjacent_chunks(fetch_chunks(filters, NOTES_MAX_CHUNKS))
+
+
+def _notes_context(question: str) -> str:
     """
-    Used when intent classifier detects: notes / summary request
-    e.g. "Make notes for video 3"
+    Transcript context for notes: the referenced video(s) if the question
+    names one, otherwise the chunks most relevant to the topic.
     """
+    try:
+        chunks = _video_chunks(question) or retrieve_chunks(question)
+    except Exception as e:
+        print("Notes retrieval error:", e)
+        return ""
+    context, _ = pack_context(chunks, NOTES_TOKEN_BUDGET)
+    return context
+
+
+async def _anotes_context(question: str) -> str:
+    try:
+        chunks = await asyncio.to_thread(_video_chunks, question) or await aretrieve_chunks(question)
+    except Exception as e:
+        print("Notes retrieval error:", e)
+        return ""
+    context, _ = pack_context(chunks, NOTES_TOKEN_BUDGET)
+    return context
 
+
+def _notes_messages(question: str, context: str = "") -> list:
     prompt = f"""
     Create short, simple notes for the following request:
 
@@ -37,14 +76,49 @@ def generate_summary_for_question(question: str) -> str:
 
     The notes must be concise (4–6 bullets) and easy to understand.
     """
+    if context:
+        prompt += f"""
+    Base the notes ONLY on this transcript context:
+
+    ---
+    {context}
+    ---
+    """
+
+    return [
+        {"role": "system", "content": "You generate concise study notes."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def generate_summary_for_question(question: str) -> str:
+    """
+    Used when intent classifier detects: notes / summary request
+    e.g. "Make notes for video 3" → notes from video 3's transcript
+    """
+    context = _notes_context(question)
+
+    with trace_span("llm", "notes"):
+        response = client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=_notes_messages(question, context),
+            max_tokens=200
+        )
+
+    return response.choices[0].message.content.strip()
+
+
+async def agenerate_summary_for_question(question: str) -> str:
+    """
+    Async generate_summary_for_question().
+    """
+    context = await _anotes_context(question)
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "You generate concise study notes."},
-            {"role": "user", "content": prompt}
-        ],
-        max_tokens=200
-    )
+    with trace_span("llm", "notes"):
+        response = await async_client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=_notes_messages(question, context),
+            max_tokens=200
+        )
 
     return response.choices[0].message.content.strip()
\ No newline at end of file
@@ -0,0 +1,210 @@
+"""
+Bounded tool execution for the orchestrator.
+
+Replaces the old "one daemon thread per tool call" pattern:
+
+  - async tools run as asyncio tasks under a concurrency limit; a timeout
+    cancels the task, which also aborts its in-flight httpx/OpenAI request
+  - sync tools run on one fixed-size ThreadPoolExecutor, so the number of
+    threads stays flat however many calls time out
+  - both paths have a queue-depth limit: when max in-flight + max queued is
+    reached, new calls are rejected immediately instead of piling up
+  - per-tool timeouts (TOOL_TIMEOUTS="rag_retrieval=10,notes_generator=20")
+    override the default TOOL_TIMEOUT_SECONDS
+
+Every call is counted exactly once as completed, timeouts, rejected or
+errors. A sync call that times out while already running cannot be
+interrupted: its thread keeps its pool slot until fn returns (bounded by
+the tool's own client timeouts). It stays in in_flight, so admission control
+accounts for it, and is shown as abandoned until then. Total tool threads
+never exceed TOOL_MAX_CONCURRENCY.
+
+Counters are exposed via metrics() and GET /metrics.
+"""
+
+import os
+import asyncio
+import threading
+import contextvars
+import traceback
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from backend.services.request_trace import trace_span
+
+TOOL_TIMEOUT_SECONDS = float(os.getenv("TOOL_TIMEOUT_SECONDS", "12"))
+TOOL_MAX_CONCURRENCY = int(os.getenv("TOOL_MAX_CONCURRENCY", "32"))
+TOOL_MAX_QUEUE = int(os.getenv("TOOL_MAX_QUEUE", "64"))
+
+
+def _parse_tool_timeouts(raw: str) -> dict:
+    timeouts = {}
+    for part in raw.split(","):
+        if "=" in part:
+            name, secs = part.split("=", 1)
+            timeouts[name.strip()] = float(secs)
+    return timeouts
+
+
+TOOL_TIMEOUTS = _parse_tool_timeouts(os.getenv("TOOL_TIMEOUTS", ""))
+
+
+class ToolRejected(Exception):
+    """Raised internally when the executor is saturated."""
+
+
+class ToolExecutor:
+    def __init__(self, max_concurrency: int = TOOL_MAX_CONCURRENCY, max_queue: int = TOOL_MAX_QUEUE,
+                 default_timeout: float = TOOL_TIMEOUT_SECONDS, tool_timeouts: dict | None = None):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.default_timeout = default_timeout
+        self.tool_timeouts = TOOL_TIMEOUTS if tool_timeouts is None else tool_timeouts
+
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="tool")
+        self._lock = threading.Lock()
+        self._async_slots = asyncio.Semaphore(max_concurrency)
+
+        self.stats = {
+            "in_flight": 0, "queued": 0, "completed": 0,
+            "timeouts": 0, "rejected": 0, "errors": 0,
+            "abandoned": 0,  # timed-out sync calls still running in the pool
+        }
+
+    def timeout_for(self, tool_name: str) -> float:
+        return self.tool_timeouts.get(tool_name, self.default_timeout)
+
+    # ---- admission control ----
+    def _admit(self):
+        with self._lock:
+            if self.stats["in_flight"] + self.stats["queued"] >= self.max_concurrency + self.max_queue:
+                self.stats["rejected"] += 1
+                raise ToolRejected()
+            self.stats["queued"] += 1
+
+    def _started(self):
+        with self._lock:
+            self.stats["queued"] -= 1
+            self.stats["in_flight"] += 1
+
+    def _finished(self, outcome: str, started: bool = True):
+        with self._lock:
+            if started:
+                self.stats["in_flight"] -= 1
+            else:
+                self.stats["queued"] -= 1
+            self.stats[outcome] += 1
+
+    # ---- sync path ----
+    def run_sync(self, tool_name: str, fn, arg: str) -> str:
+        """
+        Run fn(arg) on the bounded thread pool. Always returns a string.
+        On timeout a still-queued call is cancelled; a running one finishes
+        in the background (bounded by the OpenAI client timeout) without
+        spawning extra threads, and is counted as a timeout only.
+        """
+        timeout = self.timeout_for(tool_name)
+        with trace_span("tool", tool_name) as span:
+            try:
+                self._admit()
+            except ToolRejected:
+                if span is not None:
+                    span["status"] = "rejected"
+                return "[tool-busy] Too many requests in progress, please retry shortly."
+
+            call = {"done": False, "timed_out": False}
+
+            def target():
+                self._started()
+                outcome = "errors"
+                try:
+                    result = fn(arg)
+                    outcome = "completed"
+                    return result
+                finally:
+                    with self._lock:
+                        self.stats["in_flight"] -= 1
+                        if call["timed_out"]:
+                            # already counted as a timeout by the caller
+                            self.stats["abandoned"] -= 1
+                        else:
+                            call["done"] = True
+                            self.stats[outcome] += 1
+
+            # copy the context so the tool's LLM calls land in this request's trace
+            ctx = contextvars.copy_context()
+            future = self._pool.submit(ctx.run, target)
+            try:
+                return future.result(timeout=timeout) or ""
+            except FutureTimeoutError:
+                if future.cancel():
+                    self._finished("timeouts", started=False)
+                else:
+                    with self._lock:
+                        # unless it finished right at the deadline (already counted)
+                        if not call["done"]:
+                            call["timed_out"] = True
+                            self.stats["timeouts"] += 1
+                            self.stats["abandoned"] += 1
+                if span is not None:
+                    span["status"] = "timeout"
+                return f"[tool-timeout] The tool did not finish within {timeout:g}s."
+            except Exception as e:
+                if span is not None:
+                    span["status"] = "error"
+                return f"[tool-error] {str(e)}\n{traceback.format_exc()}"
+
+    # ---- async path ----
+    async def run_async(self, tool_name: str, coro_fn, arg: str) -> str:
+        """
+        Await coro_fn(arg) under the concurrency limit. On timeout the task is
+        cancelled, which aborts the underlying HTTP request. Always returns a string.
+        """
+        timeout = self.timeout_for(tool_name)
+        with trace_span("tool", tool_name) as span:
+            try:
+                self._admit()
+            except ToolRejected:
+                if span is not None:
+                    span["status"] = "rejected"
+                return "[tool-busy] Too many requests in progress, please retry shortly."
+
+            started = False
+
+            async def guarded():
+                nonlocal started
+                async with self._async_slots:
+                    started = True
+                    self._started()
+                    return await coro_fn(arg)
+
+            try:
+                result = await asyncio.wait_for(guarded(), timeout)
+            except asyncio.TimeoutError:
+                self._finished("timeouts", started=started)
+                if span is not None:
+                    span["status"] = "timeout"
+                return f"[tool-timeout] The tool did not finish within {timeout:g}s."
+            except asyncio.CancelledError:
+                self._finished("errors", started=started)
+                raise
+            except Exception as e:
+                self._finished("errors", started=started)
+                if span is not None:
+                    span["status"] = "error"
+                return f"[tool-error] {str(e)}\n{traceback.format_exc()}"
+
+            self._finished("completed")
+            return result or ""
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                **self.stats,
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "default_timeout": self.default_timeout,
+            }
+
+
+# Shared process-wide executor
+tool_executor = ToolExecutor()
@@ -1,25 +1,19 @@
-from google.cloud import storage
-from backend.services.gcs_loader import load_transcript
+from backend.services.storage_backend import list_objects, bulk_download
 import os
 
 BUCKET_NAME = os.getenv("GCS_BUCKET")
 TRANSCRIPT_FOLDER = "transcripts/"
 
-def list_transcripts(bucket_name: str, prefix: str):
-    from google.cloud import storage
-    client = storage.Client()
-    bucket = client.bucket(bucket_name)
-    blobs = client.list_blobs(bucket, prefix=prefix)
+def list_transcripts(bucket_name: str = BUCKET_NAME, prefix: str = TRANSCRIPT_FOLDER):
     # Filter out directories/folders
-    return [blob for blob in blobs if blob.name.endswith(".txt")]
+    return list_objects(bucket_name, prefix, suffix=".txt")
 
 def load_all_transcripts():
-    """Load all transcripts from GCS as a dict"""
+    """Load all transcripts from GCS as a dict (downloads run in parallel)"""
     print('Inside load_all_transcripts')
     transcripts = {}
-    for blob_name in list_transcripts():
-        video_name = os.path.basename(blob_name)
-        content = load_transcript(BUCKET_NAME, blob_name)
+    for blob, content in bulk_download(BUCKET_NAME, list_transcripts()):
+        video_name = os.path.basename(blob.name)
         transcripts[video_name] = content
-    print(f'transcripts: {transcripts}')
-    return transcripts
\ No newline at end of file
+    print(f'Loaded {len(transcripts)} transcripts')
+    return transcripts
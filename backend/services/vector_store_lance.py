@@ -1,12 +1,27 @@
 import os
+import json
+import asyncio
+import math
+import time
 import uuid
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import pyarrow as pa
+import pyarrow.compute as pc
 import lancedb
 
-from backend.services.embedding_utils import get_single_embedding
-from backend.services.embedding_normalizer import normalize_embedding
-from backend.services.vector_store_lance import get_transcript_table
+from backend.services.embedding_utils import (
+    get_embedding, aget_embedding, get_single_embedding, aget_single_embedding, get_embedding_with_retry,
+    EMBEDDING_DIM
+)
+from backend.services.embedding_normalizer import normalize_embedding, normalize_embeddings, to_fixed_size_list
+from backend.services.request_trace import trace_span
+from backend.services.bm25_index import BM25Index, reciprocal_rank_fusion
+from backend.services.inmemory_index import InMemoryVectorIndex
+from backend.services.retrieval_result import RetrievedChunk
+from backend.services.retrieval_filters import RetrievalFilter, video_number_from_id
 
 
 # ---------------------------------------------------------
@@ -18,156 +33,1067 @@ os.makedirs(DB_PATH, exist_ok=True)
 # Single LanceDB client
 db = lancedb.connect(DB_PATH)
 
+# Bump when a table schema changes so the indexer knows to rebuild
+TRANSCRIPT_SCHEMA_VERSION = 2
+
+# ---------------------------------------------------------
+# ANN index settings
+# ---------------------------------------------------------
+# Below this many rows a flat scan is fast enough (and IVF-PQ cannot train well)
+ANN_INDEX_MIN_ROWS = int(os.getenv("ANN_INDEX_MIN_ROWS", "5000"))
+# Rebuild once the table has grown by this fraction since the last build
+ANN_REBUILD_GROWTH = float(os.getenv("ANN_REBUILD_GROWTH", "0.2"))
+# Query-time defaults: partitions to probe, and re-rank factor on exact vectors (0 = off)
+ANN_NPROBES = int(os.getenv("ANN_NPROBES", "20"))
+ANN_REFINE_FACTOR = int(os.getenv("ANN_REFINE_FACTOR", "5"))
+# Memory writes are single rows; only check the index every N writes
+ANN_MEMORY_CHECK_EVERY = int(os.getenv("ANN_MEMORY_CHECK_EVERY", "500"))
+
+# ---------------------------------------------------------
+# Memory recall: nearest candidates re-scored with a recency bonus
+# ---------------------------------------------------------
+MEMORY_RECALL_CANDIDATES = int(os.getenv("MEMORY_RECALL_CANDIDATES", "20"))
+MEMORY_RECENCY_WEIGHT = float(os.getenv("MEMORY_RECENCY_WEIGHT", "0.1"))
+MEMORY_RECENCY_HALF_LIFE_DAYS = float(os.getenv("MEMORY_RECENCY_HALF_LIFE_DAYS", "14"))
+
+ANN_STATE_PATH = os.path.join(DB_PATH, "ann_index_state.json")
+# Written by load_transcripts_lance on every /setup run; carries the index build id
+TRANSCRIPT_MANIFEST_PATH = os.path.join(DB_PATH, "transcripts_manifest.json")
+
+# ---------------------------------------------------------
+# Retrieval mode (vector | bm25 | hybrid), overridable per call
+# ---------------------------------------------------------
+RETRIEVAL_MODES = ("vector", "bm25", "hybrid")
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "vector")
+# Candidates each ranker contributes before reciprocal-rank fusion
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# ---------------------------------------------------------
+# Vector index backend: "lance" (disk-backed LanceDB search) or "inmemory"
+# (whole transcripts matrix in RAM, exact search by matrix product)
+# ---------------------------------------------------------
+VECTOR_INDEX_MODE = os.getenv("VECTOR_INDEX_MODE", "lance")
+INMEMORY_INDEX_DTYPE = os.getenv("INMEMORY_INDEX_DTYPE", "float32")  # float32 | float16 | int8
+
+
+# ---------------------------------------------------------
+# TABLE REGISTRY (process-wide cached handles)
+# ---------------------------------------------------------
+# How often (seconds) a cached handle checks whether another process committed
+# a new table version. The check is a single stat() of the _versions folder.
+TABLE_REFRESH_SECONDS = float(os.getenv("TABLE_REFRESH_SECONDS", "10"))
+
+_tables = {}  # table_name -> {"table": LanceTable, "checked_at": float, "versions_mtime": float}
+_tables_lock = threading.RLock()
+
+# open/create = metadata reads, refresh = re-open after a new version, hit = served from cache
+TABLE_STATS = {"open": 0, "create": 0, "refresh": 0, "hit": 0}
+
+
+def _versions_mtime(table_name: str) -> float:
+    try:
+        return os.stat(os.path.join(DB_PATH, f"{table_name}.lance", "_versions")).st_mtime
+    except OSError:
+        return 0.0
+
+
+def _open_or_create(table_name: str):
+    schema = _TABLE_SCHEMAS[table_name]
+
+    if table_name not in db.table_names():
+        print(f"Creating LanceDB {table_name} table...")
+        TABLE_STATS["create"] += 1
+        return db.create_table(table_name, schema=schema)
+
+    TABLE_STATS["open"] += 1
+    table = db.open_table(table_name)
+    if _needs_migration(table, schema):
+        with _tables_lock:
+            # re-open under the lock: another thread may have migrated it meanwhile
+            table = db.open_table(table_name)
+            if _needs_migration(table, schema):
+                table = _migrate_table(table_name, table, schema)
+                # the rewrite has no vector index; let maybe_build_ann_index rebuild it
+                drop_ann_state(table_name)
+                refresh_tables(table_name)
+    return table
+
+
+def _get_table(table_name: str):
+    """
+    Return the cached handle for a table, opening (or creating) it once.
+    Every TABLE_REFRESH_SECONDS the handle is re-opened if the table's
+    version folder changed (e.g. /setup ran in another worker).
+    """
+    now = time.monotonic()
+    entry = _tables.get(table_name)
+
+    if entry is not None and now - entry["checked_at"] < TABLE_REFRESH_SECONDS:
+        TABLE_STATS["hit"] += 1
+        return entry["table"]
+
+    with _tables_lock:
+        entry = _tables.get(table_name)
+        if entry is not None:
+            if now - entry["checked_at"] < TABLE_REFRESH_SECONDS:
+                TABLE_STATS["hit"] += 1
+                return entry["table"]
+
+            mtime = _versions_mtime(table_name)
+            if mtime == entry["versions_mtime"]:
+                entry["checked_at"] = now
+                TABLE_STATS["hit"] += 1
+                return entry["table"]
+
+            TABLE_STATS["refresh"] += 1
+
+        table = _open_or_create(table_name)
+        _tables[table_name] = {
+            "table": table,
+            "checked_at": now,
+            "versions_mtime": _versions_mtime(table_name),
+        }
+        return table
+
+
+def refresh_tables(table_name: str | None = None):
+    """
+    Drop cached handles so the next access re-opens the latest version.
+    Call after a table is dropped / recreated or bulk-rewritten.
+    """
+    with _tables_lock:
+        if table_name is None:
+            _tables.clear()
+        else:
+            _tables.pop(table_name, None)
+
+
+def table_registry_stats() -> dict:
+    stats = {**TABLE_STATS, "cached_tables": sorted(_tables), "vector_index": VECTOR_INDEX_MODE}
+    index = _inmemory["index"]
+    if index is not None:
+        stats["inmemory_index"] = {"rows": len(index), "dtype": index.dtype, "bytes": index.nbytes}
+    return stats
+
 
 # ---------------------------------------------------------
 # 1. TRANSCRIPT TABLE
 # ---------------------------------------------------------
+TRANSCRIPT_SCHEMA = pa.schema([
+    ("video", pa.string()),
+    ("video_number", pa.int32()),  # parsed from the video id ("video3" → 3), null if none
+    ("chunk_index", pa.int32()),
+    ("chunk", pa.string()),
+    ("embedding", pa.list_(pa.float32(), EMBEDDING_DIM)),
+])
+
+
 def get_transcript_table():
     """
     LanceDB table for transcript chunks.
     Schema:
       video (string)
+      video_number (int32, nullable)
       chunk_index (int32)
       chunk (string)
-      embedding (list<float32>)
+      embedding (fixed_size_list<float32>[1536])
     """
-    schema = pa.schema([
-        ("video", pa.string()),
-        ("chunk_index", pa.int32()),
-        ("chunk", pa.string()),
-        ("embedding", pa.list_(pa.float32())),
-    ])
-
-    table_name = "transcripts"
-
-    if table_name not in db.table_names():
-        print("Creating LanceDB transcripts table...")
-        return db.create_table(table_name, schema=schema)
-
-    return db.open_table(table_name)
+    return _get_table("transcripts")
 
 
 # ---------------------------------------------------------
 # 2. MEMORY TABLE
 # ---------------------------------------------------------
+MEMORY_SCHEMA = pa.schema([
+    ("memory_id", pa.string()),
+    ("session_id", pa.string()),
+    ("user_id", pa.string()),
+    ("text", pa.string()),
+    ("created_at", pa.float64()),
+    ("embedding", pa.list_(pa.float32(), EMBEDDING_DIM)),
+])
+
+
 def get_memory_table():
     """
     Long-term memory table:
+      memory_id (string)      unique row id (dedup / retention deletes)
+      session_id (string)     conversation the turn belongs to (null = unscoped:
+                              legacy rows, never recalled, removed by maintenance)
+      user_id (string)        student the turn belongs to (null = unknown)
       text (string)
-      embedding (list<float32>)
+      created_at (float64)    unix time of the turn (recency weighting, retention)
+      embedding (fixed_size_list<float32>[1536])
     """
-    schema = pa.schema([
-        ("text", pa.string()),
-        ("embedding", pa.list_(pa.float32())),
-    ])
+    return _get_table("memory")
 
-    table_name = "memory"
 
-    if table_name not in db.table_names():
-        print("Creating LanceDB memory table...")
-        return db.create_table(table_name, schema=schema)
+# ---------------------------------------------------------
+# 2b. ANSWER CACHE TABLE (see answer_cache.py)
+# ---------------------------------------------------------
+ANSWER_CACHE_SCHEMA = pa.schema([
+    ("question", pa.string()),
+    ("answer", pa.string()),
+    ("scope", pa.string()),
+    ("index_version", pa.int64()),
+    ("created_at", pa.float64()),
+    ("latency_ms", pa.float64()),
+    ("embedding", pa.list_(pa.float32(), EMBEDDING_DIM)),
+])
+
+
+def get_answer_cache_table():
+    """
+    Semantic answer cache:
+      question, answer, scope (string)
+      index_version (int64)   transcripts build id the answer was built on
+      created_at (float64)    unix time, for TTL
+      latency_ms (float64)    time it took to produce the answer
+      embedding (fixed_size_list<float32>[1536])
+    """
+    return _get_table("answer_cache")
+
+
+_build_id = {"mtime": None, "id": 0}
+_build_id_lock = threading.Lock()
+
+
+def transcript_index_version() -> int:
+    """
+    Build id of the transcripts index: set by a /setup run that changed the
+    indexed content, increasing across runs (0 = none recorded / rebuild in
+    progress). ANN index builds and table migrations do not change it.
+    Re-read only when the manifest file changes (one stat() per call).
+    """
+    try:
+        mtime = os.stat(TRANSCRIPT_MANIFEST_PATH).st_mtime_ns
+    except OSError:
+        return 0
+    if mtime == _build_id["mtime"]:
+        return _build_id["id"]
+    with _build_id_lock:
+        if mtime != _build_id["mtime"]:
+            try:
+                with open(TRANSCRIPT_MANIFEST_PATH, "r", encoding="utf-8") as f:
+                    build_id = int(json.load(f).get("build_id") or 0)
+            except (OSError, ValueError, TypeError):
+                return 0
+            _build_id.update(mtime=mtime, id=build_id)
+        return _build_id["id"]
+
+
+def _needs_migration(table, schema: pa.Schema) -> bool:
+    if table.schema.field("embedding").type != schema.field("embedding").type:
+        return True
+    return any(name not in table.schema.names for name in schema.names)
+
+
+def _video_numbers(old: pa.Table) -> pa.Array:
+    return pa.array([video_number_from_id(v) for v in old["video"].to_pylist()], pa.int32())
+
+
+def _new_memory_ids(old: pa.Table) -> pa.Array:
+    return pa.array([uuid.uuid4().hex for _ in range(old.num_rows)], pa.string())
+
+
+def _migration_time(old: pa.Table) -> pa.Array:
+    # true age unknown: start the retention clock at migration time
+    return pa.array([time.time()] * old.num_rows, pa.float64())
+
+
+# Values for columns added after a table was first created: table -> column -> fn(old_arrow_table)
+_COLUMN_BACKFILL = {
+    "transcripts": {"video_number": _video_numbers},
+    "memory": {"memory_id": _new_memory_ids, "created_at": _migration_time},
+}
+
+
+def _migrate_table(table_name: str, table, schema: pa.Schema):
+    """
+    Rewrite an existing table into the current schema:
+      - old variable-length embedding column → fixed-size (required for ANN
+        indexes); rows whose vector length is not EMBEDDING_DIM are dropped
+      - columns added since the table was created are backfilled
+        (_COLUMN_BACKFILL, otherwise nulls)
+    """
+    print(f"Migrating LanceDB {table_name} table to the current schema...")
+    old = table.to_arrow()
+
+    if old.schema.field("embedding").type != schema.field("embedding").type:
+        emb = old["embedding"].combine_chunks()
+        keep = pc.equal(pc.list_value_length(emb), EMBEDDING_DIM)
+        old = old.filter(keep)
+        emb = old["embedding"].combine_chunks()
+        values = pc.cast(pc.list_flatten(emb), pa.float32())
+        embedding = pa.FixedSizeListArray.from_arrays(values, EMBEDDING_DIM)
+    else:
+        embedding = old["embedding"]
 
-    return db.open_table(table_name)
+    backfill = _COLUMN_BACKFILL.get(table_name, {})
+    columns = {}
+    for field in schema:
+        if field.name == "embedding":
+            columns[field.name] = embedding
+        elif field.name in old.column_names:
+            columns[field.name] = old[field.name]
+        elif field.name in backfill:
+            columns[field.name] = backfill[field.name](old)
+        else:
+            columns[field.name] = pa.nulls(old.num_rows, field.type)
+    migrated = pa.table(columns).select(schema.names).cast(schema)
+
+    # overwrite commits the rewrite as one new table version: a crash or a
+    # concurrent reader sees either the old rows or the migrated ones, never
+    # a missing table (old versions go away with cleanup_old_versions)
+    return db.create_table(table_name, data=migrated, schema=schema, mode="overwrite")
+
+
+_TABLE_SCHEMAS = {
+    "transcripts": TRANSCRIPT_SCHEMA,
+    "memory": MEMORY_SCHEMA,
+    "answer_cache": ANSWER_CACHE_SCHEMA,
+}
 
 
 # ---------------------------------------------------------
-# 3. INSERT TRANSCRIPT CHUNK
+# 3. INSERT TRANSCRIPT CHUNK(S)
 # ---------------------------------------------------------
 def insert_transcript_chunk(video: str, chunk_index: int, chunk: str, embedding: list):
+    return insert_transcript_chunks(video, [chunk_index], [chunk], [embedding])
+
+
+def insert_transcript_chunks(video: str, chunk_indices: list[int], chunks: list[str], embeddings):
+    """
+    Bulk insert all chunks of one video as a single Arrow batch.
+    One table.add() per file → one Lance fragment instead of one per chunk.
+    embeddings: (n, dim) float32 matrix or a list of vectors; the embedding
+    column wraps the matrix buffer instead of going through Python floats.
+    """
+    if not chunks:
+        return 0
+
+    get_transcript_table().add(transcript_batch(video, chunk_indices, chunks, embeddings))
+    return len(chunks)
+
+
+def transcript_batch(video: str, chunk_indices: list[int], chunks: list[str], embeddings) -> pa.Table:
+    """Arrow rows (TRANSCRIPT_SCHEMA) for the chunks of one video."""
+    n = len(chunks)
+    return pa.Table.from_arrays(
+        [
+            pa.array([video] * n, pa.string()),
+            pa.array([video_number_from_id(video)] * n, pa.int32()),
+            pa.array(chunk_indices, pa.int32()),
+            pa.array(chunks, pa.string()),
+            to_fixed_size_list(normalize_embeddings(embeddings)),
+        ],
+        schema=TRANSCRIPT_SCHEMA,
+    )
+
+
+def replace_transcript_table(batches: list) -> int:
+    """
+    Full rebuild: swap the whole transcripts table for these Arrow batches
+    in one commit (mode="overwrite"). Until then searches keep using the old
+    rows, and a rebuild that fails before the swap leaves them untouched.
+    """
+    data = pa.concat_tables(batches) if batches else TRANSCRIPT_SCHEMA.empty_table()
+    with _tables_lock:
+        db.create_table("transcripts", data=data, schema=TRANSCRIPT_SCHEMA, mode="overwrite")
+        refresh_tables("transcripts")
+        # the new version has no vector index
+        drop_ann_state("transcripts")
+    return data.num_rows
+
+
+def delete_video_chunks(video: str):
+    """
+    Remove every chunk of one video (used before re-indexing a changed transcript).
+    """
     table = get_transcript_table()
+    safe_video = video.replace("'", "''")
+    table.delete(f"video = '{safe_video}'")
 
-    row = {
-        "video": video,
-        "chunk_index": int(chunk_index),
-        "chunk": chunk,
-        "embedding": embedding,
-    }
 
-    table.add([row])
+def reset_transcript_table():
+    """
+    Drop and recreate the transcripts table (full rebuild).
+    """
+    with _tables_lock:
+        if "transcripts" in db.table_names():
+            db.drop_table("transcripts")
+        refresh_tables("transcripts")
+        drop_ann_state("transcripts")
+        return get_transcript_table()
+
+
+# ---------------------------------------------------------
+# ANN INDEX LIFECYCLE
+# ---------------------------------------------------------
+def _load_ann_state() -> dict:
+    try:
+        with open(ANN_STATE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_ann_state(state: dict):
+    tmp_path = ANN_STATE_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, ANN_STATE_PATH)
+
+
+def ann_index_params(num_rows: int) -> dict:
+    """
+    IVF-PQ sizing heuristics:
+      partitions ~ sqrt(rows), clamped to [16, 4096]
+      sub-vectors = dim / 16 (1536 -> 96, must divide the dimension)
+    """
+    num_partitions = int(min(4096, max(16, math.sqrt(num_rows))))
+    return {"num_partitions": num_partitions, "num_sub_vectors": EMBEDDING_DIM // 16}
+
+
+def build_ann_index(table_name: str) -> dict:
+    """
+    (Re)build the IVF-PQ index on the embedding column of a table.
+    """
+    table = _get_table(table_name)
+    num_rows = table.count_rows()
+    params = ann_index_params(num_rows)
+
+    t0 = time.perf_counter()
+    table.create_index(
+        metric="L2",
+        vector_column_name="embedding",
+        replace=True,
+        **params,
+    )
+    elapsed = time.perf_counter() - t0
+
+    state = _load_ann_state()
+    state[table_name] = {"rows": num_rows, "built_at": time.time(), **params}
+    _save_ann_state(state)
+
+    print(f"Built ANN index on {table_name}: rows={num_rows} {params} in {elapsed:.1f}s")
+    return {"status": "built", "rows": num_rows, "seconds": round(elapsed, 3), **params}
+
+
+def drop_ann_state(table_name: str):
+    """Forget index bookkeeping for a table that was dropped/recreated."""
+    state = _load_ann_state()
+    if state.pop(table_name, None) is not None:
+        _save_ann_state(state)
+
+
+def maybe_build_ann_index(table_name: str, force: bool = False) -> dict:
+    """
+    Index lifecycle:
+      - no index while rows < ANN_INDEX_MIN_ROWS (flat scan is fine)
+      - build once the threshold is crossed
+      - rebuild after the table grew by ANN_REBUILD_GROWTH since the last build
+        (new rows are still searchable before that, just via a slower flat scan)
+    """
+    if table_name not in db.table_names():
+        return {"status": "missing"}
+
+    num_rows = _get_table(table_name).count_rows()
+    last = _load_ann_state().get(table_name)
+
+    if not force:
+        if num_rows < ANN_INDEX_MIN_ROWS:
+            return {"status": "below_threshold", "rows": num_rows}
+        if last and num_rows <= last["rows"] * (1 + ANN_REBUILD_GROWTH):
+            return {"status": "up_to_date", "rows": num_rows}
+
+    return build_ann_index(table_name)
+
+
+def _apply_search_params(qb, nprobes: int | None, refine_factor: int | None):
+    """nprobes / refine_factor only matter once an index exists; harmless otherwise."""
+    nprobes = ANN_NPROBES if nprobes is None else nprobes
+    refine_factor = ANN_REFINE_FACTOR if refine_factor is None else refine_factor
+    if nprobes:
+        qb = qb.nprobes(nprobes)
+    if refine_factor:
+        qb = qb.refine_factor(refine_factor)
+    return qb
 
 
 # ---------------------------------------------------------
 # 4. QUERY TRANSCRIPT CHUNKS
 # ---------------------------------------------------------
-def query_chunks(question: str, top_k: int = 5):
+def query_chunks(question: str, top_k: int = 5, nprobes: int | None = None,
+                 refine_factor: int | None = None, mode: str | None = None,
+                 filters: RetrievalFilter | None = None):
     """
-    Vector search for most relevant transcript chunks.
-    Returns list[str] of chunks.
+    Search for the most relevant transcript chunks.
+    Returns list[str] of chunks; see search_chunks() for hits with metadata.
     """
-    table = get_transcript_table()
+    return [h.text for h in search_chunks(question, top_k, nprobes, refine_factor, mode, filters)]
+
+
+async def aquery_chunks(question: str, top_k: int = 5, nprobes: int | None = None,
+                        refine_factor: int | None = None, mode: str | None = None,
+                        filters: RetrievalFilter | None = None):
+    """Async query_chunks() → list[str]."""
+    return [h.text for h in await asearch_chunks(question, top_k, nprobes, refine_factor, mode, filters)]
+
 
-    # ---- 1. Get embedding (Python list) ----
+def search_chunks(question: str, top_k: int = 5, nprobes: int | None = None,
+                  refine_factor: int | None = None, mode: str | None = None,
+                  filters: RetrievalFilter | None = None) -> list[RetrievedChunk]:
+    """
+    Search for the most relevant transcript chunks.
+    mode: "vector" (embedding search), "bm25" (keywords, no embedding call)
+    or "hybrid" (both, fused by reciprocal rank). Defaults to RETRIEVAL_MODE.
+    filters: RetrievalFilter (video id / video range / chunk range), applied
+    before the search (LanceDB prefilter, BM25 candidate mask).
+    nprobes / refine_factor tune the ANN index per call (defaults from env).
+    Returns list[RetrievedChunk], best first.
+    """
+    mode = _check_mode(mode)
+    if mode == "bm25":
+        return search_chunks_bm25(question, top_k, filters)
+
+    # ---- 1. Get embedding (float32 array, shared with the embedding cache) ----
     raw_emb = get_single_embedding(question)
 
-    # ---- 2. Normalize embedding for LanceDB ----
+    # ---- 2. Normalize embedding for LanceDB (no copy unless L2 is enabled) ----
     query_emb = normalize_embedding(raw_emb)
 
+    if mode == "hybrid":
+        n = max(top_k, HYBRID_CANDIDATES)
+        keyword_hits = search_chunks_bm25(question, n, filters)
+        vector_hits = search_chunks_by_vector(query_emb, n, nprobes, refine_factor, filters)
+        return _fuse(keyword_hits, vector_hits, top_k)
+
+    return search_chunks_by_vector(query_emb, top_k, nprobes, refine_factor, filters)
+
+
+async def asearch_chunks(question: str, top_k: int = 5, nprobes: int | None = None,
+                         refine_factor: int | None = None, mode: str | None = None,
+                         filters: RetrievalFilter | None = None) -> list[RetrievedChunk]:
+    """
+    Async search_chunks(): the embedding call is awaited on the shared async
+    client; the (local, short) LanceDB / BM25 searches run in worker threads.
+    In hybrid mode the BM25 search overlaps the embedding round-trip.
+    """
+    mode = _check_mode(mode)
+    if mode == "bm25":
+        return await asyncio.to_thread(search_chunks_bm25, question, top_k, filters)
+
+    if mode == "hybrid":
+        n = max(top_k, HYBRID_CANDIDATES)
+        raw_emb, keyword_hits = await asyncio.gather(
+            aget_single_embedding(question),
+            asyncio.to_thread(search_chunks_bm25, question, n, filters),
+        )
+        query_emb = normalize_embedding(raw_emb)
+        vector_hits = await asyncio.to_thread(
+            search_chunks_by_vector, query_emb, n, nprobes, refine_factor, filters
+        )
+        return _fuse(keyword_hits, vector_hits, top_k)
+
+    raw_emb = await aget_single_embedding(question)
+    query_emb = normalize_embedding(raw_emb)
+    return await asyncio.to_thread(search_chunks_by_vector, query_emb, top_k, nprobes, refine_factor, filters)
+
+
+def _check_mode(mode: str | None) -> str:
+    mode = mode or RETRIEVAL_MODE
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode {mode!r}, expected one of {RETRIEVAL_MODES}")
+    return mode
+
+
+def _fuse(keyword_hits: list, vector_hits: list, top_k: int) -> list[RetrievedChunk]:
+    """Reciprocal-rank fusion of two hit lists; vector hits win ties so distances are kept."""
+    by_key = {h.key: h for h in keyword_hits}
+    by_key.update((h.key, h) for h in vector_hits)
+    with trace_span("retrieval", "rrf_fuse") as span:
+        keys = reciprocal_rank_fusion(
+            [[h.key for h in vector_hits], [h.key for h in keyword_hits]],
+            k=RRF_K,
+            top_k=top_k,
+        )
+        if span is not None:
+            span["hits"] = len(keys)
+    return [by_key[k] for k in keys]
+
+
+def search_chunks_by_vector(query_emb, top_k: int = 5, nprobes: int | None = None,
+                            refine_factor: int | None = None,
+                            filters: RetrievalFilter | None = None) -> list[RetrievedChunk]:
+    """Vector search → list[RetrievedChunk], nearest first."""
+    if VECTOR_INDEX_MODE == "inmemory":
+        return search_inmemory_batch([query_emb], top_k, filters)[0]
+
+    table = get_transcript_table()
+
     try:
         # ---- 3. Perform vector search ----
-        qb = table.search(query_emb).limit(top_k)
+        qb = table.search(query_emb, vector_column_name="embedding").limit(top_k)
+        qb = _apply_search_params(qb, nprobes, refine_factor).select(["video", "chunk_index", "chunk"])
+        where = filters.to_where() if filters else None
+        if where:
+            # prefilter: search only the matching rows instead of filtering the top_k afterwards
+            qb = qb.where(where, prefilter=True)
 
         # LanceDB → Arrow table
-        arrow_tbl = qb.to_arrow()
+        with trace_span("retrieval", "query_chunks", filtered=bool(where)) as span:
+            arrow_tbl = qb.to_arrow()
+            if span is not None:
+                span["hits"] = arrow_tbl.num_rows
 
         # ---- 4. Extract chunks safely ----
         if "chunk" not in arrow_tbl.column_names:
             print("LanceDB error: 'chunk' column missing")
             return []
 
-        chunks = arrow_tbl["chunk"].to_pylist()
-
-        return chunks
+        return [
+            RetrievedChunk(video, chunk_index, distance, chunk)
+            for video, chunk_index, distance, chunk in zip(
+                arrow_tbl["video"].to_pylist(),
+                arrow_tbl["chunk_index"].to_pylist(),
+                arrow_tbl["_distance"].to_pylist(),
+                arrow_tbl["chunk"].to_pylist(),
+            )
+        ]
 
     except Exception as e:
         print("LanceDB transcript search error:", e)
         return []
 
+
+def fetch_chunks(filters: RetrievalFilter, max_chunks: int | None = None) -> list[RetrievedChunk]:
+    """
+    All chunks matching the filter in lecture order (video, chunk_index), no
+    ranking — e.g. every chunk of "video 3" for notes. With max_chunks set,
+    long videos are sampled evenly so the whole lecture stays covered.
+    """
+    where = filters.to_where() if filters else None
+    if not where:
+        return []
+    try:
+        with trace_span("retrieval", "fetch_chunks") as span:
+            data = get_transcript_table().to_lance().to_table(
+                columns=["video", "chunk_index", "chunk"], filter=where
+            )
+            data = data.sort_by([("video", "ascending"), ("chunk_index", "ascending")])
+            if span is not None:
+                span["hits"] = data.num_rows
+    except Exception as e:
+        print("LanceDB transcript fetch error:", e)
+        return []
+
+    rows = range(data.num_rows)
+    if max_chunks and data.num_rows > max_chunks:
+        rows = np.linspace(0, data.num_rows - 1, max_chunks).round().astype(int)
+    videos = data["video"].to_pylist()
+    indices = data["chunk_index"].to_pylist()
+    chunks = data["chunk"].to_pylist()
+    return [RetrievedChunk(videos[i], indices[i], None, chunks[i]) for i in rows]
+
+
+# ---------------------------------------------------------
+# 4b. BM25 KEYWORD SEARCH (in-memory, rebuilt per table version)
+# ---------------------------------------------------------
+_bm25 = {"index": None, "keys": [], "chunks": [], "meta": None, "versions_mtime": None}
+_bm25_lock = threading.Lock()
+
+
+def get_bm25_index() -> dict:
+    """
+    Return the BM25 index over transcripts.chunk, building it on first use
+    and again whenever the table's version folder changes (e.g. after /setup).
+    """
+    global _bm25
+    mtime = _versions_mtime("transcripts")
+    state = _bm25
+    if state["index"] is not None and state["versions_mtime"] == mtime:
+        return state
+
+    with _bm25_lock:
+        state = _bm25
+        if state["index"] is not None and state["versions_mtime"] == mtime:
+            return state
+
+        table = get_transcript_table()
+        with trace_span("retrieval", "bm25_build") as span:
+            # only the text columns; skip reading the embeddings
+            data = table.to_lance().to_table(columns=["video", "video_number", "chunk_index", "chunk"])
+            chunks = data["chunk"].to_pylist()
+            keys = list(zip(data["video"].to_pylist(), data["chunk_index"].to_pylist()))
+            index = BM25Index(chunks)
+            if span is not None:
+                span["rows"] = len(chunks)
+
+        print(f"BM25 index built over {len(chunks)} transcript chunks")
+        # swap the whole dict so readers never see a half-built index
+        _bm25 = {"index": index, "keys": keys, "chunks": chunks, "meta": data.drop(["chunk"]),
+                 "versions_mtime": mtime}
+        return _bm25
+
+
+def search_chunks_bm25(question: str, top_k: int = 5,
+                       filters: RetrievalFilter | None = None) -> list[RetrievedChunk]:
+    """Keyword search → list[RetrievedChunk] (distance None), best first."""
+    try:
+        state = get_bm25_index()
+        with trace_span("retrieval", "bm25", filtered=bool(filters)) as span:
+            allowed = None
+            if filters:
+                allowed = filters.mask(state["meta"]).combine_chunks().to_numpy(zero_copy_only=False)
+            hits = state["index"].search(question, top_k, allowed)
+            if span is not None:
+                span["hits"] = len(hits)
+        return [RetrievedChunk(*state["keys"][i], None, state["chunks"][i]) for i, _ in hits]
+    except Exception as e:
+        print("BM25 transcript search error:", e)
+        return []
+
+# ---------------------------------------------------------
+# 4b'. IN-MEMORY VECTOR INDEX (VECTOR_INDEX_MODE=inmemory)
+# ---------------------------------------------------------
+_inmemory = {"index": None, "meta": None, "videos": [], "chunk_indices": [], "chunks": [],
+             "versions_mtime": None}
+_inmemory_lock = threading.Lock()
+
+
+def get_inmemory_index() -> dict:
+    """
+    Load transcripts embeddings into an InMemoryVectorIndex, once and again
+    whenever the table's version folder changes. The new index is built
+    off to the side and swapped in whole, so queries never see a partial one.
+    """
+    global _inmemory
+    mtime = _versions_mtime("transcripts")
+    state = _inmemory
+    if state["index"] is not None and state["versions_mtime"] == mtime:
+        return state
+
+    with _inmemory_lock:
+        state = _inmemory
+        if state["index"] is not None and state["versions_mtime"] == mtime:
+            return state
+
+        t0 = time.perf_counter()
+        data = get_transcript_table().to_lance().to_table(
+            columns=["video", "video_number", "chunk_index", "chunk", "embedding"]
+        )
+        emb = data["embedding"].combine_chunks()
+        matrix = emb.flatten().to_numpy(zero_copy_only=False).reshape(-1, EMBEDDING_DIM)
+        index = InMemoryVectorIndex(matrix, INMEMORY_INDEX_DTYPE)
+
+        _inmemory = {
+            "index": index,
+            "meta": data.select(["video", "video_number", "chunk_index"]),
+            "videos": data["video"].to_pylist(),
+            "chunk_indices": data["chunk_index"].to_pylist(),
+            "chunks": data["chunk"].to_pylist(),
+            "versions_mtime": mtime,
+        }
+        print(f"In-memory vector index loaded: {len(index)} rows, {INMEMORY_INDEX_DTYPE}, "
+              f"{index.nbytes / 1e6:.1f} MB in {time.perf_counter() - t0:.2f}s")
+        return _inmemory
+
+
+def search_inmemory_batch(query_embs: list, top_k: int = 5,
+                          filters: RetrievalFilter | None = None) -> list[list[RetrievedChunk]]:
+    """Exact top-k for each query from the in-memory matrix (one matrix product for all)."""
+    if not query_embs:
+        return []
+    try:
+        state = get_inmemory_index()
+        with trace_span("retrieval", "query_chunks", index="inmemory", queries=len(query_embs),
+                        filtered=bool(filters)) as span:
+            allowed = None
+            if filters:
+                allowed = filters.mask(state["meta"]).combine_chunks().to_numpy(zero_copy_only=False)
+            batch = state["index"].search_batch(np.asarray(query_embs, dtype=np.float32), top_k, allowed)
+            if span is not None:
+                span["hits"] = sum(len(hits) for hits in batch)
+    except Exception as e:
+        print("In-memory vector search error:", e)
+        return [[] for _ in query_embs]
+
+    # unit vectors: squared L2 distance = 2 - 2·cos, same scale as LanceDB's _distance
+    return [
+        [
+            RetrievedChunk(state["videos"][row], state["chunk_indices"][row], max(0.0, 2.0 - 2.0 * score),
+                           state["chunks"][row])
+            for row, score in hits
+        ]
+        for hits in batch
+    ]
+
+
+def warm_vector_index():
+    """Load the in-memory index at startup instead of on the first question."""
+    if VECTOR_INDEX_MODE == "inmemory":
+        try:
+            get_inmemory_index()
+        except Exception as e:
+            print("In-memory vector index warm-up failed:", e)
+
+
+# ---------------------------------------------------------
+# 4c. BATCHED MULTI-QUERY SEARCH
+# ---------------------------------------------------------
+# N queries → one embeddings request + N LanceDB searches run side by side
+# (Lance releases the GIL while scanning), instead of N sequential round-trips.
+BATCH_SEARCH_WORKERS = int(os.getenv("BATCH_SEARCH_WORKERS", "8"))
+_search_pool = ThreadPoolExecutor(max_workers=BATCH_SEARCH_WORKERS, thread_name_prefix="lance-search")
+
+
+def _unique_texts(questions: list[str]) -> tuple[list[str], list[str]]:
+    """(stripped questions, distinct non-blank ones) — blanks get empty results."""
+    texts = [q.strip() if isinstance(q, str) else "" for q in questions]
+    return texts, list(dict.fromkeys(t for t in texts if t))
+
+
+def _embed_queries(questions: list[str]) -> list:
+    texts, unique = _unique_texts(questions)
+    if not unique:
+        return [None] * len(texts)
+    matrix = normalize_embeddings(get_embedding(unique))
+    by_text = dict(zip(unique, matrix))  # rows are views into one buffer
+    return [by_text[t] if t else None for t in texts]
+
+
+async def _aembed_queries(questions: list[str]) -> list:
+    texts, unique = _unique_texts(questions)
+    if not unique:
+        return [None] * len(texts)
+    matrix = normalize_embeddings(await aget_embedding(unique))
+    by_text = dict(zip(unique, matrix))  # rows are views into one buffer
+    return [by_text[t] if t else None for t in texts]
+
+
+def _parallel_map(fn, n: int) -> list:
+    """fn(i) for i in range(n) on the search pool, each in a copy of the caller's context (tracing)."""
+    futures = [_search_pool.submit(contextvars.copy_context().run, fn, i) for i in range(n)]
+    return [f.result() for f in futures]
+
+
+def _search_all(questions: list[str], embeddings: list, top_k: int, nprobes, refine_factor,
+                mode: str, filters) -> list[list[RetrievedChunk]]:
+    per_query = filters if isinstance(filters, (list, tuple)) else [filters] * len(questions)
+
+    if mode == "vector" and VECTOR_INDEX_MODE == "inmemory" and not isinstance(filters, (list, tuple)):
+        # all queries in one matrix product instead of N searches
+        valid = [i for i, emb in enumerate(embeddings) if emb is not None]
+        results = [[] for _ in questions]
+        batch = search_inmemory_batch([embeddings[i] for i in valid], top_k, filters)
+        for i, hits in zip(valid, batch):
+            results[i] = hits
+        return results
+
+    def one(i):
+        if embeddings[i] is None and mode != "bm25":
+            return []
+        if mode == "bm25":
+            return search_chunks_bm25(questions[i], top_k, per_query[i])
+        if mode == "hybrid":
+            n = max(top_k, HYBRID_CANDIDATES)
+            return _fuse(
+                search_chunks_bm25(questions[i], n, per_query[i]),
+                search_chunks_by_vector(embeddings[i], n, nprobes, refine_factor, per_query[i]),
+                top_k,
+            )
+        return search_chunks_by_vector(embeddings[i], top_k, nprobes, refine_factor, per_query[i])
+
+    with trace_span("retrieval", "search_batch", queries=len(questions)):
+        return _parallel_map(one, len(questions))
+
+
+def search_chunks_batch(questions: list[str], top_k: int = 5, nprobes: int | None = None,
+                        refine_factor: int | None = None, mode: str | None = None,
+                        filters=None) -> list[list[RetrievedChunk]]:
+    """
+    search_chunks() for N queries at once (query expansion, multi-hop).
+    All queries are embedded in one get_embedding() call (cache-aware);
+    the searches then run concurrently. filters: one RetrievalFilter for
+    all queries, or a list with one per query.
+    Returns one list[RetrievedChunk] per query, in input order.
+    """
+    mode = _check_mode(mode)
+    embeddings = [None] * len(questions) if mode == "bm25" else _embed_queries(questions)
+    return _search_all(questions, embeddings, top_k, nprobes, refine_factor, mode, filters)
+
+
+async def asearch_chunks_batch(questions: list[str], top_k: int = 5, nprobes: int | None = None,
+                               refine_factor: int | None = None, mode: str | None = None,
+                               filters=None) -> list[list[RetrievedChunk]]:
+    """Async search_chunks_batch(): one awaited embeddings call, searches in worker threads."""
+    mode = _check_mode(mode)
+    embeddings = [None] * len(questions) if mode == "bm25" else await _aembed_queries(questions)
+    return await asyncio.to_thread(_search_all, questions, embeddings, top_k, nprobes, refine_factor,
+                                   mode, filters)
+
+
+def query_chunks_batch(questions: list[str], top_k: int = 5, **kwargs) -> list[list[str]]:
+    """query_chunks() for N queries → one list[str] per query."""
+    return [[h.text for h in hits] for hits in search_chunks_batch(questions, top_k, **kwargs)]
+
+
 # ---------------------------------------------------------
 # 5. WRITE MEMORY
 # ---------------------------------------------------------
-def write_memory(user_msg: str, assistant_msg: str):
+def write_memory(user_msg: str, assistant_msg: str, session_id: str | None = None, user_id: str | None = None):
+    """
+    Store conversation pair into LanceDB memory (synchronously).
+    Request paths should go through memory_writer instead.
+    """
+    return write_memories([(user_msg, assistant_msg, session_id, user_id)]) == 1
+
+
+def write_memories(pairs: list[tuple]) -> int:
     """
-    Store conversation pair into LanceDB memory.
+    Store many (user_msg, assistant_msg[, session_id, user_id]) turns: one
+    embeddings call and one Arrow batch → one Lance fragment per call
+    instead of one per turn.
+    Returns the number of rows written.
     """
+    if not pairs:
+        return 0
     table = get_memory_table()
 
-    text = f"User said: {user_msg}\nAssistant replied: {assistant_msg}"
-    emb = get_single_embedding(text).astype(np.float32)
+    turns = [tuple(p) + (None,) * (4 - len(p)) for p in pairs]
+    texts = [f"User said: {user_msg}\nAssistant replied: {assistant_msg}" for user_msg, assistant_msg, _, _ in turns]
+    emb = normalize_embeddings(get_embedding_with_retry(texts))
+    if len(emb) != len(texts):
+        # get_embedding skips blank texts; the pair text is never blank, so this is a bug upstream
+        raise ValueError(f"Got {len(emb)} embeddings for {len(texts)} memory rows")
+
+    now = time.time()
+    table.add(pa.Table.from_arrays(
+        [
+            pa.array([uuid.uuid4().hex for _ in texts], pa.string()),
+            pa.array([t[2] for t in turns], pa.string()),
+            pa.array([t[3] for t in turns], pa.string()),
+            pa.array(texts, pa.string()),
+            pa.array([now] * len(texts), pa.float64()),
+            to_fixed_size_list(emb),
+        ],
+        schema=MEMORY_SCHEMA,
+    ))
 
-    row = {
-        "text": text,
-        "embedding": emb.tolist()
-    }
+    global _memory_writes
+    before = _memory_writes
+    _memory_writes += len(texts)
+    if before // ANN_MEMORY_CHECK_EVERY != _memory_writes // ANN_MEMORY_CHECK_EVERY:
+        try:
+            maybe_build_ann_index("memory")
+        except Exception as e:
+            print("LanceDB memory index build error:", e)
+    return len(texts)
 
-    table.add([row])
-    return True
+
+_memory_writes = 0
 
 
 # ---------------------------------------------------------
 # 6. RECALL MEMORY
 # ---------------------------------------------------------
-def recall_memory(query: str):
+def build_memory_scalar_indexes() -> dict:
+    """Scalar indexes on session_id / user_id so the recall prefilter does not scan those columns."""
+    table = get_memory_table()
+    status = {}
+    for column in ("session_id", "user_id"):
+        try:
+            table.create_scalar_index(column, replace=True)
+            status[column] = "built"
+        except Exception as e:
+            print(f"LanceDB memory scalar index ({column}) error:", e)
+            status[column] = "error"
+    return status
+
+
+def memory_scope_where(session_id: str | None = None, user_id: str | None = None) -> str | None:
+    """
+    Prefilter for one student's memory: user_id covers all of their sessions,
+    otherwise session_id. None without either: there is no shared pool, so
+    unscoped callers recall nothing and one student's memory never surfaces
+    for another.
+    """
+    if user_id:
+        return "user_id = '{}'".format(user_id.replace("'", "''"))
+    if session_id:
+        return "session_id = '{}'".format(session_id.replace("'", "''"))
+    return None
+
+
+def recall_memory(query: str, session_id: str | None = None, user_id: str | None = None, top_k: int = 1):
+    """
+    Retrieve the most relevant memory snippets of one session / user using
+    vector search (top_k joined by blank lines; "" if none or no scope).
+    """
+    where = memory_scope_where(session_id, user_id)
+    if where is None:
+        return ""
+    texts = _recall_by_vector(normalize_embedding(get_single_embedding(query)), top_k, where)
+    return "\n\n".join(texts)
+
+
+def recall_memory_batch(queries: list[str], session_id: str | None = None, user_id: str | None = None,
+                        top_k: int = 1) -> list[str]:
+    """
+    recall_memory() for N queries: one embeddings call, searches in parallel.
+    Returns one snippet ("" if none) per query, in input order.
+    """
+    where = memory_scope_where(session_id, user_id)
+    if where is None:
+        return [""] * len(queries)
+    embeddings = _embed_queries(queries)
+
+    def one(i):
+        if embeddings[i] is None:
+            return ""
+        return "\n\n".join(_recall_by_vector(embeddings[i], top_k, where))
+
+    with trace_span("retrieval", "recall_memory_batch", queries=len(queries)):
+        return _parallel_map(one, len(queries))
+
+
+def _recall_by_vector(q_emb, top_k: int, where: str) -> list[str]:
     """
-    Retrieve the most relevant memory snippet using vector search.
+    Top-k memory texts: MEMORY_RECALL_CANDIDATES nearest rows within the
+    scope prefilter (memory_scope_where), re-scored as cosine +
+    MEMORY_RECENCY_WEIGHT * recency, where recency halves every
+    MEMORY_RECENCY_HALF_LIFE_DAYS. No scope, no results.
     """
+    if not where:
+        return []
     table = get_memory_table()
-    q_emb = get_single_embedding(query).astype(np.float32)
 
     try:
-        results = (
-            table.search(q_emb)
-            .limit(1)
-            .select(["text"])
-            .to_list()
-        )
+        qb = table.search(q_emb, vector_column_name="embedding").limit(max(top_k, MEMORY_RECALL_CANDIDATES))
+        # prefilter: search only this student's rows, not the whole table
+        qb = _apply_search_params(qb, None, None).select(["text", "created_at"]).where(where, prefilter=True)
+        with trace_span("retrieval", "recall_memory") as span:
+            results = qb.to_arrow()
+            if span is not None:
+                span["hits"] = results.num_rows
     except Exception as e:
         print("LanceDB memory search error:", e)
-        return ""
+        return []
 
-    if not results:
-        return ""
+    if not results.num_rows:
+        return []
+
+    # unit vectors: squared L2 distance d = 2 - 2·cos
+    similarity = 1.0 - results["_distance"].to_numpy() / 2.0
+    created = pc.fill_null(results["created_at"], 0.0).to_numpy()
+    age_days = np.maximum(time.time() - created, 0.0) / 86400.0
+    score = similarity + MEMORY_RECENCY_WEIGHT * np.exp2(-age_days / MEMORY_RECENCY_HALF_LIFE_DAYS)
 
-    return results[0]["text"]
+    order = np.argsort(-score, kind="stable")[:top_k]
+    texts = results["text"].to_pylist()
+    return [texts[i] for i in order]
 
 
 # ---------------------------------------------------------
@@ -176,6 +1102,7 @@ def recall_memory(query: str):
 def clear_all_data():
     """Deletes local LanceDB folder."""
     import shutil
+    refresh_tables()
     shutil.rmtree(DB_PATH, ignore_errors=True)
     os.makedirs(DB_PATH, exist_ok=True)
     print("LanceDB data cleared.")
\ No newline at end of file
@@ -0,0 +1,134 @@
+"""
+Benchmark: IVF-PQ indexed vs flat LanceDB vector search.
+
+Builds a synthetic table of clustered, L2-normalised 1536-d vectors (the shape
+of text-embedding-3-small output), measures recall@k against exact NumPy
+search, and p50/p99 latency for flat search and for the indexed table at a
+few nprobes / refine_factor settings.
+
+Run from the repo root:
+    python -m testing.bench_ann_index --rows 100000
+    python -m testing.bench_ann_index --rows 1000000 --queries 200
+"""
+
+import argparse
+import math
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pyarrow as pa
+import lancedb
+
+
+def synthetic_vectors(rng, n: int, dim: int, centers: np.ndarray) -> np.ndarray:
+    """Gaussian mixture around random centers, normalised like OpenAI embeddings."""
+    labels = rng.integers(0, len(centers), size=n)
+    vecs = centers[labels] + 0.35 * rng.standard_normal((n, dim), dtype=np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    return vecs.astype(np.float32)
+
+
+def build_table(db, rows: int, dim: int, rng, centers, batch_size: int = 50_000):
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("embedding", pa.list_(pa.float32(), dim)),
+    ])
+    table = None
+    matrix = np.empty((rows, dim), dtype=np.float32)
+
+    for start in range(0, rows, batch_size):
+        n = min(batch_size, rows - start)
+        vecs = synthetic_vectors(rng, n, dim, centers)
+        matrix[start:start + n] = vecs
+        batch = pa.table({
+            "id": pa.array(np.arange(start, start + n, dtype=np.int64)),
+            "embedding": pa.FixedSizeListArray.from_arrays(pa.array(vecs.ravel()), dim),
+        }, schema=schema)
+        if table is None:
+            table = db.create_table("bench", data=batch, schema=schema)
+        else:
+            table.add(batch)
+
+    return table, matrix
+
+
+def exact_topk(matrix: np.ndarray, queries: np.ndarray, k: int) -> list:
+    # vectors are unit length, so max dot product == min L2 distance
+    truth = []
+    for q in queries:
+        scores = matrix @ q
+        idx = np.argpartition(-scores, k)[:k]
+        truth.append(set(idx.tolist()))
+    return truth
+
+
+def run_queries(table, queries: np.ndarray, k: int, nprobes=None, refine_factor=None):
+    latencies = []
+    results = []
+    for q in queries:
+        t0 = time.perf_counter()
+        qb = table.search(q, vector_column_name="embedding").limit(k).select(["id"])
+        if nprobes:
+            qb = qb.nprobes(nprobes)
+        if refine_factor:
+            qb = qb.refine_factor(refine_factor)
+        ids = qb.to_arrow()["id"].to_pylist()
+        latencies.append((time.perf_counter() - t0) * 1000)
+        results.append(set(ids))
+    return results, np.array(latencies)
+
+
+def report(label: str, results, truth, latencies, k: int):
+    recall = np.mean([len(r & t) / k for r, t in zip(results, truth)])
+    print(f"{label:<34} recall@{k}={recall:.3f}  "
+          f"p50={np.percentile(latencies, 50):7.2f} ms  p99={np.percentile(latencies, 99):7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    centers = rng.standard_normal((args.clusters, args.dim), dtype=np.float32)
+    tmp_dir = tempfile.mkdtemp(prefix="bench_ann_")
+
+    try:
+        db = lancedb.connect(tmp_dir)
+        t0 = time.perf_counter()
+        table, matrix = build_table(db, args.rows, args.dim, rng, centers)
+        print(f"Loaded {args.rows} rows x {args.dim} dims in {time.perf_counter() - t0:.1f}s")
+
+        queries = synthetic_vectors(rng, args.queries, args.dim, centers)
+        truth = exact_topk(matrix, queries, args.k)
+
+        results, lat = run_queries(table, queries, args.k)
+        report("flat (no index)", results, truth, lat, args.k)
+
+        num_partitions = int(min(4096, max(16, math.sqrt(args.rows))))
+        t0 = time.perf_counter()
+        table.create_index(
+            metric="L2",
+            num_partitions=num_partitions,
+            num_sub_vectors=args.dim // 16,
+            vector_column_name="embedding",
+            replace=True,
+        )
+        print(f"Built IVF-PQ index (partitions={num_partitions}) in {time.perf_counter() - t0:.1f}s")
+
+        for nprobes, refine in [(10, None), (20, None), (20, 5), (50, 10)]:
+            results, lat = run_queries(table, queries, args.k, nprobes=nprobes, refine_factor=refine)
+            report(f"ivf_pq nprobes={nprobes} refine={refine}", results, truth, lat, args.k)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark: N sequential query_chunks() calls vs one query_chunks_batch().
+
+Uses the questions in testing/intent_eval_set.jsonl against the real
+`transcripts` table (run /setup first). The embedding cache is cleared
+before each run so both pay for embeddings: sequential makes N embedding
+requests, batched makes one. Needs OPENAI_API_KEY.
+
+Run from the repo root:
+    python -m testing.bench_batch_search --queries 8 --rounds 5
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from backend.services import vector_store_lance as vs
+from backend.services.embedding_cache import embedding_cache
+from backend.services.request_trace import start_trace
+
+EVAL_SET = os.path.join(os.path.dirname(__file__), "intent_eval_set.jsonl")
+
+
+def load_questions(n: int) -> list:
+    with open(EVAL_SET, "r", encoding="utf-8") as f:
+        questions = [json.loads(line)["question"] for line in f if line.strip()]
+    return questions[:n]
+
+
+def timed(fn):
+    embedding_cache.clear()
+    trace = start_trace("bench")
+    t0 = time.perf_counter()
+    fn()
+    return (time.perf_counter() - t0) * 1000, trace.count("embedding")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--mode", default="vector", choices=vs.RETRIEVAL_MODES)
+    args = parser.parse_args()
+
+    questions = load_questions(args.queries)
+    print(f"{len(questions)} queries x {args.rounds} rounds, mode={args.mode}")
+
+    runs = {
+        "sequential": lambda: [vs.query_chunks(q, args.k, mode=args.mode) for q in questions],
+        "batched": lambda: vs.query_chunks_batch(questions, args.k, mode=args.mode),
+    }
+    for label, fn in runs.items():
+        results = [timed(fn) for _ in range(args.rounds)]
+        lat = np.array([ms for ms, _ in results])
+        print(f"{label:<11} p50={np.percentile(lat, 50):8.1f} ms  max={lat.max():8.1f} ms  "
+              f"embedding_calls={results[0][1]}")
+
+
+if __name__ == "__main__":
+    main()
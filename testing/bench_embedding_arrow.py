@@ -0,0 +1,100 @@
+"""
+Benchmark: building the transcripts write batch from Python lists vs from
+a float32 NumPy matrix.
+
+  lists   the previous path: every vector normalised to list[float] via
+          .tolist(), rows assembled as Python values, Arrow converts them back
+  numpy   the current path: one (n, dim) float32 matrix, the embedding column
+          wraps its buffer (to_fixed_size_list)
+
+Reports build time and peak Python allocations (tracemalloc) per batch, then
+the end-to-end time of writing the batch to a temporary LanceDB table.
+
+Run from the repo root:
+    python -m testing.bench_embedding_arrow --rows 2000 20000
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pyarrow as pa
+import lancedb
+
+from backend.services.embedding_normalizer import normalize_embeddings, to_fixed_size_list
+from backend.services.vector_store_lance import TRANSCRIPT_SCHEMA
+
+
+def build_lists(vectors: np.ndarray, chunks: list) -> pa.Table:
+    embeddings = [np.array(v, dtype=np.float32).tolist() for v in vectors]
+    return pa.Table.from_pydict(
+        {
+            "video": ["video1"] * len(chunks),
+            "video_number": [1] * len(chunks),
+            "chunk_index": list(range(len(chunks))),
+            "chunk": chunks,
+            "embedding": embeddings,
+        },
+        schema=TRANSCRIPT_SCHEMA,
+    )
+
+
+def build_numpy(vectors: np.ndarray, chunks: list) -> pa.Table:
+    n = len(chunks)
+    return pa.Table.from_arrays(
+        [
+            pa.array(["video1"] * n, pa.string()),
+            pa.array([1] * n, pa.int32()),
+            pa.array(range(n), pa.int32()),
+            pa.array(chunks, pa.string()),
+            to_fixed_size_list(normalize_embeddings(vectors)),
+        ],
+        schema=TRANSCRIPT_SCHEMA,
+    )
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn(*args)
+    elapsed = (time.perf_counter() - t0) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[2_000, 20_000])
+    parser.add_argument("--dim", type=int, default=TRANSCRIPT_SCHEMA.field("embedding").type.list_size)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    for rows in args.rows:
+        # the embeddings API response as get_embedding() now returns it
+        vectors = rng.standard_normal((rows, args.dim), dtype=np.float32)
+        chunks = [f"chunk {i}" for i in range(rows)]
+        print(f"{rows} rows x {args.dim} dims ({vectors.nbytes / 1e6:.1f} MB of float32)")
+
+        for label, fn in (("lists", build_lists), ("numpy", build_numpy)):
+            batch, build_ms, peak = measure(fn, vectors, chunks)
+
+            tmp_dir = tempfile.mkdtemp(prefix="bench_arrow_")
+            try:
+                db = lancedb.connect(tmp_dir)
+                t0 = time.perf_counter()
+                db.create_table("transcripts", data=batch, schema=TRANSCRIPT_SCHEMA)
+                write_ms = (time.perf_counter() - t0) * 1000
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+            print(f"  {label:<6} build={build_ms:9.1f} ms  peak_alloc={peak / 1e6:8.1f} MB  "
+                  f"write={write_ms:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark: vector-only vs BM25-only vs hybrid (RRF) transcript retrieval.
+
+Runs against the real `transcripts` table (run /setup first). Two query sets:
+
+  - "span" queries (default): a random run of words cut from a sampled
+    chunk; the relevant result is that chunk. Models students pasting exact
+    terms / error text.
+  - labeled queries (--queries file.jsonl, one {"question", "video"} per
+    line): a hit is any chunk from the expected video.
+
+Reports recall@k and p50 / p99 latency per mode. Vector and hybrid modes
+call the embeddings API (cached after the first pass, so the first mode
+run pays the network cost; use --warm to embed all queries up-front).
+
+Run from the repo root:
+    python -m testing.bench_hybrid_retrieval --samples 200
+    python -m testing.bench_hybrid_retrieval --queries my_questions.jsonl --warm
+"""
+
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+
+from backend.services import vector_store_lance as vs
+from backend.services.embedding_utils import get_embedding
+
+
+def span_queries(rng: random.Random, samples: int, span_words: int) -> list:
+    state = vs.get_bm25_index()
+    candidates = [i for i, c in enumerate(state["chunks"]) if c and len(c.split()) > span_words * 2]
+    queries = []
+    for i in rng.sample(candidates, min(samples, len(candidates))):
+        words = state["chunks"][i].split()
+        start = rng.randrange(0, len(words) - span_words)
+        queries.append({
+            "question": " ".join(words[start:start + span_words]),
+            "chunk": state["chunks"][i],
+        })
+    return queries
+
+
+def labeled_queries(path: str) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def is_hit(query: dict, hits: list) -> bool:
+    if "chunk" in query:
+        return any(h.text == query["chunk"] for h in hits)
+    return any(h.video == query["video"] for h in hits)
+
+
+def run_mode(mode: str, queries: list, k: int):
+    latencies = []
+    hits = 0
+    for q in queries:
+        t0 = time.perf_counter()
+        results = vs.search_chunks(q["question"], k, mode=mode)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        hits += is_hit(q, results)
+
+    lat = np.array(latencies)
+    print(f"{mode:<8} recall@{k}={hits / len(queries):.3f}  "
+          f"p50={np.percentile(lat, 50):8.2f} ms  p99={np.percentile(lat, 99):8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", help="jsonl of {question, video}; default: span queries from the table")
+    parser.add_argument("--samples", type=int, default=100)
+    parser.add_argument("--span-words", type=int, default=8)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--modes", nargs="+", default=["vector", "bm25", "hybrid"])
+    parser.add_argument("--warm", action="store_true", help="embed all queries before timing")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    state = vs.get_bm25_index()
+    print(f"BM25 index over {len(state['chunks'])} chunks built in {time.perf_counter() - t0:.2f}s")
+
+    if args.queries:
+        queries = labeled_queries(args.queries)
+    else:
+        queries = span_queries(random.Random(args.seed), args.samples, args.span_words)
+    print(f"{len(queries)} queries")
+
+    if args.warm:
+        get_embedding([q["question"] for q in queries])
+
+    for mode in args.modes:
+        run_mode(mode, queries, args.k)
+
+
+if __name__ == "__main__":
+    main()
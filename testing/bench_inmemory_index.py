@@ -0,0 +1,87 @@
+"""
+Benchmark: in-memory NumPy index vs LanceDB vector search.
+
+For each corpus size, builds a synthetic table of clustered, normalised
+1536-d vectors (same generator as bench_ann_index), then reports recall@k
+against exact search, p50 / p99 latency for single queries, per-query cost
+of a batched search, and the index memory footprint for:
+  - LanceDB flat search (disk-backed, Arrow results)
+  - InMemoryVectorIndex float32 / float16 / int8
+
+500k rows x 1536 dims is ~3 GB as float32; pass smaller sizes on small machines.
+
+Run from the repo root:
+    python -m testing.bench_inmemory_index
+    python -m testing.bench_inmemory_index --rows 5000 50000 --queries 200
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import lancedb
+
+from backend.services.inmemory_index import InMemoryVectorIndex, INDEX_DTYPES
+from testing.bench_ann_index import synthetic_vectors, build_table, exact_topk, run_queries
+
+
+def report(label: str, results, truth, latencies, k: int, extra: str = ""):
+    recall = np.mean([len(r & t) / k for r, t in zip(results, truth)])
+    print(f"  {label:<18} recall@{k}={recall:.3f}  "
+          f"p50={np.percentile(latencies, 50):8.3f} ms  p99={np.percentile(latencies, 99):8.3f} ms  {extra}")
+
+
+def bench_inmemory(matrix, queries, truth, k: int, dtype: str):
+    t0 = time.perf_counter()
+    index = InMemoryVectorIndex(matrix, dtype)
+    load_s = time.perf_counter() - t0
+
+    latencies, results = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        hits = index.search(q, k)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        results.append({row for row, _ in hits})
+
+    t0 = time.perf_counter()
+    index.search_batch(queries, k)
+    batch_ms = (time.perf_counter() - t0) * 1000 / len(queries)
+
+    report(f"inmemory {dtype}", results, truth, np.array(latencies), k,
+           f"batched={batch_ms:6.3f} ms/query  {index.nbytes / 1e6:8.1f} MB  load={load_s:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[5_000, 50_000, 500_000])
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--dtypes", nargs="+", default=list(INDEX_DTYPES))
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        rng = np.random.default_rng(args.seed)
+        centers = rng.standard_normal((args.clusters, args.dim), dtype=np.float32)
+        tmp_dir = tempfile.mkdtemp(prefix="bench_inmemory_")
+        try:
+            table, matrix = build_table(lancedb.connect(tmp_dir), rows, args.dim, rng, centers)
+            queries = synthetic_vectors(rng, args.queries, args.dim, centers)
+            truth = exact_topk(matrix, queries, args.k)
+            print(f"{rows} rows x {args.dim} dims")
+
+            results, lat = run_queries(table, queries, args.k)
+            report("lancedb flat", results, truth, lat, args.k)
+
+            for dtype in args.dtypes:
+                bench_inmemory(matrix, queries, truth, args.k, dtype)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
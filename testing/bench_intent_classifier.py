@@ -0,0 +1,75 @@
+"""
+Benchmark: local (keyword + nearest-centroid) vs LLM intent classification.
+
+Reports accuracy and latency (p50 / p99 / mean) for each mode on the labeled
+set in testing/intent_eval_set.jsonl, plus how often hybrid mode had to fall
+back to the LLM. Needs OPENAI_API_KEY (centroids and the LLM baseline call
+the API).
+
+Run from the repo root:
+    python -m testing.bench_intent_classifier
+    python -m testing.bench_intent_classifier --modes local hybrid
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import Counter
+
+import numpy as np
+
+from backend.services import intent_classifier
+from backend.services.embedding_cache import embedding_cache
+
+EVAL_SET = os.path.join(os.path.dirname(__file__), "intent_eval_set.jsonl")
+
+
+def load_eval_set(path: str) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def run_mode(mode: str, samples: list, warm: bool):
+    intent_classifier.INTENT_CLASSIFIER_MODE = mode
+    if not warm:
+        embedding_cache.clear()
+
+    latencies = []
+    correct = 0
+    sources = Counter()
+    for sample in samples:
+        t0 = time.perf_counter()
+        intent, _, source = intent_classifier.classify_intent_detailed(sample["question"])
+        latencies.append((time.perf_counter() - t0) * 1000)
+        sources[source] += 1
+        correct += intent == sample["intent"]
+
+    lat = np.array(latencies)
+    label = f"{mode} ({'warm' if warm else 'cold'} cache)"
+    print(f"{label:<24} accuracy={correct / len(samples):.3f}  "
+          f"p50={np.percentile(lat, 50):8.2f} ms  p99={np.percentile(lat, 99):8.2f} ms  "
+          f"mean={lat.mean():8.2f} ms  sources={dict(sources)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--eval-set", default=EVAL_SET)
+    parser.add_argument("--modes", nargs="+", default=["llm", "local", "hybrid"])
+    args = parser.parse_args()
+
+    samples = load_eval_set(args.eval_set)
+    print(f"{len(samples)} labeled questions")
+
+    # build centroids up-front so their one-off embedding call is not timed
+    intent_classifier._get_centroids()
+
+    for mode in args.modes:
+        run_mode(mode, samples, warm=False)
+        if mode != "llm":
+            # second pass: question embeddings already cached (as after retrieval)
+            run_mode(mode, samples, warm=True)
+
+
+if __name__ == "__main__":
+    main()